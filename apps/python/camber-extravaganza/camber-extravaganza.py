@@ -18,28 +18,70 @@
 # V2.2	- Add "Show Delta" mode
 #		- Fix divide by zero when dcamber1 = 0
 #
+# V2.3	- Index tyre data once at startup, cache it on disk
+#		- Rolling history statistics instead of re-summing every frame
+#		- Store history in flat arrays instead of per-frame dicts
+#		- Colour lookup table instead of per-frame HSV conversion
+#		- Draw all history graphs in a single GL_LINES block
+#		- Add lap and session long history graph modes
+#		- Read wheel telemetry from shared memory, skip frames without new physics
+#		- Optional background sampler for full physics-rate history
+#		- One optimal camber solver for both axles, batch mode for recorded sessions
+#		- Optional full grip curve solver instead of the linearized closed form
+#		- Precomputed full grip curve tables, built once and mmapped per car
+#		- Record sessions to a binary log from a background writer thread
+#		- Optional per-stage frame profiler panel, dumped to the log when turned off
+#		- Only update labels whose text or colour changed, optional text refresh rate
+#		- Cache the body layout and tyre vertices, redraw tyres moved under a pixel as is
+#		- Check the tyre compound twice a second, look new tyre data up off-thread
+#		- Fix "Unrecognized Car" sticking after tyre data is found again
+#		- Optional all cars mode, the focused car is shown and the field listed
+#		- Optional telemetry stream to other programs over a local UDP or TCP port
+#		- Reload changed tyres_data files while running, report cars defined twice
+#		- Save options to a checked JSON file off the UI thread, instead of pickle;
+#		  an old options.dat is imported once
+#		- Staged startup: window first, tyre data and tables on the lookup thread,
+#		  shared memory pages, NumPy and feature modules only when used,
+#		  optional startup profile
+#		- Optional track map, camber heatmap per track segment for the session
+#		- Smooth the optimum with a time constant and average over seconds, not
+#		  frames, so both read the same at any frame rate
+#
 #############################################################
 
 import ac
 import acsys
-import collections
-import colorsys
-import json
 import math
 import os
-import pickle
-import platform
 import sys
+import time
 import traceback
 
-if platform.architecture()[0] == "64bit":
+LoadStart = time.perf_counter()
+
+# Pointer size rather than platform.architecture(), which imports subprocess
+if sys.maxsize > 2**32:
     libdir = 'third_party/lib64'
 else:
     libdir = 'third_party/lib'
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), libdir))
 os.environ['PATH'] = os.environ['PATH'] + ";."
 
-from third_party.sim_info import info
+from third_party.sim_info import info, SPageFilePhysics, AC_LIVE, AC_PAUSE
+from camberlib import tyredata
+from camberlib.colors import ColorTable
+from camberlib.compound import AsyncLookup, CompoundTracker
+from camberlib.geometry import CarLayout
+from camberlib.history import HistoryBuffer
+from camberlib.labels import LabelCache
+from camberlib.multires import MultiResHistory
+from camberlib import lazy
+from camberlib.profiler import StageProfiler, StartupProfile
+from camberlib.rolling import RollingStats, TimeWindowMean
+from camberlib.sampler import STALL, TelemetrySampler
+from camberlib.settings import OptionsStore
+from camberlib.solver import AxleSolver, CLOSED_FORM, FULL_CURVE, SETTLED
+from camberlib.telemetry import PhysicsReader
 
 appWindow = 0
 CamberIndicators = {}
@@ -47,18 +89,63 @@ CheckBoxes = {}
 Buttons = {}
 TextInputs = {}
 Labels = {}
+LabelState = LabelCache(ac.setText, ac.setFontColor)
+OptionsFile = None
+TyreIndex = None       # loaded by the first tyre data lookup
+TyreFiles = None
+TyreReload = None
+TyreReloadTimer = 0.0
+OptimalTables = None
+StaleTables = frozenset() # cars whose tyre data changed since OptimalTables was built
+ColorLUT = None
+Layout = None
+Telemetry = None
+Sampler = None
+Recorder = None
+Stream = None
+Segments = None
+SegmentsCar = 0
+SegmentColors = []    # index segment * 4 + wheel, like camberlib.segments
+TrackMapRuns = []     # per wheel, (x0, x1, y0, y1, colour) quads rebuilt when a colour changes
+TrackMapPosition = 0.0
+Profiler = None
+ProfileRefresh = 0.0
+Solver = AxleSolver()
+CompoundWatch = None
+TyreLookup = None
+FocusedCar = 0
+Field = None
+FieldNames = []
+FieldRefresh = 0.0
+LastSnapshot = (0, 0, (0, 0, 0, 0), (0, 0, 0, 0), (0, 0, 0, 0))
+PhysicsWait = 0.0     # seconds of frames without a new physics step, added to the next one
 redrawText = False
+Startup = StartupProfile(LoadStart)
+Startup.mark("imports")
 customFont = "Consolas"
 Options = {
 	"drawGraphs": False,
 	"normalize": False,
 	"useSpectrum": True,
 	"showDelta": False,
+	"graphMode": 0,      # index into GraphModes
+	"fullGripCurve": False, # maximize the whole grip curve instead of the closed form
+	"record": False,     # write every sample to sessions/*.cxlog
+	"profile": False,    # time each stage of onFormRender, see ProfileStages
+	"multiCar": False,   # follow the focused car and track every car on track
+	"startupProfile": False, # log how long each step of loading the app took
+	"trackMap": False,   # camber heatmap by track position, see camberlib/segments.py
 	"alpha": 0.5,        # graph alpha
 	"tireHeight": 50,    # tire height
 	"radScale": 10,      # scale flapper deflection to this at 2*peak grip
 	"graphWidth": 150,   # in pixels, also the number of frames of data to display
 	"graphHeight": 85,   # in pixels
+	"averageTime": 2.5,  # seconds, the average under each value
+	"sampleRate": 0,     # Hz, poll physics from a background thread, 0 samples once per frame
+	"textRate": 0,       # Hz, refresh label text at most this often, 0 every frame
+	"streamPort": 0,     # stream telemetry on this local port, 0 doesn't, see camberlib/stream.py
+	"streamProtocol": "udp", # or "tcp"
+	"streamFormat": "binary", # or "json", one object per line
 	"targetCamberF": 999, # degrees
 	"targetCamberR": 999, # degrees
 	"optimalCamberF": 999, # degrees
@@ -72,12 +159,38 @@ Options = {
 	"tyreCompound": "",  # short name
 	"carNotFound": False
 }
-SavableOptions = [ # Only save these to file
-	"drawGraphs",
-	"normalize",
-	"useSpectrum",
-	"showDelta"
-]
+SavableOptions = { # Only save these to file, see camberlib/settings.py for the rules
+	"drawGraphs": (bool,),
+	"normalize": (bool,),
+	"useSpectrum": (bool,),
+	"showDelta": (bool,),
+	"graphMode": (int, 0, 2), # GraphModes
+	"fullGripCurve": (bool,),
+	"multiCar": (bool,),
+	"startupProfile": (bool,),
+	"trackMap": (bool,),
+	"alpha": (float, 0.0, 1.0),
+	"tireHeight": (int, 10, 200),
+	"radScale": (float, 1.0, 100.0),
+	"graphWidth": (int, 10, 1000),
+	"graphHeight": (int, 10, 1000),
+	"averageTime": (float, 0.1, 60.0),
+	"sampleRate": (int, 0, 2000),
+	"textRate": (int, 0, 240),
+	"streamPort": (int, 0, 65535),
+	"streamProtocol": (str, "udp", "tcp"),
+	"streamFormat": (str, "binary", "json")
+}
+GraphRed = (1, 0, 0, 1)   # base of bars above zero
+GraphWhite = (1, 1, 1, 1) # base of bars below zero
+GraphModes = ["Frames", "Lap", "Session"] # 1 px per frame, then min/max buckets
+ProfileStages = ["telemetry", "body", "tires", "graphs", "history", "labels", "compound", "solver", "field"]
+ProfileInterval = 0.5 # seconds between profile panel updates
+TyreReloadInterval = 2.0 # seconds between tyres_data checks
+FieldRows = 8         # cars listed in all cars mode, furthest from optimal first
+TrackMapY = 4         # top of the track map, one row per wheel above the car
+TrackMapRow = 8       # row height in pixels
+TrackMapWidth = 200   # whole lap, in pixels
 doRender = True
 
 class CamberIndicator:
@@ -89,8 +202,11 @@ class CamberIndicator:
 			self.yPosition = y
 			self.value = 0
 			self.avgValue = 0
-			self.color = {'r':1,'g':1,'b':1,'a':1}
-			self.serie = collections.deque(maxlen=Options["graphWidth"])
+			self.color = (1, 1, 1, 1)
+			self.serie = HistoryBuffer(Options["graphWidth"])
+			self.stats = RollingStats(Options["graphWidth"])
+			self.average = TimeWindowMean(Options["averageTime"])
+			self.longSerie = MultiResHistory(Options["graphWidth"])
 			self.minVal = 6
 			self.maxVal = 1.5
 
@@ -104,88 +220,75 @@ class CamberIndicator:
 
 
 	def setValue(self, value, deltaT, optimal):
+		self.addSample(value, deltaT, optimal)
+		self.updateLabels()
+
+
+
+	# History only, labels are left alone so the sampler can add
+	# several physics steps per frame
+	def addSample(self, value, deltaT, optimal):
 		global Options
 
 		try:
 			self.value = value
+			deg = math.degrees(self.value)
+			self.color = getColor(deg, optimal)
+			r, g, b, a = self.color
+			self.serie.append(deg, r, g, b, a)
+			self.longSerie.append(deg, r, g, b, a, deltaT)
+			self.stats.push(deg)
+			self.average.push(deg, deltaT)
+			self.avgValue = self.average.mean()
+		except Exception:
+			ac.log("CamberExtravaganza ERROR: addSample(): %s" % traceback.format_exc())
+
+
+
+	def updateLabels(self):
+		try:
 			deg = math.degrees(self.value)
 			#~ otherdeg = math.degrees(othervalue)
 			#~ diff = deg - otherdeg
-			ac.setText(self.valueLabel,"{0:.3f}°".format(deg))
+			LabelState.text(self.valueLabel,"{0:.3f}°".format(deg))
 			#~ text = getGripFactor(Options["dcamber0"], Options["dcamber1"], value)
 			#~ ac.setText(self.valueLabel,"{0:.1f}%".format(text)
 
-			self.color = getColor(deg, optimal)
-			self.serie.append({"value":deg,"color":self.color})
-
-			serieSum = 0
-			for s in self.serie:
-				serieSum += s["value"]
-			self.avgValue = serieSum / len(self.serie)
-			ac.setFontColor(self.avgValueLabel,
-				self.color['r'],
-				self.color['g'],
-				self.color['b'],
-				self.color['a']
-			)
-			ac.setText(self.avgValueLabel,"{0:.3f}°".format(self.avgValue))
+			LabelState.color(self.avgValueLabel, self.color)
+			LabelState.text(self.avgValueLabel,"{0:.3f}°".format(self.avgValue))
 		except Exception:
-			ac.log("CamberExtravaganza ERROR: setValue(): %s" % traceback.format_exc())
-
+			ac.log("CamberExtravaganza ERROR: updateLabels(): %s" % traceback.format_exc())
 
 
-	def drawTire(self, suspX, suspY, suspH, flip=False):
-		global Options
 
+	# tyre is this wheel's camberlib.geometry.TyreQuad, (suspX, suspY)
+	# the body corner the suspension arms go to
+	def drawTire(self, tyre, suspX, suspY):
 		try:
-			x = self.xPosition + 25
-			y = self.yPosition
 			#~ rad = self.value * Options["radScale"]
 			#~ rad = self.value * Options["radScale"] / (2 * -Options["targetCamber"])
-			rad = self.value
-			if flip:
-				#~ x = self.xPosition + 50
-				rad = math.pi - rad
-
-			ac.glColor4f(
-				self.color['r'],
-				self.color['g'],
-				self.color['b'],
-				self.color['a']
-			)
-
-			h = Options["tireHeight"]
-			w = h / 2
-			cosrad = math.cos(rad)
-			sinrad = math.sin(rad)
-			halfpi = math.pi/2
-			if flip:
-				cosradnorm = math.cos(rad+halfpi)
-				sinradnorm = math.sin(rad+halfpi)
-				# Have to draw counterclockwise
-				ac.glBegin(acsys.GL.Quads)
-				ac.glVertex2f(x, y)
-				ac.glVertex2f(x+h*cosradnorm, y+h*sinradnorm)
-				ac.glVertex2f(x+w*cosrad+h*cosradnorm, y+w*sinrad+h*sinradnorm)
-				ac.glVertex2f(x+w*cosrad, y+w*sinrad)
-				ac.glEnd()
-			else:
-				cosradnorm = math.cos(rad-halfpi)
-				sinradnorm = math.sin(rad-halfpi)
-				# Have to draw counterclockwise
-				ac.glBegin(acsys.GL.Quads)
-				ac.glVertex2f(x, y)
-				ac.glVertex2f(x+w*cosrad, y+w*sinrad)
-				ac.glVertex2f(x+w*cosrad+h*cosradnorm, y+w*sinrad+h*sinradnorm)
-				ac.glVertex2f(x+h*cosradnorm, y+h*sinradnorm)
-				ac.glEnd()
+			tyre.update(self.value)
+
+			r, g, b, a = self.color
+			ac.glColor4f(r, g, b, a)
+
+			# Have to draw counterclockwise, TyreQuad already is
+			q = tyre.quad
+			ac.glBegin(acsys.GL.Quads)
+			ac.glVertex2f(q[0], q[1])
+			ac.glVertex2f(q[2], q[3])
+			ac.glVertex2f(q[4], q[5])
+			ac.glVertex2f(q[6], q[7])
+			ac.glEnd()
 
 			# Suspension bits
+			s = tyre.susp
+			suspH = tyre.suspH
 			ac.glColor4f(0.9, 0.9, 0.9, 0.9)
 			ac.glBegin(acsys.GL.Lines)
-			ac.glVertex2f(x+(h/2 - suspH)*cosradnorm, y+(h/2 - suspH)*sinradnorm)
+			ac.glVertex2f(s[0], s[1])
 			ac.glVertex2f(suspX, suspY + suspH)
-			ac.glVertex2f(x+(h/2 + suspH)*cosradnorm, y+(h/2 + suspH)*sinradnorm)
+			ac.glVertex2f(s[2], s[3])
 			ac.glVertex2f(suspX, suspY - suspH)
 			ac.glEnd()
 		except Exception:
@@ -193,6 +296,8 @@ class CamberIndicator:
 
 
 
+	# Only emits vertices, the caller wraps all four graphs in one
+	# glBegin(acsys.GL.Lines)/glEnd() pair
 	def drawGraph(self, flip=False):
 		global Options
 
@@ -209,7 +314,6 @@ class CamberIndicator:
 
 			halfHeight = Options["graphHeight"] / 2
 			middleHeight = Options["graphHeight"] / 4
-			ac.glBegin(acsys.GL.Lines)
 			# bottom - red
 			ac.glColor4f(1, 0, 0, 1)
 			ac.glVertex2f(x + dx1, y + halfHeight)
@@ -236,39 +340,66 @@ class CamberIndicator:
 			# middle - red
 			ac.glVertex2f(x + dx1, y + middleHeight)
 			ac.glVertex2f(x + dx2, y + middleHeight)
-			ac.glEnd()
-
-			sumPos = 1
-			sumNeg = -1
-			countPos = 1
-			countNeg = 1
 
 			scaleNeg = -(halfHeight + middleHeight) / self.minVal
 			scalePos = (halfHeight - middleHeight) / self.maxVal
 
-			for i in range(len(self.serie)):
-				#~ color = getColor(self.serie[i])
-				color = self.serie[i]["color"]
-				h = max(min(self.maxVal,self.serie[i]["value"]),self.minVal)
-				if self.serie[i]["value"] > 0:
-					sumPos += self.serie[i]["value"]
-					countPos += 1
-					h *= scalePos
-					ac.glColor4f(1, 0, 0, 1)
-				else:
-					sumNeg += self.serie[i]["value"]
-					countNeg += 1
-					h *= scaleNeg
-					ac.glColor4f(1, 1, 1, 1)
-				ac.glBegin(acsys.GL.Lines)
-				ac.glVertex2f(x + dx2 - i * f, y + middleHeight - 1)
-				ac.glColor4f(color['r'], color['g'], color['b'], color['a'])
-				ac.glVertex2f(x + dx2 - i * f, y + middleHeight - 1 + h)
-				ac.glEnd()
+			glColor4f = ac.glColor4f
+			glVertex2f = ac.glVertex2f
+			minVal = self.minVal
+			maxVal = self.maxVal
+			barX = x + dx2
+			barY = y + middleHeight - 1
+			if Options["graphMode"] == 0:
+				# Every other bar is drawn top first, so neighbouring bars
+				# meet base to base or top to top and glColor4f is only
+				# called when the colour actually changes
+				last = None
+				topFirst = False
+				for value, r, g, b, a in self.serie:
+					h = max(min(maxVal,value),minVal)
+					if value > 0:
+						base = GraphRed
+						top = barY + h * scalePos
+					else:
+						base = GraphWhite
+						top = barY + h * scaleNeg
+					color = (r, g, b, a)
+					if topFirst:
+						if color != last:
+							glColor4f(r, g, b, a)
+						glVertex2f(barX, top)
+						if base != color:
+							glColor4f(*base)
+						glVertex2f(barX, barY)
+						last = base
+					else:
+						if base != last:
+							glColor4f(*base)
+						glVertex2f(barX, barY)
+						if color != base:
+							glColor4f(r, g, b, a)
+						glVertex2f(barX, top)
+						last = color
+					topFirst = not topFirst
+					barX -= f
+			else:
+				# min to max range bar per bucket, in the bucket's mean colour
+				last = None
+				for low, high, mean, r, g, b, a in self.historyLevel():
+					low = max(min(maxVal,low),minVal)
+					high = max(min(maxVal,high),minVal)
+					color = (r, g, b, a)
+					if color != last:
+						glColor4f(r, g, b, a)
+						last = color
+					glVertex2f(barX, barY + low * (scalePos if low > 0 else scaleNeg))
+					glVertex2f(barX, barY + high * (scalePos if high > 0 else scaleNeg))
+					barX -= f
 
 			if Options["normalize"] and len(self.serie) == Options["graphWidth"]:
-				avgPos = sumPos / countPos
-				avgNeg = sumNeg / countNeg
+				avgPos = (1 + self.stats.sumPos) / (1 + self.stats.countPos)
+				avgNeg = (-1 + self.stats.sumNeg) / (1 + self.stats.countNeg)
 				self.maxVal = avgPos * 1.5
 				self.minVal = avgNeg * 1.5
 			else:
@@ -282,13 +413,24 @@ class CamberIndicator:
 			ac.log("CamberExtravaganza ERROR: drawGraph(): %s" % traceback.format_exc())
 
 
+
+	# Bucket level for the long history graph modes
+	def historyLevel(self):
+		if GraphModes[Options["graphMode"]] == "Lap":
+			lapTime = info.graphics.iLastTime / 1000
+			return self.longSerie.levelFor(lapTime if lapTime > 0 else 120)
+		return self.longSerie.session
+
+
 # This function gets called by AC when the Plugin is initialised
 # The function has to return a string with the plugin name
 def acMain(ac_version):
-	global appWindow, CamberIndicators, CheckBoxes, Buttons, Options, Labels, UIData
+	global appWindow, CamberIndicators, CheckBoxes, Buttons, Options, Labels, UIData, CompoundWatch, TyreLookup, TyreFiles, TyreReload
 
 	try:
 		loadOptions()
+		Startup.mark("options")
+		LabelState.setRate(Options["textRate"])
 		appWindow = ac.newApp("CamberExtravaganza")
 		ac.setSize(appWindow, 200, 200)
 		ac.drawBorder(appWindow, 0)
@@ -330,7 +472,13 @@ def acMain(ac_version):
 			["drawGraphs", "Draw Graphs", drawGraphsHandler],
 			["normalize", "Normalize", normalizeHandler],
 			["useSpectrum", "Use Spectrum", useSpectrumHandler],
-			["showDelta", "Show Delta", showDeltaHandler]
+			["showDelta", "Show Delta", showDeltaHandler],
+			["graphMode", "History: " + GraphModes[Options["graphMode"]], graphModeHandler],
+			["fullGripCurve", "Full Grip Curve", fullGripCurveHandler],
+			["record", "Record", recordHandler],
+			["profile", "Profile", profileHandler],
+			["multiCar", "All Cars", multiCarHandler],
+			["trackMap", "Track Map", trackMapHandler]
 		]
 		x = 50
 		y = 255
@@ -343,14 +491,56 @@ def acMain(ac_version):
 			ac.setVisible(Buttons[d[0]], 0)
 			y += dy
 
-		# Get optimal camber from files
-		loadTireData()
+		# Profile panel, one line per stage plus total
+		Labels["profile"] = []
+		y = 255
+		for i in range(len(ProfileStages) + 2):
+			label = ac.addLabel(appWindow, "")
+			ac.setPosition(label, 160, y)
+			ac.setCustomFont(label, customFont, 0, 0)
+			ac.setFontSize(label, 12)
+			ac.setVisible(label, 0)
+			Labels["profile"].append(label)
+			y += 16
+
+		# All cars panel, under the profile panel
+		Labels["field"] = []
+		y += 8
+		for i in range(FieldRows + 1):
+			label = ac.addLabel(appWindow, "")
+			ac.setPosition(label, 160, y)
+			ac.setCustomFont(label, customFont, 0, 0)
+			ac.setFontSize(label, 12)
+			ac.setVisible(label, 0)
+			Labels["field"].append(label)
+			y += 16
+
+		Solver.mode = FULL_CURVE if Options["fullGripCurve"] else CLOSED_FORM
+		Startup.mark("window")
 
 		CamberIndicators["FL"] = CamberIndicator(appWindow, 15, 75)
 		CamberIndicators["FR"] = CamberIndicator(appWindow,135, 75)
 		CamberIndicators["RL"] = CamberIndicator(appWindow, 15,175)
 		CamberIndicators["RR"] = CamberIndicator(appWindow,135,175)
 		ac.addRenderCallback(appWindow, onFormRender)
+		Startup.mark("indicators")
+
+		# Get optimal camber from files, the lookup thread loads them and
+		# onFormRender picks the result up a few frames in
+		CompoundWatch = CompoundTracker(readTyreCompound)
+		TyreLookup = AsyncLookup(resolveTyreData, ac.log)
+		TyreFiles = tyredata.TyreSources(os.path.join(os.path.dirname(__file__), "tyres_data"), ac.log)
+		TyreReload = AsyncLookup(reloadTyreData, ac.log)
+		loadTireData()
+		Startup.mark("tyre data request")
+
+		startSampler()
+		startStream()
+		if Options["multiCar"]:
+			startField()
+		if Options["trackMap"]:
+			startTrackMap()
+		Startup.mark("threads")
 
 	except Exception:
 		ac.log("CamberExtravaganza ERROR: acMain(): %s" % traceback.format_exc())
@@ -358,34 +548,55 @@ def acMain(ac_version):
 	return "CamberExtravaganza"
 
 
+# Called by AC when the game shuts down
+def acShutdown():
+	try:
+		stopSampler()
+		stopRecorder()
+		stopStream()
+		stopTrackMap()
+		if OptionsFile is not None:
+			OptionsFile.flush()
+	except Exception:
+		ac.log("CamberExtravaganza ERROR: acShutdown(): %s" % traceback.format_exc())
+
+
 def onFormRender(deltaT):
-	global CamberIndicators, Options, Labels, redrawText
+	global CamberIndicators, Options, Labels, redrawText, FocusedCar, TyreReloadTimer
 
 	try:
 		if not doRender:
 			return
 
-		ac.glColor4f(0.9, 0.9, 0.9, 0.9)
+		prof = Profiler
+		if prof is not None:
+			prof.begin()
+
 		#~ ac.setText(Labels["targetCamberF"], "{0:.1f}°".format(Options["targetCamber"]))
 
+		# Tyre radii aren't in the static page until the car is loaded
+		layout = Layout
+		if layout is None:
+			layout = updateLayout()
+			if layout is None:
+				return
+
+		samples, (flC, frC, rlC, rrC), (flL, frL, rlL, rrL), (w,x,y,z) = readTelemetry(deltaT)
+		if prof is not None:
+			prof.mark("telemetry")
+
 		# Suspension travel to find body position relative to tires
-		#~ pixelsPerMeterF = Options["tireHeight"] / Options["tireRadiusF"]
-		#~ pixelsPerMeterR = Options["tireHeight"] / Options["tireRadiusR"]
-		pixelsPerMeterF = Options["tireHeight"] / info.static.tyreRadius[0]
-		pixelsPerMeterR = Options["tireHeight"] / info.static.tyreRadius[2]
-		w,x,y,z = ac.getCarState(0, acsys.CS.SuspensionTravel)
-		dyFL = w * pixelsPerMeterF
-		dyFR = x * pixelsPerMeterF
-		dyRL = y * pixelsPerMeterR
-		dyRR = z * pixelsPerMeterR
-
-		# Draw front "car body"
-		xFR = CamberIndicators["FR"].xPosition
-		xFL = CamberIndicators["FL"].xPosition + Options["tireHeight"]
-		y = CamberIndicators["FR"].yPosition - Options["tireHeight"] / 2
-		yFL = y + dyFL
-		yFR = y + dyFR
-		h = Options["tireHeight"] / 4
+		xFL = layout.xFL
+		xFR = layout.xFR
+		yFL = layout.yF + w * layout.pixelsPerMeterF
+		yFR = layout.yF + x * layout.pixelsPerMeterF
+		xRL = layout.xRL
+		xRR = layout.xRR
+		yRL = layout.yR + y * layout.pixelsPerMeterR
+		yRR = layout.yR + z * layout.pixelsPerMeterR
+		h = layout.h
+
+		# Draw front and rear "car body"
 		ac.glColor4f(0.9, 0.9, 0.9, 0.9)
 		ac.glBegin(acsys.GL.Lines)
 		ac.glVertex2f(xFL, yFL + h)
@@ -396,17 +607,6 @@ def onFormRender(deltaT):
 		ac.glVertex2f(xFL, yFL - h)
 		ac.glVertex2f(xFL, yFL - h)
 		ac.glVertex2f(xFL, yFL + h)
-		ac.glEnd()
-
-		# Draw rear "car body"
-		xRR = CamberIndicators["RR"].xPosition
-		xRL = CamberIndicators["RL"].xPosition + Options["tireHeight"]
-		y = CamberIndicators["RR"].yPosition - Options["tireHeight"] / 2
-		yRL = y + dyRL
-		yRR = y + dyRR
-		h = Options["tireHeight"] / 4
-		ac.glColor4f(0.9, 0.9, 0.9, 0.9)
-		ac.glBegin(acsys.GL.Lines)
 		ac.glVertex2f(xRL, yRL + h)
 		ac.glVertex2f(xRR, yRR + h)
 		ac.glVertex2f(xRR, yRR + h)
@@ -416,72 +616,115 @@ def onFormRender(deltaT):
 		ac.glVertex2f(xRL, yRL - h)
 		ac.glVertex2f(xRL, yRL + h)
 		ac.glEnd()
+		if prof is not None:
+			prof.mark("body")
 
 		# Draw flappy gauges
-		h *= 0.75
-		CamberIndicators["FL"].drawTire(xFL, yFL, h, flip=True)
-		CamberIndicators["FR"].drawTire(xFR, yFR, h)
-		CamberIndicators["RL"].drawTire(xRL, yRL, h, flip=True)
-		CamberIndicators["RR"].drawTire(xRR, yRR, h)
+		tyres = layout.tyres
+		CamberIndicators["FL"].drawTire(tyres["FL"], xFL, yFL)
+		CamberIndicators["FR"].drawTire(tyres["FR"], xFR, yFR)
+		CamberIndicators["RL"].drawTire(tyres["RL"], xRL, yRL)
+		CamberIndicators["RR"].drawTire(tyres["RR"], xRR, yRR)
+		if prof is not None:
+			prof.mark("tires")
 
 		# Draw history graphs
 		if Options["drawGraphs"]:
+			ac.glBegin(acsys.GL.Lines)
 			CamberIndicators["FL"].drawGraph(flip=True)
 			CamberIndicators["FR"].drawGraph()
 			CamberIndicators["RL"].drawGraph(flip=True)
 			CamberIndicators["RR"].drawGraph()
+			ac.glEnd()
+		if Segments is not None:
+			drawTrackMap()
+		if prof is not None:
+			prof.mark("graphs")
+
+		# Physics hasn't stepped (paused), nothing new for the history
+		if not samples:
+			if prof is not None:
+				endProfile(prof, deltaT)
+			return
 
-		flC, frC, rlC, rrC = ac.getCarState(0, acsys.CS.CamberRad)
-		CamberIndicators["FL"].setValue(flC, deltaT, Options["optimalCamberF"])
-		CamberIndicators["FR"].setValue(frC, deltaT, Options["optimalCamberF"])
-		CamberIndicators["RL"].setValue(rlC, deltaT, Options["optimalCamberR"])
-		CamberIndicators["RR"].setValue(rrC, deltaT, Options["optimalCamberR"])
-
-		# Check if tyre compound changed
-		tyreCompound = ac.getCarTyreCompound(0)
-		if tyreCompound != Options["tyreCompound"]:
-			loadTireData()
-			Options["tyreCompound"] = tyreCompound
-
-		# Weight Front and Rear by lateral weight transfer
-		filter = 0.97
-		flL, frL, rlL, rrL = ac.getCarState(0, acsys.CS.Load)
-
-		outer = max(0.001, flL, frL)
-		inner = min(flL, frL)
-		cf_outer = CamberIndicators["FL"].avgValue if outer == flL else CamberIndicators["FR"].avgValue
-		camberSplit = abs(flC - frC)
-		# DY_LS_FL = DY_REF * pow(TIRE_LOAD_FL / FZ0, LS_EXPY)
-		ls_outer = pow(outer, Options["LS_EXPYF"])
-		ls_inner = pow(inner, Options["LS_EXPYF"])
-		weightXfer = ls_outer / (ls_inner + ls_outer)
-		# (2*(1-w)*D1*rad(c)-(1-2*w)*D0)/(2*D1)
-		oldTargetCamber = Options["optimalCamberF"]
-		#~ Options["optimalCamberF"] = math.degrees((2 * (1 - weightXfer) * Options["dcamber1F"] * math.radians(camberSplit) - (1 - 2 * weightXfer) * Options["dcamber0F"]) / (2 * Options["dcamber1F"]))
-		Options["optimalCamberF"] = optimalCamber(weightXfer, Options["dcamber0F"], Options["dcamber1F"], camberSplit)
-		Options["optimalCamberF"] = filter * oldTargetCamber + (1 - filter) * Options["optimalCamberF"]
-
-		outer = max(0.001, rlL, rrL)
-		inner = min(rlL, rrL)
-		cr_outer = CamberIndicators["RL"].avgValue if outer == rlL else CamberIndicators["RR"].avgValue
-		camberSplit = abs(rlC - rrC)
-		# DY_LS_FL = DY_REF * pow(TIRE_LOAD_FL / FZ0, LS_EXPY)
-		ls_outer = pow(outer, Options["LS_EXPYR"])
-		ls_inner = pow(inner, Options["LS_EXPYR"])
-		weightXfer = ls_outer / (ls_inner + ls_outer)
-		# (2*(1-w)*D1*rad(c)-(1-2*w)*D0)/(2*D1)
-		oldTargetCamber = Options["optimalCamberR"]
-		#~ Options["optimalCamberR"] = math.degrees((2 * (1 - weightXfer) * Options["dcamber1R"] * math.radians(camberSplit) - (1 - 2 * weightXfer) * Options["dcamber0R"]) / (2 * Options["dcamber1R"]))
-		Options["optimalCamberR"] = optimalCamber(weightXfer, Options["dcamber0R"], Options["dcamber1R"], camberSplit)
-		Options["optimalCamberR"] = filter * oldTargetCamber + (1 - filter) * Options["optimalCamberR"]
-
-		degFront = Options["optimalCamberF"]
-		degRear = Options["optimalCamberR"]
-		if Options["showDelta"]:
-			degFront -= cf_outer
-			degRear -= cr_outer
-		ac.setText(Labels["targetCamberF"], "{0:+.1f}°".format(degFront))
-		ac.setText(Labels["targetCamberR"], "{0:+.1f}°".format(degRear))
+		optimalF = Options["optimalCamberF"]
+		optimalR = Options["optimalCamberR"]
+		elapsed = 0.0
+		for t, dt, camber, load, travel in samples:
+			elapsed += dt
+			CamberIndicators["FL"].addSample(camber[0], dt, optimalF)
+			CamberIndicators["FR"].addSample(camber[1], dt, optimalF)
+			CamberIndicators["RL"].addSample(camber[2], dt, optimalR)
+			CamberIndicators["RR"].addSample(camber[3], dt, optimalR)
+		if Recorder is not None:
+			tyreCompound = Options["tyreCompound"]
+			lap = info.graphics.completedLaps
+			for t, dt, camber, load, travel in samples:
+				Recorder.record(dt, camber, load, travel, optimalF, optimalR, tyreCompound, lap)
+		if Stream is not None:
+			t, dt, camber, load, travel = samples[-1]
+			Stream.publish(camber, load, (optimalF, optimalR), (CamberIndicators["FL"].color,
+				CamberIndicators["FR"].color, CamberIndicators["RL"].color, CamberIndicators["RR"].color))
+		if Segments is not None and abs(optimalF) < SETTLED and abs(optimalR) < SETTLED:
+			updateTrackMap(samples, optimalF, optimalR)
+		if prof is not None:
+			prof.mark("history")
+		refreshLabels = LabelState.due(deltaT)
+		if refreshLabels:
+			for key, indicator in CamberIndicators.items():
+				indicator.updateLabels()
+		if prof is not None:
+			prof.mark("labels")
+
+		# Check if tyre compound changed, a few times a second, and
+		# swap in the new tyre data whenever the lookup finishes
+		tyreKey = CompoundWatch.changed(deltaT)
+		if tyreKey is not None:
+			FocusedCar, tyreCompound = tyreKey
+			TyreLookup.request(ac.getCarName(FocusedCar), tyreCompound)
+		tyreData = TyreLookup.poll()
+		if tyreData is not None:
+			applyTyreData(tyreData)
+			if Startup is not None:
+				reportStartup()
+
+		# Pick up edited tyres_data files, checked and parsed off-thread
+		TyreReloadTimer += deltaT
+		if TyreReloadTimer >= TyreReloadInterval:
+			TyreReloadTimer = 0.0
+			TyreReload.request()
+		reloaded = TyreReload.poll()
+		if reloaded is not None:
+			applyTyreReload(reloaded)
+		if prof is not None:
+			prof.mark("compound")
+
+		# Weight Front and Rear by lateral weight transfer, once a frame
+		# for the physics time the samples covered
+		Options["optimalCamberF"], Options["optimalCamberR"] = Solver.step(
+			(flL, frL, rlL, rrL),
+			(flC, frC, rlC, rrC),
+			elapsed
+		)
+		if refreshLabels:
+			degFront = Options["optimalCamberF"]
+			degRear = Options["optimalCamberR"]
+			if Options["showDelta"]:
+				degFront -= CamberIndicators["FL" if Solver.outer[0] == 0 else "FR"].avgValue
+				degRear -= CamberIndicators["RL" if Solver.outer[1] == 2 else "RR"].avgValue
+			LabelState.text(Labels["targetCamberF"], "{0:+.1f}°".format(degFront))
+			LabelState.text(Labels["targetCamberR"], "{0:+.1f}°".format(degRear))
+		if prof is not None:
+			prof.mark("solver")
+
+		if Field is not None:
+			Field.step(time.perf_counter())
+			updateField(deltaT)
+			if prof is not None:
+				prof.mark("field")
+
+		if prof is not None:
+			endProfile(prof, deltaT)
 
 		if redrawText:
 			updateTextInputs()
@@ -491,43 +734,311 @@ def onFormRender(deltaT):
 		ac.log("CamberExtravaganza ERROR: onFormRender(): %s" % traceback.format_exc())
 
 
-def optimalCamber(weightXfer, dcamber0, dcamber1, camberSplit):
-	if Options["carNotFound"]:
-		return 99
-	if dcamber0 == 0 or dcamber1 == 0:
-		return 0
-	return math.degrees((2 * (1 - weightXfer) * dcamber1 * camberSplit - (1 - 2 * weightXfer) * dcamber0) / (2 * dcamber1))
-
-
-def getColor(value, optimal):
-	global Options
-	color = {}
-	scale = 0.5 # adjusts width of green, calculate this better later
-	d = (value - optimal) * scale
-	if Options["useSpectrum"] is True:
-		H = max(0, min(1, 0.6 - d)) * 0.625  # 0.625 = hue 225°, #0040FF
-		S = 0.9
-		B = 0.9
-		c = colorsys.hsv_to_rgb(H, S, B)
-		color = {'r':c[0],'g':c[1],'b':c[2],'a':Options["alpha"]}
+# Returns (samples, camber, load, suspension travel) for car 0, where
+# samples is every (time, dt, camber, load, travel) step to add to the
+# history since the last frame.  While live or paused it comes from the
+# physics page, through the sampler thread if there is one, and samples
+# is empty until physics steps.  Otherwise (replays, or another car in
+# focus, which the physics page doesn't cover) from ac.getCarState.
+# A frame without a new step passes its deltaT on to the next sample
+# while live, so dt always adds up to the time physics covered, unless
+# physics has stalled for longer than STALL, which is a pause.
+def readTelemetry(deltaT):
+	global Telemetry, LastSnapshot, PhysicsWait
+	if FocusedCar == 0 and (info.graphics.status == AC_LIVE or info.graphics.status == AC_PAUSE):
+		if Sampler is not None:
+			samples = Sampler.drain()
+			if samples:
+				LastSnapshot = samples[-1]
+			return samples, LastSnapshot[2], LastSnapshot[3], LastSnapshot[4]
+
+		if Telemetry is None:
+			Telemetry = PhysicsReader(info._acpmf_physics, SPageFilePhysics)
+		if not Telemetry.read():
+			PhysicsWait += deltaT
+			if info.graphics.status != AC_LIVE or PhysicsWait > STALL:
+				PhysicsWait = 0.0
+			return [], Telemetry.camber, Telemetry.load, Telemetry.travel
+		snapshot = (None, deltaT + PhysicsWait, Telemetry.camber, Telemetry.load, Telemetry.travel)
+		PhysicsWait = 0.0
 
 	else:
-		if value > 0:
-			color = {'r':1,'g':0,'b':0,'a':Options["alpha"]}
-		elif d > 1.0:
-			color = {'r':1,'g':0,'b':0,'a':Options["alpha"]}
-		elif d > 0.5:
-			color = {'r':1,'g':0.5,'b':0,'a':Options["alpha"]}
-		elif d > 0.2:
-			color = {'r':1,'g':1,'b':0,'a':Options["alpha"]}
-		elif d > -0.2:
-			color = {'r':0,'g':1,'b':0,'a':Options["alpha"]}
-		elif d > -0.5:
-			color = {'r':0,'g':1,'b':1,'a':Options["alpha"]}
-		else:
-			color = {'r':0,'g':0,'b':1,'a':Options["alpha"]}
-
-	return color
+		# Nothing from the sampler is for this car or moment, don't let
+		# it pile up and be replayed once car 0 is live again
+		if Sampler is not None:
+			Sampler.drain()
+		snapshot = (None, deltaT,
+			ac.getCarState(FocusedCar, acsys.CS.CamberRad),
+			ac.getCarState(FocusedCar, acsys.CS.Load),
+			ac.getCarState(FocusedCar, acsys.CS.SuspensionTravel)
+		)
+	return [snapshot], snapshot[2], snapshot[3], snapshot[4]
+
+
+def startSampler():
+	global Sampler
+	if Options["sampleRate"] > 0 and Sampler is None:
+		reader = PhysicsReader(info._acpmf_physics, SPageFilePhysics)
+		Sampler = TelemetrySampler(reader, Options["sampleRate"], log=ac.log)
+		Sampler.start()
+
+
+def stopSampler():
+	global Sampler
+	if Sampler is not None:
+		Sampler.stop()
+		Sampler = None
+
+
+# Closes the profiled frame, refreshes the panel every ProfileInterval
+def endProfile(prof, deltaT):
+	global ProfileRefresh
+	prof.end()
+	ProfileRefresh += deltaT
+	if ProfileRefresh >= ProfileInterval:
+		ProfileRefresh = 0.0
+		lines = ["{0:10s} {1:>7s} {2:>7s} {3:>7s}".format("us", "p50", "p99", "max")] + prof.report()
+		for label, line in zip(Labels["profile"], lines):
+			LabelState.text(label, line)
+
+
+def startProfiler():
+	global Profiler, ProfileRefresh
+	Profiler = StageProfiler(ProfileStages)
+	ProfileRefresh = ProfileInterval
+	for label in Labels["profile"]:
+		ac.setVisible(label, 1)
+
+
+def stopProfiler():
+	global Profiler
+	if Profiler is not None:
+		ac.log("CamberExtravaganza: Profile over the last %d frames, p50/p99/max us" % min(Profiler.frames, Profiler.window))
+		for line in Profiler.report():
+			ac.log("CamberExtravaganza:   " + line)
+		Profiler = None
+	for label in Labels["profile"]:
+		ac.setVisible(label, 0)
+
+
+def startField():
+	global Field, FieldNames, FieldRefresh
+	if Field is None:
+		cars = ac.getCarsCount()
+		FieldNames = [""] * cars
+		Field = lazy.optional("camberlib.field").FieldTracker(cars, readFieldCar, resolveFieldCar)
+		FieldRefresh = ProfileInterval
+		for label in Labels["field"]:
+			ac.setVisible(label, 1)
+
+
+def stopField():
+	global Field
+	Field = None
+	for label in Labels["field"]:
+		ac.setVisible(label, 0)
+
+
+def readFieldCar(car):
+	return ac.getCarState(car, acsys.CS.CamberRad), ac.getCarState(car, acsys.CS.Load)
+
+
+def resolveFieldCar(car):
+	FieldNames[car] = ac.getDriverName(car)
+	if TyreIndex is None:
+		return None
+	return tyredata.lookup(TyreIndex, ac.getCarName(car), ac.getCarTyreCompound(car))
+
+
+# Lists the cars furthest from optimal every ProfileInterval, optimal
+# minus the outer wheel per axle, like Show Delta
+def updateField(deltaT):
+	global FieldRefresh, FieldNames
+	FieldRefresh += deltaT
+	if FieldRefresh < ProfileInterval:
+		return
+	FieldRefresh = 0.0
+
+	cars = ac.getCarsCount()
+	if cars != Field.count:
+		Field.resize(cars)
+		FieldNames = [""] * Field.count
+
+	rows = []
+	for car in range(Field.count):
+		if Field.params[car]:
+			front, rear = Field.delta(car)
+			rows.append((max(abs(front), abs(rear)), car, front, rear))
+	rows.sort(reverse=True)
+	lines = ["{0:14s} {1:>6s} {2:>6s}".format("delta", "F", "R")]
+	for worst, car, front, rear in rows[:FieldRows]:
+		marker = ">" if car == FocusedCar else " "
+		lines.append("{0}{1:13.13s} {2:+6.1f} {3:+6.1f}".format(marker, FieldNames[car], front, rear))
+	lines += [""] * (len(Labels["field"]) - len(lines))
+	for label, line in zip(Labels["field"], lines):
+		LabelState.text(label, line)
+
+
+def startTrackMap():
+	global Segments, SegmentsCar, SegmentColors, TrackMapRuns
+	Segments = lazy.optional("camberlib.segments").TrackStats()
+	SegmentsCar = FocusedCar
+	SegmentColors = [None] * (Segments.segments * 4)
+	TrackMapRuns = [[] for wheel in range(4)]
+
+
+# Logs time in each colour per wheel and the segments where the outer
+# wheel was furthest from optimal
+def stopTrackMap():
+	global Segments
+	if Segments is None:
+		return
+	session = Segments.session
+	ac.log("CamberExtravaganza: Track map, time blue/green/red")
+	for wheel, key in enumerate(("FL", "FR", "RL", "RR")):
+		blue, green, red = session.totals(wheel)
+		total = blue + green + red
+		if total > 0:
+			ac.log("CamberExtravaganza:   %s %3.0f%% %3.0f%% %3.0f%% of %.0f s" % (key, 100 * blue / total, 100 * green / total, 100 * red / total, total))
+	for axle, key in enumerate(("Front", "Rear")):
+		rows = []
+		for segment in range(Segments.segments):
+			outer = session.outerMean(segment, axle)
+			if outer is not None:
+				optimal = session.optimalMean(segment, axle)
+				rows.append((abs(optimal - outer), segment, outer, optimal))
+		rows.sort(reverse=True)
+		for worst, segment, outer, optimal in rows[:3]:
+			ac.log("CamberExtravaganza:   %s at %2.0f%% of the lap, outer %+.2f° optimal %+.2f°" % (key, 100.0 * segment / Segments.segments, outer, optimal))
+	Segments = None
+
+
+# Normalized position of the focused car, from the graphics page for
+# car 0 like the recorder
+def readTrackPosition():
+	if FocusedCar == 0:
+		return info.graphics.normalizedCarPosition
+	return ac.getCarState(FocusedCar, acsys.CS.NormalizedSplinePosition)
+
+
+# Adds the frame's samples to their track segment and recolours only
+# the segments they touched
+def updateTrackMap(samples, optimalF, optimalR):
+	global TrackMapPosition
+	if FocusedCar != SegmentsCar:
+		startTrackMap()
+	position = readTrackPosition()
+	TrackMapPosition = position
+	degrees = math.degrees
+	segment = last = -1
+	changed = set()
+	for t, dt, camber, load, travel in samples:
+		segment = Segments.add(position, dt,
+			(degrees(camber[0]), degrees(camber[1]), degrees(camber[2]), degrees(camber[3])),
+			load, optimalF, optimalR)
+		if segment != last:
+			colorSegment(last, changed)
+			last = segment
+	colorSegment(segment, changed)
+	for wheel in changed:
+		buildTrackMap(wheel)
+
+
+# Adds the wheels whose colour in the segment changed to changed
+def colorSegment(segment, changed):
+	if segment < 0:
+		return
+	session = Segments.session
+	for wheel in range(4):
+		i = segment * 4 + wheel
+		color = getColor(session.mean[i], session.optimalMean(segment, wheel // 2))
+		if color is not SegmentColors[i]:
+			SegmentColors[i] = color
+			changed.add(wheel)
+
+
+# One quad per run of segments of the same colour, unvisited ones left out
+def buildTrackMap(wheel):
+	runs = []
+	segments = Segments.segments
+	width = float(TrackMapWidth) / segments
+	y0 = TrackMapY + wheel * (TrackMapRow + 1)
+	y1 = y0 + TrackMapRow
+	colors = SegmentColors[wheel::4]
+	start = 0
+	for segment in range(1, segments + 1):
+		color = colors[start]
+		if segment < segments and colors[segment] is color:
+			continue
+		if color is not None:
+			runs.append((start * width, segment * width, y0, y1, color))
+		start = segment
+	TrackMapRuns[wheel] = runs
+
+
+def drawTrackMap():
+	ac.glBegin(acsys.GL.Quads)
+	for runs in TrackMapRuns:
+		for x0, x1, y0, y1, (r, g, b, a) in runs:
+			ac.glColor4f(r, g, b, a)
+			ac.glVertex2f(x0, y0)
+			ac.glVertex2f(x1, y0)
+			ac.glVertex2f(x1, y1)
+			ac.glVertex2f(x0, y1)
+	ac.glEnd()
+	x = TrackMapPosition * TrackMapWidth
+	ac.glColor4f(1, 1, 1, 1)
+	ac.glBegin(acsys.GL.Lines)
+	ac.glVertex2f(x, TrackMapY - 2)
+	ac.glVertex2f(x, TrackMapY + 4 * (TrackMapRow + 1) + 1)
+	ac.glEnd()
+
+
+def startRecorder():
+	global Recorder
+	if Recorder is None:
+		sessionDir = os.path.join(os.path.dirname(__file__), "sessions")
+		if not os.path.isdir(sessionDir):
+			os.makedirs(sessionDir)
+		carName = ac.getCarName(0)
+		path = os.path.join(sessionDir, carName + time.strftime("_%Y%m%d_%H%M%S.cxlog"))
+		Recorder = lazy.optional("camberlib.recorder").SessionRecorder(path, carName, log=ac.log)
+		Recorder.start()
+		ac.log("CamberExtravaganza: Recording to " + path)
+
+
+def stopRecorder():
+	global Recorder
+	if Recorder is not None:
+		Recorder.stop()
+		if Recorder.dropped:
+			ac.log("CamberExtravaganza ERROR: Recorder dropped %d samples" % Recorder.dropped)
+		Recorder = None
+
+
+def startStream():
+	global Stream
+	if Options["streamPort"] > 0 and Stream is None:
+		stream = lazy.optional("camberlib.stream").TelemetryStream(Options["streamPort"], Options["streamProtocol"], Options["streamFormat"], log=ac.log)
+		if stream.start():
+			Stream = stream
+			ac.log("CamberExtravaganza: Streaming %s on 127.0.0.1:%d" % (Options["streamProtocol"], stream.port))
+
+
+def stopStream():
+	global Stream
+	if Stream is not None:
+		Stream.stop()
+		Stream = None
+
+
+# Returns a shared (r, g, b, a) tuple, the table is only rebuilt
+# when alpha or the palette changes
+def getColor(value, optimal):
+	global Options, ColorLUT
+	if ColorLUT is None or not ColorLUT.matches(Options["alpha"], Options["useSpectrum"]):
+		ColorLUT = ColorTable(Options["alpha"], Options["useSpectrum"])
+	return ColorLUT.color(value, optimal)
 
 
 def uiHandler(*args, name, type):
@@ -536,6 +1047,11 @@ def uiHandler(*args, name, type):
 		Options[name] = not Options[name]
 		updateButtons()
 		saveOptions()
+	elif type == "Cycle":
+		Options[name] = (Options[name] + 1) % len(GraphModes)
+		ac.setText(Buttons[name], "History: " + GraphModes[Options[name]])
+		updateButtons()
+		saveOptions()
 	elif type == "TextInput":
 		Options[name] = args[0]
 		redrawText = True
@@ -576,6 +1092,45 @@ def showDeltaHandler(*args):
 	else:
 		ac.setText(Labels["target"], "Target:")
 
+def graphModeHandler(*args):
+	uiHandler(args[0], args[1], name="graphMode", type="Cycle")
+
+def fullGripCurveHandler(*args):
+	uiHandler(args[0], args[1], name="fullGripCurve", type="Button")
+	Solver.mode = FULL_CURVE if Options["fullGripCurve"] else CLOSED_FORM
+	if Options["fullGripCurve"] and OptimalTables is None:
+		loadTireData()  # and the tables, on the lookup thread
+
+def profileHandler(*args):
+	uiHandler(args[0], args[1], name="profile", type="Button")
+	if Options["profile"]:
+		startProfiler()
+	else:
+		stopProfiler()
+
+def multiCarHandler(*args):
+	uiHandler(args[0], args[1], name="multiCar", type="Button")
+	if Options["multiCar"]:
+		startField()
+	else:
+		stopField()
+	# Back to car 0 (or on to the focused car) at the next compound check
+	CompoundWatch.reset(None)
+
+def trackMapHandler(*args):
+	uiHandler(args[0], args[1], name="trackMap", type="Button")
+	if Options["trackMap"]:
+		startTrackMap()
+	else:
+		stopTrackMap()
+
+def recordHandler(*args):
+	uiHandler(args[0], args[1], name="record", type="Button")
+	if Options["record"]:
+		startRecorder()
+	else:
+		stopRecorder()
+
 
 # Make sure button toggled state matches internal state
 def updateButtons():
@@ -591,14 +1146,32 @@ def updateButtons():
 			ac.setBackgroundOpacity(button, 1)
 
 
-def parseTyreData(carName, tyreCompound, tyreData):
-	global Options
-
-	try:
-		dcamber0F = tyreData[carName]['FRONT'][tyreCompound]["DCAMBER_0"]
-		dcamber1F = tyreData[carName]['FRONT'][tyreCompound]["DCAMBER_1"]
-		dcamber0R = tyreData[carName]['REAR'][tyreCompound]["DCAMBER_0"]
-		dcamber1R = tyreData[carName]['REAR'][tyreCompound]["DCAMBER_1"]
+# Returns (carName, tyreCompound, axles, tables) for applyTyreData, where
+# axles is None if there's no data.  Runs on the lookup thread, where
+# the first lookup loads the index, and the tables in full grip curve
+# mode, so acMain doesn't wait for either.
+def resolveTyreData(carName, tyreCompound, tyreIndex=None):
+	if tyreIndex is None:
+		tyreIndex = loadTyreIndex()
+	if Options["fullGripCurve"] and OptimalTables is None:
+		loadOptimalTables()
+	axles = tyredata.lookup(tyreIndex, carName, tyreCompound)
+	tables = None
+	if axles is not None and OptimalTables is not None and carName not in StaleTables:
+		tables = OptimalTables.lookup(carName, tyreCompound)
+	return carName, tyreCompound, axles, tables
+
+
+# Render thread side, switches everything over to one lookup's result
+def applyTyreData(tyreData):
+	global Options, Layout
+
+	carName, tyreCompound, axles, tables = tyreData
+	# Tyre radii change with the car and compound, rebuilt next frame
+	Layout = None
+	Options["tyreCompound"] = tyreCompound
+	if axles is not None:
+		(dcamber0F, dcamber1F, LS_EXPYF), (dcamber0R, dcamber1R, LS_EXPYR) = axles
 		if dcamber1F == 0:
 			Options["targetCamberF"] = 0
 		else:
@@ -611,12 +1184,16 @@ def parseTyreData(carName, tyreCompound, tyreData):
 		Options["dcamber1F"] = dcamber1F
 		Options["dcamber0R"] = dcamber0R
 		Options["dcamber1R"] = dcamber1R
-		Options["LS_EXPYF"] = tyreData[carName]['FRONT'][tyreCompound]["LS_EXPY"]
-		Options["LS_EXPYR"] = tyreData[carName]['REAR'][tyreCompound]["LS_EXPY"]
+		Options["LS_EXPYF"] = LS_EXPYF
+		Options["LS_EXPYR"] = LS_EXPYR
+		Solver.setParams(axles[0], axles[1], tables)
 
+		if Options["carNotFound"]:
+			Options["carNotFound"] = False
+			ac.setText(Labels["target"], "Delta:" if Options["showDelta"] else "Target:")
 		ac.log("CamberExtravaganza: Tyre data found for " + carName + " " + tyreCompound)
 
-	except KeyError:
+	else:
 		Options["targetCamberF"] = -999
 		Options["targetCamberR"] = -999
 		Options["dcamber0F"] = 999
@@ -626,53 +1203,139 @@ def parseTyreData(carName, tyreCompound, tyreData):
 		Options["LS_EXPYF"] = 1
 		Options["LS_EXPYR"] = 1
 		Options["carNotFound"] = True
+		Solver.setParams(None, None)
 
 		ac.setText(Labels["target"], "Unrecognized Car")
 		ac.log("CamberExtravaganza ERROR: loadTireData: No tyre data found for this car")
 
 
-# Load DCAMBERs and RADIUS
+# Read every tyres_data/*.json once, or reuse the cached index.
+# Lookup thread only, other threads treat None as not loaded yet.
+def loadTyreIndex():
+	global TyreIndex
+	if TyreIndex is None:
+		startup = Startup
+		t = time.perf_counter()
+		appDir = os.path.dirname(__file__)
+		TyreIndex = tyredata.loadIndex(
+			os.path.join(appDir, "tyres_data"),
+			os.path.join(appDir, "tyres_data.cache"),
+			ac.log
+		)
+		if startup is not None:
+			startup.add("tyre index", time.perf_counter() - t)
+	return TyreIndex
+
+
+# Runs on the reload thread.  Returns (index, changed car names) if any
+# car's tyre data changed since TyreIndex was loaded, else None.  The
+# first call reads every file, later ones only what changed on disk.
+def reloadTyreData():
+	if TyreIndex is None:
+		return None
+	cars = TyreFiles.refresh()
+	if not cars:
+		return None
+	index = TyreFiles.index
+	changed = tyredata.changedCars(TyreIndex, index, cars)
+	if not changed:
+		return None
+	try:
+		tyredata.writeCache(os.path.join(os.path.dirname(__file__), "tyres_data.cache"), index, TyreFiles.signature())
+	except (IOError, OSError):
+		ac.log("CamberExtravaganza ERROR: Could not write tyre data cache")
+	ac.log("CamberExtravaganza: Tyre data changed for " + ", ".join(sorted(changed)))
+	return index, changed
+
+
+# Render thread side, swaps the new index in and looks the shown car
+# up again.  Changed cars solve the full curve directly until the
+# tables are rebuilt, at the next start.
+def applyTyreReload(reloaded):
+	global TyreIndex, StaleTables
+	index, changed = reloaded
+	TyreIndex = index
+	if OptimalTables is not None:
+		StaleTables = StaleTables | changed
+	TyreLookup.request(ac.getCarName(FocusedCar), Options["tyreCompound"])
+	if Field is not None:
+		for car in range(Field.count):
+			Field.invalidate(car)
+
+
+# Body and tyre geometry for the current car and tireHeight, None while
+# the static page has no tyre radii yet
+def updateLayout():
+	global Layout
+	tyreRadius = info.static.tyreRadius
+	if tyreRadius[0] <= 0 or tyreRadius[2] <= 0:
+		return None
+	positions = {}
+	for key, indicator in CamberIndicators.items():
+		positions[key] = (indicator.xPosition, indicator.yPosition)
+	Layout = CarLayout(positions, Options["tireHeight"], tyreRadius)
+	return Layout
+
+
+# Full grip curve tables for every car, only needed in that mode.
+# Rebuilt (about half a second) only when tyres_data changes.
+def loadOptimalTables():
+	global OptimalTables, StaleTables
+	startup = Startup
+	t = time.perf_counter()
+	StaleTables = frozenset()
+	appDir = os.path.dirname(__file__)
+	OptimalTables = lazy.optional("camberlib.tables").loadTables(
+		os.path.join(appDir, "optimal_tables.bin"),
+		loadTyreIndex(),
+		tyredata.sourceSignature(os.path.join(appDir, "tyres_data")),
+		ac.log
+	)
+	if startup is not None:
+		startup.add("optimal tables", time.perf_counter() - t)
+
+
+# Looks up DCAMBERs for the current car and compound, applied by
+# onFormRender when the lookup thread has them
 def loadTireData():
-	global Options
-	tyreDataPath = os.path.join(os.path.dirname(__file__), "tyres_data")
-	tyreData = {}
-	for td in os.listdir(tyreDataPath):
-		if td.endswith('.json'):
-			with open(os.path.join(tyreDataPath, td), 'r') as f:
-				try:
-					newData = json.load(f)
-				except ValueError as e:
-					ac.log("CamberExtravaganza ERROR: Invalid JSON: " + td)
-				else:
-					tyreData.update(newData)
+	carName = ac.getCarName(FocusedCar)
+	tyreCompound = ac.getCarTyreCompound(FocusedCar)
+	TyreLookup.request(carName, tyreCompound)
+	CompoundWatch.reset((FocusedCar, tyreCompound))
+
 
-	carName = ac.getCarName(0)
-	tyreCompound = ac.getCarTyreCompound(0)
-	parseTyreData(carName, tyreCompound, tyreData)
+# Once the first tyre data is in, logs the startup phases if asked to
+# and drops the profile
+def reportStartup():
+	global Startup
+	Startup.add("first tyre data", Startup.clock() - Startup.start)
+	for name, seconds in lazy.timings:
+		Startup.add("import " + name, seconds)
+	if Options["startupProfile"]:
+		ac.log("CamberExtravaganza: Startup profile")
+		for line in Startup.report():
+			ac.log("CamberExtravaganza:   " + line)
+	Startup = None
 
 
+# (car shown, its compound), a change in either reloads tyre data
+def readTyreCompound():
+	car = ac.getFocusedCar() if Options["multiCar"] else 0
+	return car, ac.getCarTyreCompound(car)
+
+
+# Only queues the write, OptionsFile writes it a second after the last change
 def saveOptions():
-	global Options, CheckBoxes
-	optionsFile = os.path.join(os.path.dirname(__file__), 'options.dat')
-	with open(optionsFile, 'wb') as handle:
-		data = {}
-		for key,option in Options.items():
-			if key in SavableOptions:
-				data[key] = option
-		pickle.dump(data, handle, protocol=pickle.HIGHEST_PROTOCOL)
+	OptionsFile.save(Options)
 
 
+# Anything missing or invalid in the file keeps its default
 def loadOptions():
-	global Options
-	try:
-		optionsFile = os.path.join(os.path.dirname(__file__), 'options.dat')
-		with open(optionsFile, 'rb') as handle:
-			data = pickle.load(handle)
-			for key,datum in data.items():
-				if key in SavableOptions:
-					Options[key] = datum
-	except IOError:
-		ac.log("CamberExtravaganza ERROR: loadOptions IOError")
+	global Options, OptionsFile
+	appDir = os.path.dirname(__file__)
+	OptionsFile = OptionsStore(os.path.join(appDir, "options.json"), SavableOptions, log=ac.log,
+		legacyPath=os.path.join(appDir, "options.dat"))
+	Options.update(OptionsFile.load())
 
 
 def onAppActivated(self):
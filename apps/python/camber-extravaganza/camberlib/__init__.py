@@ -0,0 +1,6 @@
+##############################################################
+# Camber Extravaganza support library
+#
+# Everything in here is free of the ac/acsys modules so it can
+# be imported (and timed) outside of the game.
+#############################################################
@@ -0,0 +1,117 @@
+##############################################################
+# Camber colour lookup tables
+#
+# Colours are shared (r, g, b, a) tuples picked out of a table
+# built once per alpha/palette, instead of an HSV conversion and
+# a new dict on every call.
+#############################################################
+
+import colorsys
+
+SCALE = 0.5           # adjusts width of green, calculate this better later
+SPECTRUM_SIZE = 1024  # 1/255 per channel needs ~400, this leaves headroom
+SPECTRUM_D_MIN = -0.4 # hue is clamped outside 0.6 - d in [0, 1]
+SPECTRUM_D_MAX = 0.6
+SATURATION = 0.9
+BRIGHTNESS = 0.9
+GREEN_BAND = 0.2      # |d| inside this is green in the stepped palette
+BLUE = 0              # camber windows, see camberWindow()
+GREEN = 1
+RED = 2
+
+
+class ColorTable:
+	def __init__(self, alpha, useSpectrum):
+		self.alpha = alpha
+		self.useSpectrum = useSpectrum
+		self.stepScale = (SPECTRUM_SIZE - 1) / (SPECTRUM_D_MAX - SPECTRUM_D_MIN)
+		self.spectrum = tuple(spectrumColor(SPECTRUM_D_MIN + i / self.stepScale, alpha) for i in range(SPECTRUM_SIZE))
+		self.red = (1, 0, 0, alpha)
+		self.orange = (1, 0.5, 0, alpha)
+		self.yellow = (1, 1, 0, alpha)
+		self.green = (0, 1, 0, alpha)
+		self.cyan = (0, 1, 1, alpha)
+		self.blue = (0, 0, 1, alpha)
+
+	def matches(self, alpha, useSpectrum):
+		return self.alpha == alpha and self.useSpectrum == useSpectrum
+
+	def color(self, value, optimal):
+		d = (value - optimal) * SCALE
+		if self.useSpectrum:
+			i = int((d - SPECTRUM_D_MIN) * self.stepScale + 0.5)
+			if i < 0:
+				i = 0
+			elif i >= SPECTRUM_SIZE:
+				i = SPECTRUM_SIZE - 1
+			return self.spectrum[i]
+
+		if value > 0:
+			return self.red
+		elif d > 1.0:
+			return self.red
+		elif d > 0.5:
+			return self.orange
+		elif d > GREEN_BAND:
+			return self.yellow
+		elif d > -GREEN_BAND:
+			return self.green
+		elif d > -0.5:
+			return self.cyan
+		else:
+			return self.blue
+
+
+# Which side of the stepped palette's green band a camber (degrees) falls
+# on: BLUE is more negative than optimal, RED more positive or above zero
+def camberWindow(value, optimal):
+	d = (value - optimal) * SCALE
+	if value > 0 or d > GREEN_BAND:
+		return RED
+	elif d > -GREEN_BAND:
+		return GREEN
+	else:
+		return BLUE
+
+
+# The exact colour the table approximates, d = (value - optimal) * SCALE
+def spectrumColor(d, alpha):
+	H = max(0, min(1, 0.6 - d)) * 0.625  # 0.625 = hue 225°, #0040FF
+	c = colorsys.hsv_to_rgb(H, SATURATION, BRIGHTNESS)
+	return (c[0], c[1], c[2], alpha)
+
+
+# python -m camberlib.colors
+# Checks the table against colorsys and times both.  Returns False,
+# and the module exits 1, if the table is off by more than 1/255.
+def benchmark(samples=200000):
+	import random
+	import time
+
+	table = ColorTable(0.5, True)
+	rng = random.Random(1)
+	pairs = [(rng.uniform(-8, 3), rng.uniform(-4, 0)) for _ in range(samples)]
+
+	worst = 0
+	for value, optimal in pairs:
+		exact = spectrumColor((value - optimal) * SCALE, 0.5)
+		approx = table.color(value, optimal)
+		worst = max(worst, max(abs(exact[c] - approx[c]) for c in range(3)))
+	ok = worst <= 1 / 255
+	print("max channel error {0:.5f} (limit {1:.5f}) {2}".format(worst, 1 / 255, "OK" if ok else "FAIL"))
+
+	t = time.perf_counter()
+	for value, optimal in pairs:
+		spectrumColor((value - optimal) * SCALE, 0.5)
+	exactTime = time.perf_counter() - t
+	t = time.perf_counter()
+	for value, optimal in pairs:
+		table.color(value, optimal)
+	tableTime = time.perf_counter() - t
+	print("hsv_to_rgb {0:.3f} us/call, table {1:.3f} us/call".format(exactTime * 1e6 / samples, tableTime * 1e6 / samples))
+	return ok
+
+
+if __name__ == '__main__':
+	import sys
+	sys.exit(0 if benchmark() else 1)
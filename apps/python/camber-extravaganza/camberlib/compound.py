@@ -0,0 +1,147 @@
+##############################################################
+# Tyre compound change tracking
+#
+# Compounds only change in the pits, so CompoundTracker asks for
+# the current one every INTERVAL seconds instead of every frame.
+#
+# AsyncLookup runs the tyre data lookup for a new compound on a
+# worker thread.  The render thread collects the finished result
+# with poll() and applies it in one go, so a frame never sees
+# half of the old parameters and half of the new ones.
+#############################################################
+
+import threading
+import traceback
+
+INTERVAL = 0.5        # seconds between compound checks
+
+
+def noLog(message):
+	pass
+
+
+class CompoundTracker:
+	# readKey() returns whatever identifies the car's current tyres
+	def __init__(self, readKey, interval=INTERVAL):
+		self.readKey = readKey
+		self.interval = interval
+		self.elapsed = 0.0
+		self.key = None
+
+	# The key the caller already loaded data for
+	def reset(self, key):
+		self.key = key
+		self.elapsed = 0.0
+
+	# Returns the new key if it changed since the last check, else None
+	def changed(self, deltaT):
+		self.elapsed += deltaT
+		if self.elapsed < self.interval:
+			return None
+		self.elapsed = 0.0
+		key = self.readKey()
+		if key == self.key:
+			return None
+		self.key = key
+		return key
+
+
+class AsyncLookup:
+	# resolve(*args) runs on the worker thread, its return value is
+	# handed back by poll()
+	def __init__(self, resolve, log=noLog):
+		self.resolve = resolve
+		self.log = log
+		self.lock = threading.Lock()
+		self.thread = None
+		self.pending = None
+		self.result = None
+		self.done = False
+
+	# Only the newest request matters, one still running is left to
+	# finish and its result replaced
+	def request(self, *args):
+		with self.lock:
+			self.pending = args
+			if self.thread is not None:
+				return
+			self.thread = threading.Thread(target=self.run, name="CamberExtravaganza lookup")
+			self.thread.daemon = True
+			self.thread.start()
+
+	def run(self):
+		while True:
+			with self.lock:
+				args = self.pending
+				self.pending = None
+				if args is None:
+					self.thread = None
+					return
+			try:
+				result = self.resolve(*args)
+			except Exception:
+				self.log("CamberExtravaganza ERROR: AsyncLookup.run(): %s" % traceback.format_exc())
+				continue
+			with self.lock:
+				self.result = result
+				self.done = True
+
+	# Render thread side, the finished result once, or None
+	def poll(self):
+		if not self.done:
+			return None
+		with self.lock:
+			result = self.result
+			self.result = None
+			self.done = False
+		return result
+
+	# Blocks until nothing is pending, for startup and tools
+	def wait(self, timeout=None):
+		thread = self.thread
+		if thread is not None:
+			thread.join(timeout)
+		return self.poll()
+
+
+# python -m camberlib.compound
+# Per-frame cost of checking every frame against every INTERVAL
+def benchmark(frames=100000):
+	import time
+
+	calls = [0]
+
+	def readKey():
+		calls[0] += 1
+		return "M"
+
+	tracker = CompoundTracker(readKey, interval=0)
+	tracker.reset("M")
+	t = time.perf_counter()
+	for _ in range(frames):
+		tracker.changed(1 / 60)
+	every = (time.perf_counter() - t) / frames
+	everyCalls = calls[0] / frames
+
+	calls[0] = 0
+	tracker = CompoundTracker(readKey)
+	tracker.reset("M")
+	t = time.perf_counter()
+	for _ in range(frames):
+		tracker.changed(1 / 60)
+	slow = (time.perf_counter() - t) / frames
+	slowCalls = calls[0] / frames
+
+	lookup = AsyncLookup(lambda compound: ("params", compound))
+	t = time.perf_counter()
+	lookup.request("H")
+	result = lookup.wait()
+	swap = time.perf_counter() - t
+
+	print("every frame        {0:5.3f} us/frame, {1:.3f} reads/frame".format(every * 1e6, everyCalls))
+	print("every {0:.1f} s        {1:5.3f} us/frame, {2:.3f} reads/frame".format(INTERVAL, slow * 1e6, slowCalls))
+	print("async lookup round trip {0:.0f} us, result {1}".format(swap * 1e6, result))
+
+
+if __name__ == '__main__':
+	benchmark()
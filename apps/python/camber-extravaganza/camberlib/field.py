@@ -0,0 +1,147 @@
+##############################################################
+# Whole-field camber tracking
+#
+# Camber, load and optimal camber for every car on track, kept
+# as flat arrays indexed by car (four entries per car for wheel
+# values, two for axle values) rather than an object per car.
+#
+# step() updates cars round-robin until BUDGET_US is spent, so
+# a frame costs about the same whatever the grid size; bigger
+# grids just see each car less often.  Smoothing is scaled by
+# the time since a car's last update so it means the same thing
+# at any refresh rate.
+#############################################################
+
+import math
+import time
+from array import array
+
+from camberlib.solver import FRAME, NOT_FOUND, axleWeight, optimalCamber, smoothing
+
+BUDGET_US = 150       # per frame for the whole field
+RESOLVE_EVERY = 64    # updates between tyre data checks per car, catches pit stops
+
+
+class FieldTracker:
+	# readCar(i) returns (camber radians, load) for car i, FL, FR, RL, RR.
+	# resolve(i) returns ((DCAMBER_0, DCAMBER_1, LS_EXPY) front, rear) or None.
+	def __init__(self, cars, readCar, resolve, budget=BUDGET_US, clock=time.perf_counter):
+		self.readCar = readCar
+		self.resolve = resolve
+		self.budget = budget / 1e6
+		self.clock = clock
+		self.resize(cars)
+
+	def resize(self, cars):
+		self.count = max(1, cars)
+		n = self.count
+		self.camber = array('d', bytes(8 * 4 * n))   # degrees, latest
+		self.load = array('d', bytes(8 * 4 * n))
+		self.average = array('d', bytes(8 * 4 * n))  # degrees, smoothed
+		self.optimal = array('d', [NOT_FOUND] * (2 * n))
+		self.outer = array('b', [0, 2] * n)          # outer wheel per axle
+		self.lastUpdate = array('d', [-1.0] * n)
+		self.updates = array('l', bytes(array('l').itemsize * n))
+		self.params = [None] * n                     # (front, rear), False if unknown
+		self.next = 0
+
+	# Forget a car's tyre data, e.g. on a compound change
+	def invalidate(self, i):
+		self.params[i] = None
+
+	def update(self, i, now):
+		camber, load = self.readCar(i)
+		if self.updates[i] % RESOLVE_EVERY == 0 or self.params[i] is None:
+			params = self.resolve(i)
+			self.params[i] = params if params is not None else False
+		params = self.params[i]
+
+		last = self.lastUpdate[i]
+		if last < 0:
+			keep = 0.0
+		else:
+			keep = smoothing(min(1.0, now - last))
+		self.lastUpdate[i] = now
+		self.updates[i] += 1
+
+		w = 4 * i
+		degrees = math.degrees
+		for k in range(4):
+			c = degrees(camber[k])
+			self.camber[w + k] = c
+			self.load[w + k] = load[k]
+			self.average[w + k] = keep * self.average[w + k] + (1 - keep) * c
+
+		a = 2 * i
+		for axle in range(2):
+			l = load[2 * axle]
+			r = load[2 * axle + 1]
+			if params:
+				d0, d1, ls = params[axle]
+				weightXfer, side = axleWeight(l, r, ls)
+				target = optimalCamber(weightXfer, d0, d1, abs(camber[2 * axle] - camber[2 * axle + 1]))
+			else:
+				side = 0 if max(0.001, l, r) == l else 1
+				target = NOT_FOUND
+			self.optimal[a + axle] = keep * self.optimal[a + axle] + (1 - keep) * target
+			self.outer[a + axle] = 2 * axle + side
+
+	# Updates as many cars as fit in the budget, at least one.  Returns how many.
+	def step(self, now):
+		clock = self.clock
+		deadline = clock() + self.budget
+		count = self.count
+		done = 0
+		while done < count:
+			i = self.next
+			self.next = (i + 1) % count
+			self.update(i, now)
+			done += 1
+			if clock() >= deadline:
+				break
+		return done
+
+	# Optimal minus the outer wheel's smoothed camber, front and rear
+	def delta(self, i):
+		a = 2 * i
+		return (self.optimal[a] - self.average[4 * i + self.outer[a]],
+			self.optimal[a + 1] - self.average[4 * i + self.outer[a + 1]])
+
+
+# python -m camberlib.field
+# Per-frame cost and how stale each car gets from 1 to 30 cars, with
+# the budget against updating every car every frame.  Each fake
+# getCarState spins for callUs, roughly what a call into AC costs.
+def benchmark(frames=600, callUs=2.0):
+	def spin(seconds):
+		end = time.perf_counter() + seconds
+		while time.perf_counter() < end:
+			pass
+
+	def readCar(i):
+		spin(2 * callUs / 1e6)  # camber and load
+		t = time.perf_counter() + i
+		s = 0.012 * math.sin(t * 0.7)
+		return (-0.045 + s, -0.045 - s, -0.03 + s, -0.03 - s), (3200 + 1e5 * s, 3200 - 1e5 * s, 2900, 2900)
+
+	def resolve(i):
+		return (1.2, -13.0, 0.8071), (1.1, -12.0, 0.8179)
+
+	print("{0:>5s} {1:>12s} {2:>12s} {3:>14s}".format("cars", "all, us", "budget, us", "frames/update"))
+	for cars in (1, 2, 5, 10, 15, 20, 25, 30):
+		row = []
+		for budget in (1e9, BUDGET_US):
+			tracker = FieldTracker(cars, readCar, resolve, budget=budget)
+			times = []
+			for frame in range(frames):
+				t = time.perf_counter()
+				tracker.step(frame * FRAME)
+				times.append(time.perf_counter() - t)
+			times.sort()
+			row.append(times[len(times) // 2] * 1e6)
+		staleness = frames * cars / float(sum(tracker.updates))
+		print("{0:5d} {1:12.1f} {2:12.1f} {3:14.1f}".format(cars, row[0], row[1], staleness))
+
+
+if __name__ == '__main__':
+	benchmark()
@@ -0,0 +1,145 @@
+##############################################################
+# Cached tyre and body geometry
+#
+# Everything about the drawing that only depends on the window
+# layout, tireHeight and the car's tyre radii is worked out once
+# in CarLayout, instead of every frame.
+#
+# TyreQuad keeps a tyre's vertices and only recomputes them when
+# the camber has moved the far corner by at least PIXEL.  The
+# edge normal is (sin, -cos) of the camber, cos(t - pi/2) and
+# sin(t - pi/2), so one cos and one sin per update.  Flipped
+# (left side) tyres are mirrored, rad = pi - camber.
+#############################################################
+
+import math
+
+PIXEL = 1.0           # smallest corner movement worth recomputing for
+
+
+class TyreQuad:
+	__slots__ = ("x", "y", "height", "width", "suspH", "flip", "reach", "camber", "quad", "susp")
+
+	def __init__(self, x, y, height, suspH, flip):
+		self.x = x
+		self.y = y
+		self.height = height
+		self.width = height / 2
+		self.suspH = suspH
+		self.flip = flip
+		self.reach = math.hypot(self.width, height)  # distance to the far corner
+		self.camber = None
+		self.quad = None   # x0, y0 .. x3, y3, counterclockwise
+		self.susp = None   # tyre ends of the two suspension arms, x0, y0, x1, y1
+
+	# Returns True if the vertices were recomputed
+	def update(self, camber, pixel=PIXEL):
+		if self.camber is not None and abs(camber - self.camber) * self.reach < pixel:
+			return False
+		self.camber = camber
+		cos = math.cos(camber)
+		sin = math.sin(camber)
+		x = self.x
+		y = self.y
+		w = self.width
+		h = self.height
+		if self.flip:
+			# rad = pi - camber: (cos, sin) = (-cos, sin), normal (-sin, -cos)
+			nx = -sin
+			ny = -cos
+			ex = -w * cos
+			ey = w * sin
+			self.quad = (x, y, x + h * nx, y + h * ny, x + ex + h * nx, y + ey + h * ny, x + ex, y + ey)
+		else:
+			nx = sin
+			ny = -cos
+			ex = w * cos
+			ey = w * sin
+			self.quad = (x, y, x + ex, y + ey, x + ex + h * nx, y + ey + h * ny, x + h * nx, y + h * ny)
+		a = h / 2 - self.suspH
+		b = h / 2 + self.suspH
+		self.susp = (x + a * nx, y + a * ny, x + b * nx, y + b * ny)
+		return True
+
+
+# Positions are each indicator's (xPosition, yPosition) by wheel name,
+# tyreRadius the four radii in meters
+class CarLayout:
+	def __init__(self, positions, tireHeight, tyreRadius):
+		self.tireHeight = tireHeight
+		self.pixelsPerMeterF = tireHeight / tyreRadius[0]
+		self.pixelsPerMeterR = tireHeight / tyreRadius[2]
+		# Body corners sit on the inner edge of each tyre, the box is h tall
+		self.xFL = positions["FL"][0] + tireHeight
+		self.xFR = positions["FR"][0]
+		self.yF = positions["FR"][1] - tireHeight / 2
+		self.xRL = positions["RL"][0] + tireHeight
+		self.xRR = positions["RR"][0]
+		self.yR = positions["RR"][1] - tireHeight / 2
+		self.h = tireHeight / 4
+		self.suspH = self.h * 0.75
+		self.tyres = {}
+		for key, (x, y) in positions.items():
+			self.tyres[key] = TyreQuad(x + 25, y, tireHeight, self.suspH, key in ("FL", "RL"))
+
+
+# python -m camberlib.geometry
+# TyreQuad against drawTire's per-frame trig, vertices and time
+def benchmark(frames=50000):
+	import random
+	import time
+
+	def legacy(x, y, h, suspH, value, flip):
+		rad = value
+		if flip:
+			rad = math.pi - rad
+		w = h / 2
+		cosrad = math.cos(rad)
+		sinrad = math.sin(rad)
+		halfpi = math.pi/2
+		if flip:
+			cosradnorm = math.cos(rad+halfpi)
+			sinradnorm = math.sin(rad+halfpi)
+			quad = (x, y, x+h*cosradnorm, y+h*sinradnorm,
+				x+w*cosrad+h*cosradnorm, y+w*sinrad+h*sinradnorm, x+w*cosrad, y+w*sinrad)
+		else:
+			cosradnorm = math.cos(rad-halfpi)
+			sinradnorm = math.sin(rad-halfpi)
+			quad = (x, y, x+w*cosrad, y+w*sinrad,
+				x+w*cosrad+h*cosradnorm, y+w*sinrad+h*sinradnorm, x+h*cosradnorm, y+h*sinradnorm)
+		susp = (x+(h/2 - suspH)*cosradnorm, y+(h/2 - suspH)*sinradnorm,
+			x+(h/2 + suspH)*cosradnorm, y+(h/2 + suspH)*sinradnorm)
+		return quad, susp
+
+	rng = random.Random(11)
+	worst = 0
+	for flip in (False, True):
+		tyre = TyreQuad(40, 75, 50, 9.375, flip)
+		for _ in range(1000):
+			value = rng.uniform(-0.2, 0.1)
+			tyre.update(value, pixel=0)
+			quad, susp = legacy(40, 75, 50, 9.375, value, flip)
+			worst = max([worst] + [abs(a - b) for a, b in zip(tyre.quad + tyre.susp, quad + susp)])
+	print("vertex parity, max difference {0:.2g} px".format(worst))
+
+	# Camber at 60 fps through left/right corners, +-1.7 degrees, with sensor noise
+	values = [-0.045 + 0.03 * math.sin(i / 60 * 1.5) + rng.gauss(0, 0.0002) for i in range(frames)]
+	t = time.perf_counter()
+	for value in values:
+		legacy(40, 75, 50, 9.375, value, True)
+	old = (time.perf_counter() - t) / frames
+
+	tyre = TyreQuad(40, 75, 50, 9.375, True)
+	updates = 0
+	t = time.perf_counter()
+	for value in values:
+		if tyre.update(value):
+			updates += 1
+	new = (time.perf_counter() - t) / frames
+
+	print("drawTire trig + vertices {0:5.2f} us/tyre".format(old * 1e6))
+	print("TyreQuad.update          {0:5.2f} us/tyre, recomputed {1:.0%} of frames".format(new * 1e6, updates / frames))
+
+
+if __name__ == '__main__':
+	benchmark()
@@ -0,0 +1,176 @@
+##############################################################
+# Axle grip curve and numeric optimum
+#
+# AC scales grip by 1 / (1 + DCAMBER_0*c - DCAMBER_1*c^2) for
+# camber c in radians (sign as shown by the app, negative is top
+# in), which peaks at DCAMBER_0 / (2*DCAMBER_1).  The closed form
+# in camberlib.solver is the optimum of the linearized
+# 2 - (1 + DCAMBER_0*c - DCAMBER_1*c^2); this maximizes the real
+# thing for the outer wheel plus the inner wheel, which sees
+# camberSplit - c, weighted by load sensitivity.
+#
+# Newton's method on the analytic derivatives, warm started from
+# the last frame's answer, with a golden-section fallback.  Both
+# have a fixed iteration cap so a frame never costs more than
+# MAX_NEWTON + MAX_GOLDEN evaluations.
+#############################################################
+
+import math
+
+LOWER = math.radians(-12.0) # search bounds for the outer wheel camber
+UPPER = math.radians(6.0)
+TOLERANCE = 1e-7            # radians
+MAX_NEWTON = 6
+MAX_GOLDEN = 40
+INV_PHI = (math.sqrt(5) - 1) / 2
+BUDGET_US = 50              # per frame for both axles at p99, checked by benchmark()
+
+
+def gripFactor(camber, dcamber0, dcamber1):
+	h = 1 + dcamber0 * camber - dcamber1 * camber * camber
+	if h <= 0:
+		return 0
+	return 1 / h
+
+
+def axleGrip(camber, weightXfer, dcamber0, dcamber1, camberSplit):
+	return (weightXfer * gripFactor(camber, dcamber0, dcamber1)
+		+ (1 - weightXfer) * gripFactor(camberSplit - camber, dcamber0, dcamber1))
+
+
+def goldenSection(weightXfer, dcamber0, dcamber1, camberSplit, lower=LOWER, upper=UPPER):
+	a = lower
+	b = upper
+	c = b - (b - a) * INV_PHI
+	d = a + (b - a) * INV_PHI
+	gc = axleGrip(c, weightXfer, dcamber0, dcamber1, camberSplit)
+	gd = axleGrip(d, weightXfer, dcamber0, dcamber1, camberSplit)
+	for _ in range(MAX_GOLDEN):
+		if b - a < TOLERANCE:
+			break
+		if gc > gd:
+			b = d
+			d = c
+			gd = gc
+			c = b - (b - a) * INV_PHI
+			gc = axleGrip(c, weightXfer, dcamber0, dcamber1, camberSplit)
+		else:
+			a = c
+			c = d
+			gc = gd
+			d = a + (b - a) * INV_PHI
+			gd = axleGrip(d, weightXfer, dcamber0, dcamber1, camberSplit)
+	return (a + b) / 2
+
+
+# Returns the outer wheel camber (radians) with the most axle grip
+def optimalCamberRad(weightXfer, dcamber0, dcamber1, camberSplit, guess=None):
+	if dcamber0 == 0 and dcamber1 == 0:
+		return 0.0
+
+	x = guess if guess is not None and LOWER < guess < UPPER else dcamber0 / (2 * dcamber1) if dcamber1 != 0 else 0.0
+	h2 = -2 * dcamber1
+	w = weightXfer
+	for _ in range(MAX_NEWTON):
+		y = camberSplit - x
+		u = 1 + dcamber0 * x - dcamber1 * x * x
+		v = 1 + dcamber0 * y - dcamber1 * y * y
+		if u <= 0 or v <= 0:
+			break
+		du = dcamber0 - 2 * dcamber1 * x
+		dv = dcamber0 - 2 * dcamber1 * y
+		first = -w * du / (u * u) + (1 - w) * dv / (v * v)
+		second = w * (2 * du * du - u * h2) / (u * u * u) + (1 - w) * (2 * dv * dv - v * h2) / (v * v * v)
+		if second >= 0:
+			break  # not near a maximum, let golden-section find it
+		step = first / second
+		x -= step
+		if not LOWER <= x <= UPPER:
+			break
+		if abs(step) < TOLERANCE:
+			return x
+
+	return goldenSection(weightXfer, dcamber0, dcamber1, camberSplit)
+
+
+# python -m camberlib.grip
+# Time per solve, then the closed form against the full curve for every
+# car in tyres_data, over a grid of weight transfer and camber split.
+# Returns False, and the module exits 1, if the solver's p99 frame is
+# over BUDGET_US.  p99 rather than max, a single frame can always lose
+# the CPU to something else.
+def benchmark(frames=20000):
+	import os
+	import random
+	import time
+	from camberlib import tyredata
+	from camberlib.solver import AxleSolver, FULL_CURVE, optimalCamber
+
+	rng = random.Random(5)
+	cases = [(rng.uniform(0.5, 1.0), rng.uniform(0, 0.1)) for _ in range(frames)]
+	d0, d1 = 1.2, -13.0
+
+	t = time.perf_counter()
+	for w, s in cases:
+		optimalCamber(w, d0, d1, s)
+	closed = (time.perf_counter() - t) / frames
+
+	t = time.perf_counter()
+	for w, s in cases:
+		optimalCamberRad(w, d0, d1, s)
+	cold = (time.perf_counter() - t) / frames
+
+	guess = None
+	t = time.perf_counter()
+	for i in range(frames):
+		# frame to frame the inputs barely move
+		w = 0.75 + 0.2 * math.sin(i * 0.01)
+		s = 0.03 + 0.02 * math.sin(i * 0.013)
+		guess = optimalCamberRad(w, d0, d1, s, guess)
+	warm = (time.perf_counter() - t) / frames
+
+	solver = AxleSolver(mode=FULL_CURVE)
+	solver.setParams((1.2, -13.0, 0.8071), (1.1, -12.0, 0.8179))
+	frameLoads = [(3000 + 1500 * math.sin(i * 0.01), 3000 - 1500 * math.sin(i * 0.01), 2800, 2600) for i in range(frames)]
+	frameCambers = [(-0.04 + 0.02 * math.sin(i * 0.013), -0.03, -0.03, -0.02) for i in range(frames)]
+	times = []
+	clock = time.perf_counter
+	for l, c in zip(frameLoads, frameCambers):
+		t = clock()
+		solver.step(l, c)
+		times.append(clock() - t)
+	times.sort()
+	p99 = times[len(times) * 99 // 100] * 1e6
+	ok = p99 <= BUDGET_US
+
+	print("closed form               {0:6.2f} us/solve".format(closed * 1e6))
+	print("full curve, cold start    {0:6.2f} us/solve".format(cold * 1e6))
+	print("full curve, warm start    {0:6.2f} us/solve".format(warm * 1e6))
+	print("AxleSolver full curve     {0:6.2f} us/frame p50, {1:6.2f} p99, {2:6.2f} max (p99 budget {3:.0f}) {4}".format(
+		times[len(times) // 2] * 1e6, p99, times[-1] * 1e6, BUDGET_US, "OK" if ok else "FAIL"))
+	print()
+
+	appDir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+	index = tyredata.flattenTyreData(tyredata.readTyreFiles(
+		os.path.join(appDir, "tyres_data"),
+		tyredata.sourceSignature(os.path.join(appDir, "tyres_data"))
+	))
+	grid = [(0.5 + 0.05 * i, math.radians(0.5 * j)) for i in range(11) for j in range(11)]
+	worstByCar = {}
+	for (carName, axle, tyreCompound), (d0, d1, ls) in index.items():
+		for w, s in grid:
+			exact = math.degrees(optimalCamberRad(w, d0, d1, s))
+			diff = abs(exact - optimalCamber(w, d0, d1, s))
+			if diff > worstByCar.get(carName, (0, ""))[0]:
+				worstByCar[carName] = (diff, "%s %s w=%.2f split=%.1f°" % (axle, tyreCompound, w, math.degrees(s)))
+
+	print("{0:40s} {1:>10s}  {2}".format("car", "max diff°", "at"))
+	for carName in sorted(set(key[0] for key in index)):
+		diff, at = worstByCar.get(carName, (0, ""))
+		print("{0:40s} {1:10.3f}  {2}".format(carName, diff, at))
+	return ok
+
+
+if __name__ == '__main__':
+	import sys
+	sys.exit(0 if benchmark() else 1)
@@ -0,0 +1,100 @@
+##############################################################
+# Camber history ring buffer
+#
+# Parallel array('f') columns for value and colour instead of a
+# deque of {"value":..., "color":{...}} dicts, so appending a
+# sample every frame doesn't allocate anything.
+#############################################################
+
+from array import array
+
+
+class HistoryBuffer:
+	__slots__ = ("capacity", "head", "count", "values", "r", "g", "b", "a")
+
+	def __init__(self, capacity):
+		self.capacity = max(1, int(capacity))
+		self.values = array('f', bytes(4 * self.capacity))
+		self.r = array('f', bytes(4 * self.capacity))
+		self.g = array('f', bytes(4 * self.capacity))
+		self.b = array('f', bytes(4 * self.capacity))
+		self.a = array('f', bytes(4 * self.capacity))
+		self.head = 0   # next slot to write
+		self.count = 0
+
+	def __len__(self):
+		return self.count
+
+	def append(self, value, r, g, b, a):
+		i = self.head
+		self.values[i] = value
+		self.r[i] = r
+		self.g[i] = g
+		self.b[i] = b
+		self.a[i] = a
+		i += 1
+		self.head = 0 if i == self.capacity else i
+		if self.count < self.capacity:
+			self.count += 1
+
+	# Oldest to newest, as (value, r, g, b, a)
+	def __iter__(self):
+		values, r, g, b, a = self.values, self.r, self.g, self.b, self.a
+		capacity = self.capacity
+		i = self.head - self.count
+		if i < 0:
+			i += capacity
+		for _ in range(self.count):
+			yield values[i], r[i], g[i], b[i], a[i]
+			i += 1
+			if i == capacity:
+				i = 0
+
+	def clear(self):
+		self.head = 0
+		self.count = 0
+
+
+# python -m camberlib.history
+# Memory held by a full history (tracemalloc) and gen 0 GC passes caused
+# by appending, deque of dicts vs HistoryBuffer
+def benchmark(frames=100000):
+	import collections
+	import gc
+	import tracemalloc
+
+	def dequeFill(window, samples):
+		serie = collections.deque(maxlen=window)
+		for v, r, g, b, a in samples:
+			serie.append({"value": v, "color": {'r': r, 'g': g, 'b': b, 'a': a}})
+		return serie
+
+	def bufferFill(window, samples):
+		buf = HistoryBuffer(window)
+		for v, r, g, b, a in samples:
+			buf.append(v, r, g, b, a)
+		return buf
+
+	print("{0:>8s} {1:>14s} {2:>14s} {3:>12s} {4:>12s}".format(
+		"window", "deque KB", "buffer KB", "deque GCs", "buffer GCs"))
+	for window in (150, 1000, 10000):
+		samples = [(i * 0.001 - 3, 0.1, 0.9, 0.2, 0.5) for i in range(window)]
+		row = [window]
+		for fill in (dequeFill, bufferFill):
+			gc.collect()
+			tracemalloc.start()
+			history = fill(window, samples)
+			row.append(tracemalloc.get_traced_memory()[0] / 1024)
+			tracemalloc.stop()
+			del history
+		for fill in (dequeFill, bufferFill):
+			gc.collect()
+			before = gc.get_stats()[0]["collections"]
+			history = fill(window, samples * (frames // window))
+			row.append(gc.get_stats()[0]["collections"] - before)
+			del history
+		print("{0:8d} {1:14.1f} {2:14.1f} {3:12d} {4:12d}".format(*row))
+
+
+if __name__ == '__main__':
+	benchmark()
@@ -0,0 +1,113 @@
+##############################################################
+# Label state cache
+#
+# Remembers what every label was last given and only passes
+# setText/setFontColor through to AC when the visible text or
+# colour actually changes.  Labels that go through the cache
+# should only ever be set through it.
+#
+# due() additionally throttles text refresh to `rate` Hz, apart
+# from the GL drawing which still happens every frame.
+#############################################################
+
+
+class LabelCache:
+	# setText(label, text) and setFontColor(label, r, g, b, a), normally ac's
+	def __init__(self, setText, setFontColor, rate=0):
+		self.setText = setText
+		self.setFontColor = setFontColor
+		self.texts = {}
+		self.colors = {}
+		self.elapsed = 0.0
+		self.setRate(rate)
+
+	# 0 refreshes every frame
+	def setRate(self, rate):
+		self.interval = 1.0 / rate if rate > 0 else 0.0
+		self.elapsed = self.interval
+
+	# True if labels should be refreshed this frame
+	def due(self, deltaT):
+		if self.interval == 0.0:
+			return True
+		self.elapsed += deltaT
+		if self.elapsed < self.interval:
+			return False
+		self.elapsed = 0.0
+		return True
+
+	def text(self, label, text):
+		if self.texts.get(label) != text:
+			self.texts[label] = text
+			self.setText(label, text)
+
+	def color(self, label, color):
+		if self.colors.get(label) != color:
+			self.colors[label] = color
+			r, g, b, a = color
+			self.setFontColor(label, r, g, b, a)
+
+	# Forget a label, e.g. after it was set directly
+	def forget(self, label):
+		self.texts.pop(label, None)
+		self.colors.pop(label, None)
+
+
+# python -m camberlib.labels
+# Calls per frame for the four wheel labels (value, average, average
+# colour) and two target labels, uncached against cached and throttled
+def benchmark(frames=6000, fps=60):
+	import math
+	import time
+	from camberlib.colors import ColorTable
+
+	calls = [0]
+
+	def setText(label, text):
+		calls[0] += 1
+
+	def setFontColor(label, r, g, b, a):
+		calls[0] += 1
+
+	colors = ColorTable(0.5, True)
+	inputs = []
+	for i in range(frames):
+		t = i / fps
+		lateral = math.sin(t * 0.7) * math.sin(t * 0.13)
+		cambers = [math.degrees(-0.045 + s * 0.012 * lateral) for s in (1, -1, 0.7, -0.7)]
+		averages = [c + 0.2 for c in cambers]
+		inputs.append((cambers, averages, -3.1 + 0.01 * math.sin(t), -2.4))
+
+	def plain():
+		for cambers, averages, targetF, targetR in inputs:
+			for wheel in range(4):
+				setText(wheel, "{0:.3f}°".format(cambers[wheel]))
+				r, g, b, a = colors.color(averages[wheel], targetF)
+				setFontColor(10 + wheel, r, g, b, a)
+				setText(10 + wheel, "{0:.3f}°".format(averages[wheel]))
+			setText(20, "{0:+.1f}°".format(targetF))
+			setText(21, "{0:+.1f}°".format(targetR))
+
+	def cached(rate):
+		cache = LabelCache(setText, setFontColor, rate)
+		for cambers, averages, targetF, targetR in inputs:
+			if not cache.due(1.0 / fps):
+				continue
+			for wheel in range(4):
+				cache.text(wheel, "{0:.3f}°".format(cambers[wheel]))
+				cache.color(10 + wheel, colors.color(averages[wheel], targetF))
+				cache.text(10 + wheel, "{0:.3f}°".format(averages[wheel]))
+			cache.text(20, "{0:+.1f}°".format(targetF))
+			cache.text(21, "{0:+.1f}°".format(targetR))
+
+	for name, run in (("uncached", plain), ("cached", lambda: cached(0)),
+			("cached, 20 Hz", lambda: cached(20)), ("cached, 10 Hz", lambda: cached(10))):
+		calls[0] = 0
+		t = time.perf_counter()
+		run()
+		elapsed = time.perf_counter() - t
+		print("{0:14s} {1:5.1f} calls/frame {2:6.2f} us/frame".format(name, calls[0] / frames, elapsed * 1e6 / frames))
+
+
+if __name__ == '__main__':
+	benchmark()
@@ -0,0 +1,37 @@
+##############################################################
+# Deferred optional imports
+#
+# Heavy modules that only some features use (NumPy for batch
+# solving and session logs, and the app's own stream, recorder,
+# tables, track map and all cars modules) are imported the first
+# time one of those features asks for them, instead of when the
+# app loads.
+# optional() returns the module, or None if it isn't installed,
+# and remembers either answer.  `timings` keeps how long each
+# import took, for the startup profile.
+#############################################################
+
+import importlib
+import threading
+import time
+
+modules = {}
+timings = []          # (name, seconds) in import order
+lock = threading.Lock()
+
+
+def optional(name):
+	try:
+		return modules[name]
+	except KeyError:
+		pass
+	with lock:
+		if name not in modules:
+			t = time.perf_counter()
+			try:
+				module = importlib.import_module(name)
+			except ImportError:
+				module = None
+			timings.append((name, time.perf_counter() - t))
+			modules[name] = module
+	return modules[name]
@@ -0,0 +1,176 @@
+##############################################################
+# Multi-resolution camber history
+#
+# Keeps min/max/mean buckets at several time scales so a graph
+# of a whole lap or session is drawn from a fixed number of
+# buckets instead of one bar per frame.
+#
+# Level 0 takes raw samples.  Every other level only sees the
+# buckets closed by the level below it, so each sample costs
+# O(1) amortized however many levels there are.  The session
+# level never drops data, it halves its resolution when full.
+#############################################################
+
+from array import array
+
+BASE_SPAN = 5.0  # seconds covered by level 0
+LEVEL_COUNT = 7  # level spans double: 5, 10, 20 ... 320 s
+
+
+class HistoryLevel:
+	__slots__ = (
+		"bucketTime", "capacity", "compacting", "head", "count",
+		"mins", "maxs", "means", "r", "g", "b", "a",
+		"accTime", "accMin", "accMax", "accSum", "accCount", "accR", "accG", "accB", "accA"
+	)
+
+	def __init__(self, bucketTime, capacity, compacting=False):
+		self.bucketTime = bucketTime
+		self.capacity = max(2, int(capacity))
+		self.compacting = compacting
+		self.head = 0
+		self.count = 0
+		self.mins = array('f', bytes(4 * self.capacity))
+		self.maxs = array('f', bytes(4 * self.capacity))
+		self.means = array('f', bytes(4 * self.capacity))
+		self.r = array('f', bytes(4 * self.capacity))
+		self.g = array('f', bytes(4 * self.capacity))
+		self.b = array('f', bytes(4 * self.capacity))
+		self.a = array('f', bytes(4 * self.capacity))
+		self.resetBucket()
+
+	def __len__(self):
+		return self.count
+
+	def span(self):
+		return self.bucketTime * self.capacity
+
+	def resetBucket(self):
+		self.accTime = 0.0
+		self.accMin = float("inf")
+		self.accMax = float("-inf")
+		self.accSum = 0.0
+		self.accCount = 0
+		self.accR = 0.0
+		self.accG = 0.0
+		self.accB = 0.0
+		self.accA = 0.0
+
+	# Merges an aggregate in (colour channels are sums over count samples),
+	# returns the closed bucket as a tuple of the same shape or None
+	def add(self, minV, maxV, total, count, r, g, b, a, dt):
+		if minV < self.accMin:
+			self.accMin = minV
+		if maxV > self.accMax:
+			self.accMax = maxV
+		self.accSum += total
+		self.accCount += count
+		self.accR += r
+		self.accG += g
+		self.accB += b
+		self.accA += a
+		self.accTime += dt
+		if self.accTime < self.bucketTime:
+			return None
+
+		closed = (self.accMin, self.accMax, self.accSum, self.accCount,
+			self.accR, self.accG, self.accB, self.accA, self.accTime)
+		self.store(*closed)
+		self.resetBucket()
+		return closed
+
+	def store(self, minV, maxV, total, count, r, g, b, a, dt):
+		if self.compacting and self.count == self.capacity:
+			self.compact()
+		i = self.head
+		n = count or 1
+		self.mins[i] = minV
+		self.maxs[i] = maxV
+		self.means[i] = total / n
+		self.r[i] = r / n
+		self.g[i] = g / n
+		self.b[i] = b / n
+		self.a[i] = a / n
+		i += 1
+		self.head = 0 if i == self.capacity else i
+		if self.count < self.capacity:
+			self.count += 1
+
+	# Session level only: merge neighbouring buckets pairwise and double
+	# the bucket time, oldest bucket stays at index 0
+	def compact(self):
+		half = self.count // 2
+		for j in range(half):
+			k = 2 * j
+			self.mins[j] = min(self.mins[k], self.mins[k + 1])
+			self.maxs[j] = max(self.maxs[k], self.maxs[k + 1])
+			self.means[j] = (self.means[k] + self.means[k + 1]) / 2
+			self.r[j] = (self.r[k] + self.r[k + 1]) / 2
+			self.g[j] = (self.g[k] + self.g[k + 1]) / 2
+			self.b[j] = (self.b[k] + self.b[k + 1]) / 2
+			self.a[j] = (self.a[k] + self.a[k + 1]) / 2
+		self.count = half
+		self.head = half
+		self.bucketTime *= 2
+
+	# Oldest to newest, as (min, max, mean, r, g, b, a)
+	def __iter__(self):
+		capacity = self.capacity
+		i = self.head - self.count
+		if i < 0:
+			i += capacity
+		for _ in range(self.count):
+			yield self.mins[i], self.maxs[i], self.means[i], self.r[i], self.g[i], self.b[i], self.a[i]
+			i += 1
+			if i == capacity:
+				i = 0
+
+
+class MultiResHistory:
+	def __init__(self, width, baseSpan=BASE_SPAN, levelCount=LEVEL_COUNT):
+		self.width = max(2, int(width))
+		self.levels = [HistoryLevel(baseSpan * (2 ** n) / self.width, self.width) for n in range(levelCount)]
+		self.session = HistoryLevel(baseSpan / self.width, self.width, compacting=True)
+
+	def append(self, value, r, g, b, a, dt):
+		closed = self.levels[0].add(value, value, value, 1, r, g, b, a, dt)
+		if closed is None:
+			return
+		self.session.add(*closed)
+		for level in self.levels[1:]:
+			closed = level.add(*closed)
+			if closed is None:
+				break
+
+	# Smallest level that covers `seconds`, or the longest one
+	def levelFor(self, seconds):
+		for level in self.levels:
+			if level.span() >= seconds:
+				return level
+		return self.levels[-1]
+
+	def clear(self):
+		self.__init__(self.width, self.levels[0].span(), len(self.levels))
+
+
+# python -m camberlib.multires
+# Cost per sample and buckets kept for an hour at 60 fps
+def benchmark(fps=60, seconds=3600):
+	import math
+	import time
+
+	history = MultiResHistory(150)
+	dt = 1.0 / fps
+	frames = fps * seconds
+	t = time.perf_counter()
+	for i in range(frames):
+		history.append(math.sin(i * 0.01) * 3 - 1, 0.1, 0.9, 0.2, 0.5, dt)
+	elapsed = time.perf_counter() - t
+	print("{0:.3f} us/sample over {1} samples".format(elapsed * 1e6 / frames, frames))
+	for level in history.levels:
+		print("level {0:7.1f} s span {1:4d} buckets".format(level.span(), len(level)))
+	print("session {0:7.1f} s span {1:4d} buckets".format(history.session.span(), len(history.session)))
+
+
+if __name__ == '__main__':
+	benchmark()
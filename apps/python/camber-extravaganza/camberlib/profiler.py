@@ -0,0 +1,127 @@
+##############################################################
+# Per-stage frame profiler
+#
+# begin() at the top of a frame, then mark(stage) after each
+# stage charges the time since the previous mark to that stage.
+# The last `window` frames of every stage are kept in a ring;
+# percentiles are only sorted out of it when asked for, so a
+# frame costs one clock read and one array store per stage.
+#
+# When profiling is off the caller keeps no profiler at all and
+# pays one `is not None` test per stage.
+#
+# StartupProfile does the same once for the steps of loading
+# the app.
+#############################################################
+
+import time
+from array import array
+
+WINDOW = 300          # frames, ~5 s at 60 fps
+
+
+class StageProfiler:
+	def __init__(self, stages, window=WINDOW, clock=time.perf_counter):
+		self.stages = tuple(stages)
+		self.window = window
+		self.clock = clock
+		self.samples = dict((stage, array('d', bytes(8 * window))) for stage in self.stages + ("total",))
+		self.frames = 0
+		self.start = 0.0
+		self.last = 0.0
+
+	def begin(self):
+		self.start = self.last = self.clock()
+
+	def mark(self, stage):
+		now = self.clock()
+		self.samples[stage][self.frames % self.window] = now - self.last
+		self.last = now
+
+	# Closes the frame; stages not marked this frame count as zero
+	def end(self):
+		i = self.frames % self.window
+		self.samples["total"][i] = self.clock() - self.start
+		self.frames += 1
+		i = self.frames % self.window
+		for samples in self.samples.values():
+			samples[i] = 0.0
+
+	# {stage: (p50, p99, max)} in microseconds over the frames kept
+	def percentiles(self):
+		count = min(self.frames, self.window)
+		out = {}
+		for stage, samples in self.samples.items():
+			if count == 0:
+				out[stage] = (0.0, 0.0, 0.0)
+				continue
+			values = sorted(samples[:count] if count < self.window else samples)
+			out[stage] = (values[count // 2] * 1e6, values[count * 99 // 100] * 1e6, values[-1] * 1e6)
+		return out
+
+	# One line per stage, in order, total last
+	def report(self):
+		stats = self.percentiles()
+		return ["{0:10s} {1:7.1f} {2:7.1f} {3:7.1f}".format(stage, *stats[stage]) for stage in self.stages + ("total",)]
+
+
+# One-off startup phases rather than frames.  mark(phase) charges the
+# time since the previous mark, add() records a phase timed somewhere
+# else, e.g. on another thread.  start is a clock() reading taken
+# before the profile could be created, if any.
+class StartupProfile:
+	def __init__(self, start=None, clock=time.perf_counter):
+		self.clock = clock
+		self.start = self.last = clock() if start is None else start
+		self.phases = []
+
+	def mark(self, phase):
+		now = self.clock()
+		self.phases.append((phase, now - self.last))
+		self.last = now
+
+	def add(self, phase, seconds):
+		self.phases.append((phase, seconds))
+
+	# Milliseconds per phase, in the order they were recorded
+	def report(self):
+		return ["{0:18s} {1:8.2f} ms".format(phase, seconds * 1000) for phase, seconds in self.phases]
+
+
+# python -m camberlib.profiler
+# What instrumenting a frame of eight stages costs, on and off
+def benchmark(frames=100000):
+	stages = ("telemetry", "body", "tires", "graphs", "history", "labels", "compound", "solver")
+	profiler = StageProfiler(stages)
+
+	t = time.perf_counter()
+	for _ in range(frames):
+		profiler.begin()
+		for stage in stages:
+			profiler.mark(stage)
+		profiler.end()
+	on = (time.perf_counter() - t) / frames
+
+	prof = None
+	t = time.perf_counter()
+	for _ in range(frames):
+		if prof is not None:
+			prof.begin()
+		for stage in stages:
+			if prof is not None:
+				prof.mark(stage)
+		if prof is not None:
+			prof.end()
+	off = (time.perf_counter() - t) / frames
+
+	t = time.perf_counter()
+	profiler.report()
+	report = time.perf_counter() - t
+
+	print("profiling on  {0:6.2f} us/frame".format(on * 1e6))
+	print("profiling off {0:6.2f} us/frame (same loop, no profiler)".format(off * 1e6))
+	print("report()      {0:6.1f} us".format(report * 1e6))
+
+
+if __name__ == '__main__':
+	benchmark()
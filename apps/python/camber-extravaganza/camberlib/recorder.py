@@ -0,0 +1,268 @@
+##############################################################
+# Session telemetry recorder
+#
+# Appends one fixed-size record per physics step to a binary
+# log so a stint can be looked at after it ends.  The render
+# callback only queues tuples; a background thread packs and
+# writes them every FLUSH_INTERVAL, so disk I/O never happens
+# inside onFormRender.  If the writer falls a whole queue
+# behind, records are dropped and counted rather than letting
+# memory grow.
+#
+# File layout, little endian:
+#   header   HEADER, 64 bytes
+#   records  RECORD, 80 bytes each, until the end of the file
+# A record cut short by a crash is ignored when reading.
+# SessionLog mmaps a log and reads records without copying it.
+#############################################################
+
+import mmap
+import os
+import struct
+import threading
+import time
+import traceback
+
+from camberlib import lazy
+from camberlib.sampler import SnapshotRing
+
+MAGIC = b"CXRL"
+VERSION = 2                                    # 2 has the lap where 1 had padding
+HEADER = struct.Struct("<4sHHd48s")            # magic, version, record size, start (epoch), car
+RECORD = struct.Struct("<df4f4f4f2f8si")       # time, dt, camber, load, travel, optimal F/R, compound, lap
+FLUSH_INTERVAL = 0.25                          # seconds between writes
+QUEUE_SECONDS = 8                              # at 333 Hz, how far the writer may fall behind
+FIELDS = ("time", "dt",
+	"camberFL", "camberFR", "camberRL", "camberRR",
+	"loadFL", "loadFR", "loadRL", "loadRR",
+	"travelFL", "travelFR", "travelRL", "travelRR",
+	"optimalF", "optimalR", "compound", "lap")
+
+DTYPE = None                                   # RECORD as a NumPy dtype, see recordType()
+
+
+def noLog(message):
+	pass
+
+
+# NumPy is only imported the first time a log is read with it
+def recordType():
+	global DTYPE
+	if DTYPE is None:
+		numpy = lazy.optional("numpy")
+		DTYPE = numpy.dtype({
+			"names": FIELDS,
+			"formats": ["<f8"] + ["<f4"] * 15 + ["S8", "<i4"],
+			"offsets": [0] + [8 + 4 * i for i in range(15)] + [68, 76],
+			"itemsize": RECORD.size
+		})
+	return DTYPE
+
+
+class SessionRecorder:
+	def __init__(self, path, carName, capacity=333 * QUEUE_SECONDS, interval=FLUSH_INTERVAL, log=noLog):
+		self.path = path
+		self.carName = carName
+		self.interval = interval
+		self.log = log
+		self.ring = SnapshotRing(capacity)
+		self.elapsed = 0.0
+		self.compound = None
+		self.compoundBytes = b""
+		self.written = 0
+		self.highWater = 0
+		self.errors = 0
+		self.running = False
+		self.thread = None
+		self.file = None
+
+	def start(self):
+		if self.running:
+			return
+		self.running = True
+		self.thread = threading.Thread(target=self.run, name="CamberExtravaganza recorder")
+		self.thread.daemon = True
+		self.thread.start()
+
+	# Writes whatever is still queued before returning
+	def stop(self):
+		self.running = False
+		if self.thread is not None:
+			self.thread.join(5.0)
+			self.thread = None
+
+	# Render thread side, camber/load/travel are FL, FR, RL, RR, lap counts
+	# completed laps
+	def record(self, dt, camber, load, travel, optimalF, optimalR, compound, lap):
+		if compound != self.compound:
+			self.compound = compound
+			self.compoundBytes = compound.encode("ascii", "replace")[:8]
+		self.elapsed += dt
+		return self.ring.push((self.elapsed, dt, camber, load, travel, optimalF, optimalR, self.compoundBytes, lap))
+
+	def flush(self):
+		queued = len(self.ring)
+		if queued > self.highWater:
+			self.highWater = queued
+		records = self.ring.drain()
+		if not records:
+			return
+		pack = RECORD.pack
+		self.file.write(b"".join([
+			pack(t, dt, c[0], c[1], c[2], c[3], l[0], l[1], l[2], l[3], s[0], s[1], s[2], s[3], f, r, compound, lap)
+			for t, dt, c, l, s, f, r, compound, lap in records
+		]))
+		self.file.flush()
+		self.written += len(records)
+
+	def run(self):
+		try:
+			self.file = open(self.path, "wb")
+			self.file.write(HEADER.pack(MAGIC, VERSION, RECORD.size, time.time(), self.carName.encode("utf-8")[:48]))
+		except (IOError, OSError):
+			self.log("CamberExtravaganza ERROR: SessionRecorder.run(): %s" % traceback.format_exc())
+			self.running = False
+			return
+
+		while True:
+			running = self.running
+			try:
+				self.flush()
+			except Exception:
+				self.errors += 1
+				if self.errors == 1:
+					self.log("CamberExtravaganza ERROR: SessionRecorder.run(): %s" % traceback.format_exc())
+			if not running:
+				break
+			time.sleep(self.interval)
+		self.file.close()
+
+	@property
+	def dropped(self):
+		return self.ring.dropped
+
+
+# A recorded log, mmapped read-only.  Indexing and iterating unpack
+# records straight out of the map; records() is a NumPy structured
+# array over the same memory when NumPy is there.
+class SessionLog:
+	def __init__(self, path):
+		self.file = open(path, "rb")
+		try:
+			self.map = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+		except ValueError:
+			self.file.close()
+			raise ValueError("Empty session log " + path)
+		magic, version, recordSize, self.startTime, carName = HEADER.unpack_from(self.map, 0)
+		if magic != MAGIC or version != VERSION or recordSize != RECORD.size:
+			self.close()
+			raise ValueError("Not a session log, or from another version: " + path)
+		self.carName = carName.rstrip(b"\0").decode("utf-8", "replace")
+		self.count = (len(self.map) - HEADER.size) // RECORD.size
+
+	def close(self):
+		self.map.close()
+		self.file.close()
+
+	def __enter__(self):
+		return self
+
+	def __exit__(self, *args):
+		self.close()
+
+	def __len__(self):
+		return self.count
+
+	def __getitem__(self, i):
+		if i < 0:
+			i += self.count
+		if not 0 <= i < self.count:
+			raise IndexError(i)
+		return RECORD.unpack_from(self.map, HEADER.size + i * RECORD.size)
+
+	# Flat tuples in FIELDS order
+	def __iter__(self):
+		view = memoryview(self.map)[HEADER.size:HEADER.size + self.count * RECORD.size]
+		try:
+			for record in RECORD.iter_unpack(view):
+				yield record
+		finally:
+			view.release()
+
+	def records(self):
+		return lazy.optional("numpy").frombuffer(self.map, dtype=recordType(), count=self.count, offset=HEADER.size)
+
+
+# python -m camberlib.recorder [minutes] [speedup]
+# An hour of 333 Hz physics pushed in 60 fps frames, speedup times
+# faster than real time, with the queue scaled to match.  Checks
+# nothing is dropped, the queue stays bounded and the file reads back;
+# returns False, and the module exits 1, if any of that fails.
+def benchmark(minutes=60, speedup=100):
+	import math
+	import tempfile
+	import tracemalloc
+
+	numpy = lazy.optional("numpy")
+	rate = 333
+	fps = 60
+	total = int(minutes * 60 * rate)
+	path = os.path.join(tempfile.mkdtemp(), "session.cxlog")
+	recorder = SessionRecorder(path, "ferrari_458_gt2", capacity=rate * QUEUE_SECONDS * speedup)
+
+	idle = SessionRecorder(path, "", capacity=total)
+	t = time.perf_counter()
+	for i in range(10000):
+		idle.record(1.0 / rate, (0.0, 0.0, 0.0, 0.0), (0.0, 0.0, 0.0, 0.0), (0.0, 0.0, 0.0, 0.0), 0.0, 0.0, "M", 0)
+	pushCost = (time.perf_counter() - t) / 10000
+	idle = None
+
+	tracemalloc.start()
+	recorder.start()
+	start = time.perf_counter()
+	sent = 0
+	frame = 0
+	while sent < total:
+		frame += 1
+		due = min(total, frame * rate // fps)
+		while sent < due:
+			c = -0.04 + 0.02 * math.sin(sent * 0.003)
+			recorder.record(1.0 / rate, (c, c, c, c), (3000.0, 3100.0, 2900.0, 2800.0),
+				(0.01, 0.01, 0.02, 0.02), -3.1, -2.4, "M" if sent < total // 2 else "H", sent // (rate * 90))
+			sent += 1
+		delay = start + frame / (fps * speedup) - time.perf_counter()
+		if delay > 0:
+			time.sleep(delay)
+	recorder.stop()
+	wall = time.perf_counter() - start
+	current, peak = tracemalloc.get_traced_memory()
+	tracemalloc.stop()
+
+	size = os.path.getsize(path)
+	with SessionLog(path) as log:
+		count = len(log)
+		first = log[0]
+		last = log[-1]
+		compounds = set(record[-2].rstrip(b"\0") for record in log)
+		if numpy is not None:
+			camber = log.records()["camberFL"]
+			camberMean = float(camber.mean())
+			camber = None
+
+	print("{0} records in {1:.1f} s ({2:.0f} records/s, {3:.0f}x real time)".format(
+		recorder.written, wall, recorder.written / wall, total / rate / wall))
+	print("record() {0:.2f} us, dropped {1}, queue high water {2} of {3}".format(
+		pushCost * 1e6, recorder.dropped, recorder.highWater, recorder.ring.capacity))
+	print("peak traced memory {0:.1f} MB for a {1:.1f} MB log".format(peak / 1e6, size / 1e6))
+	print("read back {0} records, t {1:.1f}..{2:.1f} s, compounds {3}".format(count, first[0], last[0], sorted(compounds)))
+	if numpy is not None:
+		print("numpy camberFL mean {0:+.4f}".format(camberMean))
+	ok = recorder.dropped == 0 and count == total and size == HEADER.size + total * RECORD.size
+	print("OK" if ok else "FAIL")
+	os.remove(path)
+	return ok
+
+
+if __name__ == '__main__':
+	import sys
+	sys.exit(0 if benchmark(*[float(arg) for arg in sys.argv[1:]]) else 1)
@@ -0,0 +1,233 @@
+##############################################################
+# Rolling window statistics
+#
+# Mean, positive/negative partial sums and counts, and min/max
+# over the last `window` samples, all updated in O(1) per sample
+# instead of re-summing the whole history every frame.
+#
+# TimeWindowMean is the mean over the last so many seconds
+# instead, each sample weighted by its dt, so it doesn't depend
+# on how often samples come.
+#############################################################
+
+import collections
+
+
+class RollingStats:
+	# Running sums pick up float error as values come and go, so they
+	# are re-summed from scratch once every `window` samples
+	def __init__(self, window):
+		self.window = max(1, int(window))
+		self.values = collections.deque()
+		self.minQueue = collections.deque()  # (index, value), values increasing
+		self.maxQueue = collections.deque()  # (index, value), values decreasing
+		self.index = 0
+		self.resync = self.window
+		self.total = 0.0
+		self.sumPos = 0.0
+		self.sumNeg = 0.0
+		self.countPos = 0
+		self.countNeg = 0
+
+	def __len__(self):
+		return len(self.values)
+
+	def push(self, value):
+		if len(self.values) == self.window:
+			old = self.values.popleft()
+			self.total -= old
+			if old > 0:
+				self.sumPos -= old
+				self.countPos -= 1
+			else:
+				self.sumNeg -= old
+				self.countNeg -= 1
+
+		self.values.append(value)
+		self.total += value
+		if value > 0:
+			self.sumPos += value
+			self.countPos += 1
+		else:
+			self.sumNeg += value
+			self.countNeg += 1
+
+		i = self.index
+		self.index += 1
+		oldest = i - self.window
+		while self.minQueue and self.minQueue[-1][1] >= value:
+			self.minQueue.pop()
+		self.minQueue.append((i, value))
+		if self.minQueue[0][0] <= oldest:
+			self.minQueue.popleft()
+		while self.maxQueue and self.maxQueue[-1][1] <= value:
+			self.maxQueue.pop()
+		self.maxQueue.append((i, value))
+		if self.maxQueue[0][0] <= oldest:
+			self.maxQueue.popleft()
+
+		self.resync -= 1
+		if self.resync == 0:
+			self.resync = self.window
+			self.resum()
+
+	def resum(self):
+		self.total = 0.0
+		self.sumPos = 0.0
+		self.sumNeg = 0.0
+		for v in self.values:
+			self.total += v
+			if v > 0:
+				self.sumPos += v
+			else:
+				self.sumNeg += v
+
+	def clear(self):
+		self.__init__(self.window)
+
+	def mean(self):
+		if not self.values:
+			return 0
+		return self.total / len(self.values)
+
+	def min(self):
+		return self.minQueue[0][1] if self.minQueue else 0
+
+	def max(self):
+		return self.maxQueue[0][1] if self.maxQueue else 0
+
+
+class TimeWindowMean:
+	# The oldest sample is cut short so the window covers exactly
+	# `seconds` once full.  Like RollingStats the sum is re-summed
+	# every so often to drop float error.
+	def __init__(self, seconds):
+		self.seconds = float(seconds)
+		self.values = collections.deque()  # [value, dt]
+		self.time = 0.0
+		self.total = 0.0
+		self.resync = 0
+
+	def __len__(self):
+		return len(self.values)
+
+	def push(self, value, dt):
+		if dt <= 0:
+			return
+		values = self.values
+		values.append([value, dt])
+		self.time += dt
+		self.total += value * dt
+
+		excess = self.time - self.seconds
+		while excess > 0:
+			old = values[0]
+			if old[1] <= excess and len(values) > 1:
+				values.popleft()
+				self.time -= old[1]
+				self.total -= old[0] * old[1]
+				excess -= old[1]
+			else:
+				cut = min(excess, old[1])
+				old[1] -= cut
+				self.time -= cut
+				self.total -= old[0] * cut
+				break
+
+		self.resync += 1
+		if self.resync >= len(values):
+			self.resync = 0
+			self.total = 0.0
+			self.time = 0.0
+			for v, t in values:
+				self.total += v * t
+				self.time += t
+
+	def clear(self):
+		self.__init__(self.seconds)
+
+	def mean(self):
+		if self.time <= 0:
+			return 0
+		return self.total / self.time
+
+
+# python -m camberlib.rolling
+# Per-frame cost of re-summing a deque of dicts vs RollingStats.push,
+# then the last 150 frames at 60 fps against TimeWindowMean over 2.5 s,
+# fed the same signal at 30, 60 and 144 fps
+def benchmark(frames=2000):
+	import math
+	import time
+
+	print("{0:>8s} {1:>14s} {2:>14s}".format("window", "loop us/frame", "stats us/frame"))
+	for window in (150, 600, 2500, 10000):
+		samples = [math.sin(i * 0.01) * 3 - 1 for i in range(window + frames)]
+
+		serie = collections.deque(maxlen=window)
+		for v in samples[:window]:
+			serie.append({"value": v})
+		t = time.perf_counter()
+		for v in samples[window:]:
+			serie.append({"value": v})
+			serieSum = 0
+			for s in serie:
+				serieSum += s["value"]
+			sumPos = 1
+			sumNeg = -1
+			countPos = 1
+			countNeg = 1
+			for s in serie:
+				if s["value"] > 0:
+					sumPos += s["value"]
+					countPos += 1
+				else:
+					sumNeg += s["value"]
+					countNeg += 1
+		loop = (time.perf_counter() - t) / frames
+
+		stats = RollingStats(window)
+		for v in samples[:window]:
+			stats.push(v)
+		t = time.perf_counter()
+		for v in samples[window:]:
+			stats.push(v)
+			stats.mean()
+		rolling = (time.perf_counter() - t) / frames
+
+		print("{0:8d} {1:14.2f} {2:14.2f}".format(window, loop * 1e6, rolling * 1e6))
+
+	def signal(t):
+		return -2.5 + math.sin(t * 1.3) * math.sin(t * 0.23)
+
+	# Compared every 1/6 s, a whole number of frames at each rate
+	def drive(fps, seconds=20):
+		frameStats = RollingStats(150)
+		timeStats = TimeWindowMean(2.5)
+		out = []
+		for frame in range(1, seconds * fps + 1):
+			v = signal(frame / float(fps))
+			frameStats.push(v)
+			timeStats.push(v, 1.0 / fps)
+			if frame % (fps // 6) == 0 and frame >= 3 * fps:
+				out.append((frameStats.mean(), timeStats.mean()))
+		return out
+
+	reference = drive(60)
+	for fps in (30, 144):
+		rows = list(zip(reference, drive(fps)))
+		frameWorst = max(abs(a[0] - b[0]) for a, b in rows)
+		timeWorst = max(abs(a[1] - b[1]) for a, b in rows)
+		print("{0:3d} fps against 60, max difference: 150 frames {1:.3g}, 2.5 s {2:.3g}".format(fps, frameWorst, timeWorst))
+
+	stats = TimeWindowMean(2.5)
+	samples = [signal(i / 333.0) for i in range(frames * 5)]
+	t = time.perf_counter()
+	for v in samples:
+		stats.push(v, 1.0 / 333)
+		stats.mean()
+	print("TimeWindowMean.push at 333 Hz {0:.2f} us".format((time.perf_counter() - t) * 1e6 / len(samples)))
+
+
+if __name__ == '__main__':
+	benchmark()
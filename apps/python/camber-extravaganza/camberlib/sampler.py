@@ -0,0 +1,120 @@
+##############################################################
+# Background telemetry sampler
+#
+# Polls the physics page from its own thread at a fixed rate
+# and queues every new physics step, so the history isn't tied
+# to the render frame rate.  The render callback drains the
+# queue once per frame.
+#
+# Note: time.sleep() on Windows only wakes as often as the
+# system timer allows, which is ~1ms under AC but can be much
+# coarser elsewhere.
+#############################################################
+
+import threading
+import time
+import traceback
+
+STALL = 0.1           # seconds without a physics step that count as a pause, not driving
+
+
+def noLog(message):
+	pass
+
+
+# Single producer, single consumer ring.  The producer only ever writes
+# `head` and the consumer only `tail`, so no lock is needed as long as
+# int attribute stores are atomic (they are under the GIL).
+class SnapshotRing:
+	def __init__(self, capacity):
+		self.capacity = max(2, int(capacity))
+		self.slots = [None] * self.capacity
+		self.head = 0
+		self.tail = 0
+		self.dropped = 0
+
+	def __len__(self):
+		return self.head - self.tail
+
+	# Producer side, drops the new snapshot if the consumer is a full ring behind
+	def push(self, snapshot):
+		head = self.head
+		if head - self.tail >= self.capacity:
+			self.dropped += 1
+			return False
+		self.slots[head % self.capacity] = snapshot
+		self.head = head + 1
+		return True
+
+	# Consumer side, everything queued since the last drain, oldest first
+	def drain(self):
+		tail = self.tail
+		head = self.head
+		slots = self.slots
+		capacity = self.capacity
+		out = [slots[i % capacity] for i in range(tail, head)]
+		self.tail = head
+		return out
+
+
+# Snapshots are (timestamp, dt, camber, load, travel), dt is the wall
+# time since the previous physics step that was seen.  Physics steps
+# every 3 ms while driving, so after STALL without one (paused, setup
+# screen, loading) the next snapshot gets dt 0 rather than the pause.
+class TelemetrySampler:
+	def __init__(self, reader, rate, capacity=1024, log=noLog, clock=time.perf_counter, sleep=time.sleep):
+		self.reader = reader
+		self.log = log
+		self.errors = 0
+		self.period = 1.0 / rate
+		self.ring = SnapshotRing(capacity)
+		self.clock = clock
+		self.sleep = sleep
+		self.running = False
+		self.thread = None
+		self.lastTime = None
+
+	def start(self):
+		if self.running:
+			return
+		self.running = True
+		self.thread = threading.Thread(target=self.run, name="CamberExtravaganza sampler")
+		self.thread.daemon = True
+		self.thread.start()
+
+	def stop(self):
+		self.running = False
+		if self.thread is not None:
+			self.thread.join(1.0)
+			self.thread = None
+
+	def poll(self):
+		if not self.reader.read():
+			if self.lastTime is not None and self.clock() - self.lastTime > STALL:
+				self.lastTime = None
+			return False
+		now = self.clock()
+		dt = 0.0 if self.lastTime is None else now - self.lastTime
+		self.lastTime = now
+		reader = self.reader
+		return self.ring.push((now, dt, reader.camber, reader.load, reader.travel))
+
+	def run(self):
+		nextTime = self.clock()
+		while self.running:
+			try:
+				self.poll()
+			except Exception:
+				# A bad read isn't worth killing the thread over, log the first one
+				self.errors += 1
+				if self.errors == 1:
+					self.log("CamberExtravaganza ERROR: TelemetrySampler.run(): %s" % traceback.format_exc())
+			nextTime += self.period
+			delay = nextTime - self.clock()
+			if delay > 0:
+				self.sleep(delay)
+			else:
+				nextTime = self.clock()
+
+	def drain(self):
+		return self.ring.drain()
@@ -0,0 +1,181 @@
+##############################################################
+# Track segment statistics
+#
+# Splits the lap into SEGMENTS equal slices of the normalized
+# track position and keeps, per slice and wheel, how long the
+# wheel spent blue, green and red, and the time weighted mean
+# and variance of its camber.  Per slice and axle it keeps the
+# load weighted mean camber of the outer (more loaded) wheel and
+# the mean optimal camber.
+#
+# Everything lives in flat arrays sized by the segment count, so
+# memory doesn't grow with the session, and add() touches one
+# segment, so a sample costs the same however long the session
+# has run.  Means and variances use the weighted form of
+# Welford's update, one pass with no sums of squares to cancel.
+#
+# TrackStats maps the track position to a segment and keeps one
+# set for the whole session.
+#############################################################
+
+from array import array
+
+from camberlib.colors import BLUE, GREEN, RED, camberWindow
+
+SEGMENTS = 100        # slices of the lap
+WHEELS = 4            # FL, FR, RL, RR
+
+
+def zeros(n):
+	return array('d', bytes(8 * n))
+
+
+class SegmentStats:
+	def __init__(self, segments=SEGMENTS):
+		self.segments = segments
+		n = segments * WHEELS
+		self.time = zeros(n)               # seconds, index segment * 4 + wheel
+		self.windows = zeros(3 * n)        # seconds BLUE, GREEN, RED, index (segment * 4 + wheel) * 3 + window
+		self.mean = zeros(n)               # degrees
+		self.m2 = zeros(n)                 # sum of weighted squared deviations
+		self.outerLoad = zeros(2 * segments)   # load * seconds, index segment * 2 + axle
+		self.outerCamber = zeros(2 * segments) # load * seconds * degrees
+		self.optimal = zeros(2 * segments)     # optimal * seconds
+
+	# camber in degrees, load per wheel, optimal per axle in degrees.
+	# Samples without a duration (the sampler's first) carry no weight.
+	def add(self, segment, dt, camber, load, optimalF, optimalR):
+		if dt <= 0:
+			return
+		time = self.time
+		mean = self.mean
+		m2 = self.m2
+		windows = self.windows
+		w = segment * WHEELS
+		for wheel in range(WHEELS):
+			i = w + wheel
+			value = camber[wheel]
+			optimal = optimalF if wheel < 2 else optimalR
+			total = time[i] + dt
+			time[i] = total
+			delta = value - mean[i]
+			mean[i] += delta * dt / total
+			m2[i] += dt * delta * (value - mean[i])
+			windows[3 * i + camberWindow(value, optimal)] += dt
+
+		a = 2 * segment
+		for axle, optimal in ((0, optimalF), (1, optimalR)):
+			l = load[2 * axle]
+			r = load[2 * axle + 1]
+			outer = 2 * axle if l >= r else 2 * axle + 1
+			weight = load[outer] * dt
+			self.outerLoad[a + axle] += weight
+			self.outerCamber[a + axle] += weight * camber[outer]
+			self.optimal[a + axle] += optimal * dt
+
+	def variance(self, segment, wheel):
+		i = segment * WHEELS + wheel
+		return self.m2[i] / self.time[i] if self.time[i] > 0 else 0.0
+
+	# (blue, green, red) seconds
+	def windowTimes(self, segment, wheel):
+		i = 3 * (segment * WHEELS + wheel)
+		return self.windows[i + BLUE], self.windows[i + GREEN], self.windows[i + RED]
+
+	# Load weighted mean camber of the outer wheel, or None if unvisited
+	def outerMean(self, segment, axle):
+		weight = self.outerLoad[2 * segment + axle]
+		return self.outerCamber[2 * segment + axle] / weight if weight > 0 else None
+
+	def optimalMean(self, segment, axle):
+		i = segment * WHEELS + 2 * axle
+		return self.optimal[2 * segment + axle] / self.time[i] if self.time[i] > 0 else None
+
+	# Seconds (blue, green, red) for one wheel over every segment
+	def totals(self, wheel):
+		out = [0.0, 0.0, 0.0]
+		for segment in range(self.segments):
+			i = 3 * (segment * WHEELS + wheel)
+			for window in range(3):
+				out[window] += self.windows[i + window]
+		return out
+
+
+class TrackStats:
+	def __init__(self, segments=SEGMENTS):
+		self.segments = segments
+		self.session = SegmentStats(segments)
+
+	# position is normalizedCarPosition, 0 to 1 from the line.
+	# Returns the segment updated, -1 for a sample with no duration.
+	def add(self, position, dt, camber, load, optimalF, optimalR):
+		if dt <= 0:
+			return -1
+		segment = int(position * self.segments)
+		if segment >= self.segments:
+			segment = self.segments - 1
+		elif segment < 0:
+			segment = 0
+		self.session.add(segment, dt, camber, load, optimalF, optimalR)
+		return segment
+
+
+# python -m camberlib.segments
+# add() cost as the session gets longer, which should stay flat, the
+# memory an extra lap allocates, and the session mean and variance
+# for one segment against recomputing them from the samples
+def benchmark(laps=20, lapSeconds=60.0, rate=333):
+	import math
+	import random
+	import time
+	import tracemalloc
+
+	rng = random.Random(5)
+	dt = 1.0 / rate
+	steps = int(lapSeconds * rate)
+	checkSegment = SEGMENTS // 3
+	stats = TrackStats()
+
+	def drive(kept):
+		for step in range(steps):
+			position = step / steps
+			lateral = math.sin(position * 2 * math.pi * 7)
+			s = 0.7 * lateral + rng.gauss(0, 0.05)
+			camber = (-3.0 + s, -3.0 - s, -2.0 + s, -2.0 - s)
+			load = (3200 + 1500 * lateral, 3200 - 1500 * lateral, 2900 + 1200 * lateral, 2900 - 1200 * lateral)
+			if stats.add(position, dt, camber, load, -3.2, -2.4) == checkSegment:
+				kept.append(camber)
+
+	kept = []
+	perLap = []
+	for lap in range(laps):
+		t = time.perf_counter()
+		drive(kept)
+		perLap.append((time.perf_counter() - t) / steps)
+
+	lapKept = len(kept)
+	tracemalloc.start()
+	before = tracemalloc.get_traced_memory()[0]
+	drive(kept)
+	grown = tracemalloc.get_traced_memory()[0] - before
+	tracemalloc.stop()
+	lapKept = len(kept) - lapKept
+
+	worst = 0.0
+	for wheel in range(WHEELS):
+		values = [camber[wheel] for camber in kept]
+		mean = sum(values) / len(values)
+		variance = sum((v - mean) ** 2 for v in values) / len(values)
+		worst = max(worst, abs(stats.session.mean[checkSegment * WHEELS + wheel] - mean),
+			abs(stats.session.variance(checkSegment, wheel) - variance))
+
+	print("{0} laps of {1:.0f} s at {2} Hz, {3} segments".format(laps + 1, lapSeconds, rate, SEGMENTS))
+	print("add() first lap {0:.2f} us, last lap {1:.2f} us".format(perLap[0] * 1e6, perLap[-1] * 1e6))
+	print("lap {0} allocated {1} bytes net, holding the {2} samples kept for the check".format(laps + 1, grown, lapKept))
+	print("session mean/variance against the samples, max difference {0:.2g}".format(worst))
+	blue, green, red = stats.session.totals(0)
+	print("FL blue {0:.0f} s green {1:.0f} s red {2:.0f} s of {3:.0f} s".format(blue, green, red, (laps + 1) * lapSeconds))
+
+
+if __name__ == '__main__':
+	benchmark()
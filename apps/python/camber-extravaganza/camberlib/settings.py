@@ -0,0 +1,275 @@
+##############################################################
+# Options file
+#
+# Options are kept as JSON, {"version": VERSION, "options": {}},
+# and every value is checked against a schema on the way in, so
+# a hand edited or truncated file can't take acMain down.  Bad
+# values are skipped one by one and keep their defaults.
+#
+# A schema rule is (bool,), (int, min, max), (float, min, max)
+# or (str, allowed, ...).  Numbers must be finite; json reads
+# Infinity and NaN.
+#
+# Versions before 2.3 pickled a plain dict to options.dat.  If there
+# is no JSON file yet that is read once, through the same checks,
+# with an unpickler that refuses anything but builtin values, and
+# written out as JSON.
+#
+# save() only takes a copy of the values.  A writer thread waits
+# until nothing has changed for DELAY seconds, so a burst of
+# clicks is one write, then writes a temp file and renames it
+# over the old one.  flush() writes anything pending right away.
+#############################################################
+
+import json
+import math
+import os
+import pickle
+import threading
+import time
+import traceback
+
+VERSION = 1
+DELAY = 1.0           # seconds without changes before writing
+
+
+def noLog(message):
+	pass
+
+
+# Returns the value as the rule's type, or raises ValueError
+def checkValue(value, rule):
+	kind = rule[0]
+	if kind is bool:
+		if not isinstance(value, bool):
+			raise ValueError("expected true or false")
+		return value
+	if kind is str:
+		if value not in rule[1:]:
+			raise ValueError("expected one of " + ", ".join(rule[1:]))
+		return value
+	if isinstance(value, bool) or not isinstance(value, (int, float)):
+		raise ValueError("expected a number")
+	if not math.isfinite(value):
+		raise ValueError("expected a finite number")
+	if kind is int and value != int(value):
+		raise ValueError("expected a whole number")
+	value = kind(value)
+	if not rule[1] <= value <= rule[2]:
+		raise ValueError("expected {0} to {1}".format(rule[1], rule[2]))
+	return value
+
+
+# Returns {name: value} for every valid entry in the file, empty if
+# there's no file or it can't be read
+def readOptions(path, schema, log=noLog):
+	try:
+		with open(path, 'r') as f:
+			data = json.load(f)
+		version = data["version"]
+		options = data["options"]
+		if not isinstance(options, dict):
+			raise ValueError("options is not an object")
+	except (IOError, OSError) as e:
+		if os.path.exists(path):
+			log("CamberExtravaganza ERROR: Could not read options %s: %s" % (path, e))
+		return {}
+	except (ValueError, KeyError, TypeError) as e:
+		log("CamberExtravaganza ERROR: Ignoring broken options file %s: %s" % (path, e))
+		return {}
+	if version != VERSION:
+		log("CamberExtravaganza ERROR: Ignoring options file version %s" % version)
+		return {}
+
+	return checkValues(options, schema, log)
+
+
+# Returns {name: value} for the entries that are in the schema and pass it
+def checkValues(options, schema, log=noLog):
+	values = {}
+	for name, value in options.items():
+		if name not in schema:
+			continue
+		try:
+			values[name] = checkValue(value, schema[name])
+		except (ValueError, TypeError) as e:
+			log("CamberExtravaganza ERROR: Ignoring option %s = %r: %s" % (name, value, e))
+	return values
+
+
+class PlainUnpickler(pickle.Unpickler):
+	def find_class(self, module, name):
+		raise pickle.UnpicklingError("%s.%s is not an option value" % (module, name))
+
+
+# Returns the valid values in a pre 2.3 options.dat, empty if there's
+# none or it can't be read
+def readLegacyOptions(path, schema, log=noLog):
+	try:
+		with open(path, 'rb') as f:
+			options = PlainUnpickler(f).load()
+		if not isinstance(options, dict):
+			raise ValueError("not a dict")
+	except (IOError, OSError) as e:
+		if os.path.exists(path):
+			log("CamberExtravaganza ERROR: Could not read old options %s: %s" % (path, e))
+		return {}
+	except (pickle.UnpicklingError, ValueError, EOFError, TypeError, AttributeError, IndexError) as e:
+		log("CamberExtravaganza ERROR: Ignoring broken old options file %s: %s" % (path, e))
+		return {}
+	return checkValues(options, schema, log)
+
+
+def writeOptions(path, values):
+	tmpPath = path + ".tmp"
+	with open(tmpPath, 'w') as f:
+		json.dump({"version": VERSION, "options": values}, f, indent=1, sort_keys=True)
+	os.replace(tmpPath, path)
+
+
+class OptionsStore:
+	def __init__(self, path, schema, delay=DELAY, log=noLog, legacyPath=None):
+		self.path = path
+		self.legacyPath = legacyPath
+		self.schema = schema
+		self.delay = delay
+		self.log = log
+		self.lock = threading.Lock()
+		self.writeLock = threading.Lock()
+		self.thread = None
+		self.pending = None
+		self.due = 0.0
+		self.written = None
+		self.writes = 0
+
+	# Reads the file and remembers it as written, returns the valid values.
+	# Without a file, imports legacyPath if there is one.
+	def load(self):
+		if self.legacyPath is not None and not os.path.exists(self.path) and os.path.exists(self.legacyPath):
+			values = readLegacyOptions(self.legacyPath, self.schema, self.log)
+			self.log("CamberExtravaganza: Imported %d options from %s" % (len(values), self.legacyPath))
+			self.written = None
+			self.write(values)
+			return values
+		values = readOptions(self.path, self.schema, self.log)
+		self.written = values
+		return values
+
+	# Takes the schema's entries out of options, writes them later if they changed
+	def save(self, options):
+		values = dict((name, options[name]) for name in self.schema)
+		with self.lock:
+			self.pending = values
+			self.due = time.perf_counter() + self.delay
+			if self.thread is not None:
+				return
+			self.thread = threading.Thread(target=self.run, name="CamberExtravaganza options")
+			self.thread.daemon = True
+			self.thread.start()
+
+	def run(self):
+		while True:
+			with self.lock:
+				if self.pending is None:
+					self.thread = None
+					return
+				wait = self.due - time.perf_counter()
+				if wait <= 0:
+					values = self.pending
+					self.pending = None
+			if wait > 0:
+				time.sleep(wait)
+			else:
+				self.write(values)
+
+	# Writes anything pending now, for shutdown
+	def flush(self):
+		with self.lock:
+			values = self.pending
+			self.pending = None
+		thread = self.thread
+		if values is not None:
+			self.write(values)
+		if thread is not None:
+			thread.join(self.delay + 1.0)
+
+	def write(self, values):
+		with self.writeLock:
+			if values is None or values == self.written:
+				return
+			try:
+				writeOptions(self.path, values)
+				self.written = values
+				self.writes += 1
+			except (IOError, OSError, TypeError, ValueError):
+				self.log("CamberExtravaganza ERROR: OptionsStore.write(): %s" % traceback.format_exc())
+
+
+# python -m camberlib.settings
+# Cost of save() on the clicking thread against the old synchronous
+# pickle dump, how many writes a burst of clicks turns into, reading
+# back a damaged file and importing an old options.dat
+def benchmark(clicks=200):
+	import pickle
+	import tempfile
+
+	schema = {
+		"drawGraphs": (bool,),
+		"graphMode": (int, 0, 2),
+		"alpha": (float, 0.0, 1.0),
+		"graphWidth": (int, 10, 1000),
+		"streamProtocol": (str, "udp", "tcp")
+	}
+	options = {"drawGraphs": False, "graphMode": 0, "alpha": 0.5, "graphWidth": 150, "streamProtocol": "udp", "carNotFound": False}
+	tmpDir = tempfile.mkdtemp()
+	picklePath = os.path.join(tmpDir, "options.dat")
+	jsonPath = os.path.join(tmpDir, "options.json")
+
+	t = time.perf_counter()
+	for i in range(clicks):
+		options["drawGraphs"] = not options["drawGraphs"]
+		with open(picklePath, 'wb') as handle:
+			pickle.dump(dict((name, options[name]) for name in schema), handle, protocol=pickle.HIGHEST_PROTOCOL)
+	old = (time.perf_counter() - t) / clicks
+
+	store = OptionsStore(jsonPath, schema, delay=0.05)
+	t = time.perf_counter()
+	for i in range(clicks):
+		options["drawGraphs"] = not options["drawGraphs"]
+		store.save(options)
+	new = (time.perf_counter() - t) / clicks
+	time.sleep(0.2)
+	store.flush()
+
+	print("pickle dump per click {0:7.1f} us, {1} writes".format(old * 1e6, clicks))
+	print("OptionsStore.save     {0:7.1f} us, {1} write(s)".format(new * 1e6, store.writes))
+	print("read back", readOptions(jsonPath, schema) == dict((name, options[name]) for name in schema))
+
+	with open(jsonPath, 'w') as f:
+		f.write('{"version": 1, "options": {"alpha": 7, "graphMode": "x", "graphWidth": 300')
+	print("truncated file", readOptions(jsonPath, schema, print))
+	with open(jsonPath, 'w') as f:
+		json.dump({"version": 1, "options": {"alpha": 7, "graphMode": 1.5, "graphWidth": 300, "streamProtocol": "ftp"}}, f)
+	print("bad values", readOptions(jsonPath, schema, print))
+	with open(jsonPath, 'w') as f:
+		f.write('{"version": 1, "options": {"alpha": NaN, "graphWidth": Infinity, "graphMode": -Infinity}}')
+	print("non-finite values", readOptions(jsonPath, schema, print))
+
+	os.remove(jsonPath)
+	with open(picklePath, 'wb') as handle:
+		pickle.dump({"drawGraphs": True, "graphMode": 2, "alpha": 7}, handle, protocol=pickle.HIGHEST_PROTOCOL)
+	imported = OptionsStore(jsonPath, schema, log=print, legacyPath=picklePath).load()
+	print("old options.dat", imported, "written", readOptions(jsonPath, schema) == imported)
+	with open(picklePath, 'wb') as handle:
+		pickle.dump({"graphMode": OptionsStore}, handle, protocol=pickle.HIGHEST_PROTOCOL)
+	os.remove(jsonPath)
+	print("old options.dat with a class", readLegacyOptions(picklePath, schema, print))
+
+	for path in (picklePath, jsonPath):
+		if os.path.exists(path):
+			os.remove(path)
+	os.rmdir(tmpDir)
+
+
+if __name__ == '__main__':
+	benchmark()
@@ -0,0 +1,297 @@
+##############################################################
+# Optimal camber solver
+#
+# One component for both axles: picks the outer/inner wheel,
+# weights them by load sensitivity, applies the closed form and
+# smooths the result.  Wheels are always in FL, FR, RL, RR order.
+# Smoothing is exponential with a time constant, each step given
+# the seconds it covers, so the optimum settles the same way at
+# 30, 60 or 144 fps.
+#
+# The solver mode picks between that closed form and maximizing
+# the full grip curve numerically, see camberlib.grip.  Given
+# camberlib.tables for the car, the full curve is looked up
+# instead of solved.
+#
+# solveSession() runs the same closed form over whole recorded
+# sessions at once, with NumPy if it's there (it isn't inside
+# AC) and plain Python otherwise.  NumPy is only imported then.
+#############################################################
+
+import math
+
+from camberlib import grip, lazy
+
+NOT_FOUND = 99       # optimal camber shown when there is no tyre data
+SETTLED = 15         # degrees, an optimum further out is still settling from 999 or NOT_FOUND
+FILTER = 0.97        # per-frame exponential smoothing of the optimum at FRAME
+FRAME = 1.0 / 60     # seconds, the frame FILTER was tuned at
+TAU = -FRAME / math.log(FILTER) # seconds, FILTER as a time constant, ~0.55
+UNKNOWN = (999, -999, 1) # (DCAMBER_0, DCAMBER_1, LS_EXPY) before tyre data loads
+CLOSED_FORM = 0
+FULL_CURVE = 1
+
+
+# (2*(1-w)*D1*c-(1-2*w)*D0)/(2*D1), camberSplit in radians, result in degrees
+def optimalCamber(weightXfer, dcamber0, dcamber1, camberSplit):
+	if dcamber0 == 0 or dcamber1 == 0:
+		return 0
+	return math.degrees((2 * (1 - weightXfer) * dcamber1 * camberSplit - (1 - 2 * weightXfer) * dcamber0) / (2 * dcamber1))
+
+
+# Returns (weightXfer, outer wheel index within the axle) for one axle
+def axleWeight(loadL, loadR, lsExpy):
+	outer = max(0.001, loadL, loadR)
+	inner = min(loadL, loadR)
+	# DY_LS_FL = DY_REF * pow(TIRE_LOAD_FL / FZ0, LS_EXPY)
+	ls_outer = pow(outer, lsExpy)
+	ls_inner = pow(inner, lsExpy)
+	return ls_outer / (ls_inner + ls_outer), 0 if outer == loadL else 1
+
+
+# Returns (optimal, outer wheel index within the axle) for one axle
+def solveAxle(loadL, loadR, camberL, camberR, dcamber0, dcamber1, lsExpy):
+	weightXfer, side = axleWeight(loadL, loadR, lsExpy)
+	return optimalCamber(weightXfer, dcamber0, dcamber1, abs(camberL - camberR)), side
+
+
+# Share of the old value an exponential filter keeps after dt seconds
+def smoothing(dt, tau=TAU):
+	if tau <= 0:
+		return 0.0
+	return math.exp(-dt / tau)
+
+
+class AxleSolver:
+	def __init__(self, tau=TAU, mode=CLOSED_FORM):
+		self.tau = tau
+		self.mode = mode
+		self.guess = [None, None]  # last full curve optimum per axle, radians
+		self.front = UNKNOWN
+		self.rear = UNKNOWN
+		self.tables = None         # (front, rear) OptimalTable for the full curve
+		self.notFound = False
+		self.optimal = [999, 999]  # front, rear, degrees
+		self.outer = [0, 2]        # index of the outer wheel per axle
+
+	# Each axle is (DCAMBER_0, DCAMBER_1, LS_EXPY), None if the car is unknown.
+	# tables is (front, rear) from camberlib.tables, or None to solve.
+	def setParams(self, front, rear, tables=None):
+		self.guess = [None, None]
+		self.tables = tables
+		if front is None or rear is None:
+			self.notFound = True
+			self.front = UNKNOWN
+			self.rear = UNKNOWN
+		else:
+			self.notFound = False
+			self.front = front
+			self.rear = rear
+
+	# loads and cambers are flat FL, FR, RL, RR sequences, dt the
+	# seconds since the last step
+	def step(self, loads, cambers, dt=FRAME):
+		f = smoothing(dt, self.tau)
+		optimal = self.optimal
+		if self.notFound:
+			optimal[0] = f * optimal[0] + (1 - f) * NOT_FOUND
+			optimal[1] = f * optimal[1] + (1 - f) * NOT_FOUND
+			self.outer[0] = 0 if max(0.001, loads[0], loads[1]) == loads[0] else 1
+			self.outer[1] = 2 if max(0.001, loads[2], loads[3]) == loads[2] else 3
+			return optimal
+
+		if self.mode == FULL_CURVE and self.tables is not None:
+			frontTable, rearTable = self.tables
+			weightXfer, side = axleWeight(loads[0], loads[1], self.front[2])
+			optimal[0] = f * optimal[0] + (1 - f) * frontTable.lookup(weightXfer, abs(cambers[0] - cambers[1]))
+			self.outer[0] = side
+
+			weightXfer, side = axleWeight(loads[2], loads[3], self.rear[2])
+			optimal[1] = f * optimal[1] + (1 - f) * rearTable.lookup(weightXfer, abs(cambers[2] - cambers[3]))
+			self.outer[1] = 2 + side
+			return optimal
+
+		if self.mode == FULL_CURVE:
+			guess = self.guess
+			d0, d1, ls = self.front
+			weightXfer, side = axleWeight(loads[0], loads[1], ls)
+			guess[0] = grip.optimalCamberRad(weightXfer, d0, d1, abs(cambers[0] - cambers[1]), guess[0])
+			optimal[0] = f * optimal[0] + (1 - f) * math.degrees(guess[0])
+			self.outer[0] = side
+
+			d0, d1, ls = self.rear
+			weightXfer, side = axleWeight(loads[2], loads[3], ls)
+			guess[1] = grip.optimalCamberRad(weightXfer, d0, d1, abs(cambers[2] - cambers[3]), guess[1])
+			optimal[1] = f * optimal[1] + (1 - f) * math.degrees(guess[1])
+			self.outer[1] = 2 + side
+			return optimal
+
+		d0, d1, ls = self.front
+		target, side = solveAxle(loads[0], loads[1], cambers[0], cambers[1], d0, d1, ls)
+		optimal[0] = f * optimal[0] + (1 - f) * target
+		self.outer[0] = side
+
+		d0, d1, ls = self.rear
+		target, side = solveAxle(loads[2], loads[3], cambers[2], cambers[3], d0, d1, ls)
+		optimal[1] = f * optimal[1] + (1 - f) * target
+		self.outer[1] = 2 + side
+		return optimal
+
+
+# Unsmoothed optimum for every frame of a session.  loads and cambers
+# are N rows of FL, FR, RL, RR, axles are (DCAMBER_0, DCAMBER_1, LS_EXPY).
+# Returns (front, rear) as NumPy arrays or lists.
+def solveSession(loads, cambers, front, rear, useNumpy=True):
+	numpy = lazy.optional("numpy") if useNumpy else None
+	if numpy is not None:
+		loads = numpy.asarray(loads, dtype=numpy.float64)
+		cambers = numpy.asarray(cambers, dtype=numpy.float64)
+		return (
+			solveAxleArray(loads[:, 0], loads[:, 1], cambers[:, 0], cambers[:, 1], *front),
+			solveAxleArray(loads[:, 2], loads[:, 3], cambers[:, 2], cambers[:, 3], *rear)
+		)
+
+	outFront = []
+	outRear = []
+	for l, c in zip(loads, cambers):
+		outFront.append(solveAxle(l[0], l[1], c[0], c[1], *front)[0])
+		outRear.append(solveAxle(l[2], l[3], c[2], c[3], *rear)[0])
+	return outFront, outRear
+
+
+def solveAxleArray(loadL, loadR, camberL, camberR, dcamber0, dcamber1, lsExpy):
+	numpy = lazy.optional("numpy")
+	if dcamber0 == 0 or dcamber1 == 0:
+		return numpy.zeros(len(loadL))
+	outer = numpy.maximum(0.001, numpy.maximum(loadL, loadR))
+	inner = numpy.minimum(loadL, loadR)
+	ls_outer = outer ** lsExpy
+	ls_inner = inner ** lsExpy
+	weightXfer = ls_outer / (ls_inner + ls_outer)
+	split = numpy.abs(camberL - camberR)
+	return numpy.degrees((2 * (1 - weightXfer) * dcamber1 * split - (1 - 2 * weightXfer) * dcamber0) / (2 * dcamber1))
+
+
+# AxleSolver's smoothing applied after the fact.  dt is seconds per
+# value, or a sequence of them, like a recorded session's.
+def filterSeries(values, initial=999, dt=FRAME, tau=TAU):
+	out = []
+	last = initial
+	if isinstance(dt, (int, float)):
+		f = smoothing(dt, tau)
+		for v in values:
+			last = f * last + (1 - f) * v
+			out.append(last)
+		return out
+	for v, step in zip(values, dt):
+		f = smoothing(step, tau)
+		last = f * last + (1 - f) * v
+		out.append(last)
+	return out
+
+
+# python -m camberlib.solver
+# Checks AxleSolver against the old per-axle code in onFormRender and
+# solveSession against AxleSolver, the same drive at 30, 60 and 144
+# fps against 60 with a time constant and with the old FILTER per
+# frame, then times them.  Returns False, and the module exits 1, if
+# any parity check is off by more than PARITY.
+def benchmark(frames=20000):
+	import random
+	import time
+
+	PARITY = 1e-9  # degrees
+	failed = []
+
+	def parity(name, worst):
+		ok = worst <= PARITY
+		if not ok:
+			failed.append(name)
+		print("{0}, max difference {1:.3g} deg (limit {2:.0e}) {3}".format(name, worst, PARITY, "OK" if ok else "FAIL"))
+
+	numpy = lazy.optional("numpy")
+	rng = random.Random(3)
+	loads = [tuple(rng.uniform(0, 6000) for _ in range(4)) for _ in range(frames)]
+	cambers = [tuple(rng.uniform(-0.08, 0.01) for _ in range(4)) for _ in range(frames)]
+	front = (1.2, -13.0, 0.8071)
+	rear = (1.1, -12.0, 0.8179)
+
+	# onFormRender before the solver, one axle
+	def legacyAxle(flL, frL, flC, frC, old, params):
+		outer = max(0.001, flL, frL)
+		inner = min(flL, frL)
+		camberSplit = abs(flC - frC)
+		ls_outer = pow(outer, params[2])
+		ls_inner = pow(inner, params[2])
+		weightXfer = ls_outer / (ls_inner + ls_outer)
+		new = optimalCamber(weightXfer, params[0], params[1], camberSplit)
+		return 0.97 * old + (1 - 0.97) * new, outer == flL
+
+	solver = AxleSolver()
+	solver.setParams(front, rear)
+	oldF = oldR = 999
+	worst = 0
+	for l, c in zip(loads, cambers):
+		oldF, leftF = legacyAxle(l[0], l[1], c[0], c[1], oldF, front)
+		oldR, leftR = legacyAxle(l[2], l[3], c[2], c[3], oldR, rear)
+		optF, optR = solver.step(l, c)
+		worst = max(worst, abs(optF - oldF), abs(optR - oldR))
+		assert (solver.outer[0] == 0) == leftF and (solver.outer[1] == 2) == leftR
+	parity("per-frame parity", worst)
+
+	pureF, pureR = solveSession(loads, cambers, front, rear, useNumpy=False)
+	solver = AxleSolver()
+	solver.setParams(front, rear)
+	series = [list(solver.step(l, c)) for l, c in zip(loads, cambers)]
+	worst = max(max(abs(a - s[0]), abs(b - s[1])) for a, b, s in zip(filterSeries(pureF), filterSeries(pureR), series))
+	parity("session parity (pure Python)", worst)
+
+	# Compared every 1/6 s, a whole number of frames at each rate
+	def drive(fps, perFrame, seconds=20):
+		solver = AxleSolver()
+		solver.setParams(front, rear)
+		out = []
+		for frame in range(seconds * fps + 1):
+			t = frame / float(fps)
+			lateral = math.sin(t * 1.3) * math.sin(t * 0.23)
+			roll = 0.012 * lateral
+			l = (3200 + 1800 * lateral, 3200 - 1800 * lateral, 2900 + 1500 * lateral, 2900 - 1500 * lateral)
+			c = (-0.045 + roll, -0.045 - roll, -0.03 + 0.7 * roll, -0.03 - 0.7 * roll)
+			if perFrame:
+				optimal = solver.step(l, c)
+			else:
+				optimal = solver.step(l, c, 1.0 / fps if frame else 0.0)
+			if frame % (fps // 6) == 0 and t >= 2:
+				out.append(tuple(optimal))
+		return out
+
+	for perFrame in (True, False):
+		reference = drive(60, perFrame)
+		for fps in (30, 144):
+			worst = max(max(abs(a[0] - b[0]), abs(a[1] - b[1])) for a, b in zip(reference, drive(fps, perFrame)))
+			print("{0:14s} {1:3d} fps against 60, max difference {2:.3g} deg".format(
+				"FILTER/frame" if perFrame else "time constant", fps, worst))
+
+	t = time.perf_counter()
+	for l, c in zip(loads, cambers):
+		solver.step(l, c)
+	print("AxleSolver.step       {0:8.3f} us/frame".format((time.perf_counter() - t) * 1e6 / frames))
+	t = time.perf_counter()
+	solveSession(loads, cambers, front, rear, useNumpy=False)
+	print("solveSession (Python) {0:8.3f} us/frame".format((time.perf_counter() - t) * 1e6 / frames))
+
+	if numpy is not None:
+		npLoads = numpy.array(loads)
+		npCambers = numpy.array(cambers)
+		npF, npR = solveSession(npLoads, npCambers, front, rear)
+		worst = max(numpy.max(numpy.abs(npF - pureF)), numpy.max(numpy.abs(npR - pureR)))
+		parity("session parity (NumPy)", worst)
+		t = time.perf_counter()
+		solveSession(npLoads, npCambers, front, rear)
+		print("solveSession (NumPy)  {0:8.3f} us/frame".format((time.perf_counter() - t) * 1e6 / frames))
+	return not failed
+
+
+if __name__ == '__main__':
+	import sys
+	sys.exit(0 if benchmark() else 1)
@@ -0,0 +1,373 @@
+##############################################################
+# Telemetry streaming server
+#
+# Publishes each frame's camber, load, optimal camber and wheel
+# colours to other programs, over UDP or TCP on a local port.
+# publish() only appends a tuple to a bounded deque, which drops
+# the oldest frame when full; encoding and sending happen on the
+# server thread.  Every client gets every frame it can keep up
+# with, a slow TCP client only loses its own stale frames.
+#
+# UDP clients subscribe by sending any datagram to the port, and
+# keep doing so at least every SUBSCRIBE_TIMEOUT seconds.  TCP
+# clients just connect.
+#
+# Messages are FRAME below (little endian, 66 bytes), or one JSON
+# object per line with the same fields.  AC's own Python has no
+# _socket module, streaming needs one (and select) in
+# third_party/lib(64).  Without them the app still loads, the
+# stream just doesn't start.
+#############################################################
+
+import collections
+import errno
+import json
+import math
+import struct
+import threading
+import time
+import traceback
+
+try:
+	import select
+	import socket
+except ImportError:
+	select = None
+	socket = None
+
+MAGIC = b"CX"
+FRAME = struct.Struct("<2sId4f4f2f12B")  # magic, sequence, time, camber°, load, optimal° F/R, rgb per wheel
+QUEUE = 64            # frames waiting for the server thread
+CLIENT_QUEUE = 32     # encoded frames waiting per TCP client
+INTERVAL = 0.005      # server thread wakes at least this often
+SUBSCRIBE_TIMEOUT = 10.0
+MAX_CLIENTS = 16
+BINARY = "binary"
+JSON = "json"
+
+
+def noLog(message):
+	pass
+
+
+def encodeBinary(sequence, t, camber, load, optimal, colors):
+	degrees = math.degrees
+	rgb = []
+	for r, g, b, a in colors:
+		rgb += (int(r * 255 + 0.5), int(g * 255 + 0.5), int(b * 255 + 0.5))
+	return FRAME.pack(MAGIC, sequence & 0xFFFFFFFF, t,
+		degrees(camber[0]), degrees(camber[1]), degrees(camber[2]), degrees(camber[3]),
+		load[0], load[1], load[2], load[3], optimal[0], optimal[1], *rgb)
+
+
+def encodeJson(sequence, t, camber, load, optimal, colors):
+	return (json.dumps({
+		"seq": sequence,
+		"t": t,
+		"camber": [math.degrees(c) for c in camber],
+		"load": list(load),
+		"optimal": list(optimal),
+		"color": [[round(r, 3), round(g, 3), round(b, 3)] for r, g, b, a in colors]
+	}, separators=(',', ':')) + "\n").encode("utf-8")
+
+
+# Returns a dict with the same fields as encodeJson
+def decodeBinary(data):
+	fields = FRAME.unpack(data)
+	if fields[0] != MAGIC:
+		raise ValueError("Not a camber frame")
+	rgb = fields[13:]
+	return {
+		"seq": fields[1],
+		"t": fields[2],
+		"camber": list(fields[3:7]),
+		"load": list(fields[7:11]),
+		"optimal": list(fields[11:13]),
+		"color": [[rgb[i] / 255, rgb[i + 1] / 255, rgb[i + 2] / 255] for i in range(0, 12, 3)]
+	}
+
+
+class TcpClient:
+	def __init__(self, sock, address):
+		self.sock = sock
+		self.address = address
+		self.queue = collections.deque(maxlen=CLIENT_QUEUE)
+		self.partial = b""
+
+	# Sends what the socket takes without blocking, False if the client is gone
+	def flush(self):
+		try:
+			while self.partial or self.queue:
+				if not self.partial:
+					self.partial = self.queue.popleft()
+				sent = self.sock.send(self.partial)
+				self.partial = self.partial[sent:]
+		except socket.error as e:
+			if e.args and e.args[0] in (errno.EAGAIN, errno.EWOULDBLOCK):
+				return True
+			return False
+		return True
+
+
+class TelemetryStream:
+	def __init__(self, port, protocol="udp", format=BINARY, host="127.0.0.1", log=noLog):
+		self.port = port
+		self.protocol = protocol
+		self.host = host
+		self.encode = encodeJson if format == JSON else encodeBinary
+		self.log = log
+		self.frames = collections.deque(maxlen=QUEUE)
+		self.sequence = 0
+		self.published = 0
+		self.sent = 0
+		self.dropped = 0
+		self.errors = 0
+		self.running = False
+		self.thread = None
+		self.sock = None
+		self.subscribers = {}   # UDP address: last hello time
+		self.clients = []       # TcpClient
+
+	# Returns False if there's no socket support or the port is taken
+	def start(self):
+		if socket is None:
+			self.log("CamberExtravaganza ERROR: TelemetryStream: no _socket or select module, see camberlib/stream.py")
+			return False
+		try:
+			if self.protocol == "tcp":
+				self.sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+				self.sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+				self.sock.bind((self.host, self.port))
+				self.sock.listen(4)
+			else:
+				self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+				self.sock.bind((self.host, self.port))
+			self.sock.setblocking(False)
+			self.port = self.sock.getsockname()[1]
+		except socket.error:
+			self.log("CamberExtravaganza ERROR: TelemetryStream.start(): %s" % traceback.format_exc())
+			self.close()
+			return False
+		self.running = True
+		self.thread = threading.Thread(target=self.run, name="CamberExtravaganza stream")
+		self.thread.daemon = True
+		self.thread.start()
+		return True
+
+	def stop(self):
+		self.running = False
+		if self.thread is not None:
+			self.thread.join(1.0)
+			self.thread = None
+		self.close()
+
+	def close(self):
+		for client in self.clients:
+			client.sock.close()
+		self.clients = []
+		if self.sock is not None:
+			self.sock.close()
+			self.sock = None
+
+	# Render thread side, everything as the app has it: camber in radians
+	# (sent in degrees), optimal in degrees, colors (r, g, b, a) per wheel
+	def publish(self, camber, load, optimal, colors):
+		frames = self.frames
+		if len(frames) == QUEUE:
+			self.dropped += 1
+		frames.append((time.perf_counter(), camber, load, optimal, colors))
+
+	def run(self):
+		while self.running:
+			try:
+				self.serve()
+			except Exception:
+				self.errors += 1
+				if self.errors == 1:
+					self.log("CamberExtravaganza ERROR: TelemetryStream.run(): %s" % traceback.format_exc())
+				time.sleep(INTERVAL)
+
+	def serve(self):
+		readable = [self.sock]
+		writable = [client.sock for client in self.clients if client.partial or client.queue]
+		readable, writable, broken = select.select(readable, writable, [], INTERVAL)
+		if readable:
+			self.accept()
+
+		frames = self.frames
+		while frames:
+			t, camber, load, optimal, colors = frames.popleft()
+			self.sequence += 1
+			self.published += 1
+			message = self.encode(self.sequence, t, camber, load, optimal, colors)
+			if self.protocol == "tcp":
+				for client in self.clients:
+					client.queue.append(message)
+			else:
+				for address in list(self.subscribers):
+					try:
+						self.sock.sendto(message, address)
+						self.sent += 1
+					except socket.error:
+						pass  # buffer full or client gone, UDP drops it anyway
+
+		if self.protocol == "tcp":
+			alive = []
+			for client in self.clients:
+				before = len(client.queue)
+				if client.flush():
+					self.sent += before - len(client.queue)
+					alive.append(client)
+				else:
+					client.sock.close()
+			self.clients = alive
+		else:
+			now = time.perf_counter()
+			for address, seen in list(self.subscribers.items()):
+				if now - seen > SUBSCRIBE_TIMEOUT:
+					del self.subscribers[address]
+
+	def accept(self):
+		try:
+			if self.protocol == "tcp":
+				sock, address = self.sock.accept()
+				if len(self.clients) >= MAX_CLIENTS:
+					sock.close()
+					return
+				sock.setblocking(False)
+				sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+				self.clients.append(TcpClient(sock, address))
+			else:
+				while True:
+					data, address = self.sock.recvfrom(64)
+					if address in self.subscribers or len(self.subscribers) < MAX_CLIENTS:
+						self.subscribers[address] = time.perf_counter()
+		except socket.error:
+			pass
+
+	def clientCount(self):
+		return len(self.clients) if self.protocol == "tcp" else len(self.subscribers)
+
+
+# Loopback client, for tools/stream_client.py and the benchmark.
+# Keeps each decoded frame's latency against the sender's clock,
+# which is only meaningful on the same machine.
+class StreamClient:
+	def __init__(self, host, port, protocol="udp", format=BINARY, onFrame=None):
+		self.address = (host, port)
+		self.protocol = protocol
+		self.format = format
+		self.onFrame = onFrame
+		self.latencies = []
+		self.lastSequence = None
+		self.missed = 0
+		self.running = False
+		self.thread = None
+		if protocol == "tcp":
+			self.sock = socket.create_connection(self.address)
+		else:
+			self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+			self.sock.sendto(b"hello", self.address)
+		self.sock.settimeout(0.1)
+
+	def start(self):
+		self.running = True
+		self.thread = threading.Thread(target=self.run, name="CamberExtravaganza stream client")
+		self.thread.daemon = True
+		self.thread.start()
+
+	def stop(self):
+		self.running = False
+		if self.thread is not None:
+			self.thread.join(1.0)
+			self.thread = None
+		self.sock.close()
+
+	def frame(self, frame):
+		self.latencies.append(time.perf_counter() - frame["t"])
+		if self.lastSequence is not None and frame["seq"] > self.lastSequence + 1:
+			self.missed += frame["seq"] - self.lastSequence - 1
+		self.lastSequence = frame["seq"]
+		if self.onFrame is not None:
+			self.onFrame(frame)
+
+	def run(self):
+		buffer = b""
+		hello = time.perf_counter()
+		while self.running:
+			if self.protocol == "udp" and time.perf_counter() - hello > SUBSCRIBE_TIMEOUT / 2:
+				self.sock.sendto(b"hello", self.address)
+				hello = time.perf_counter()
+			try:
+				data = self.sock.recv(65536)
+			except socket.timeout:
+				continue
+			except socket.error:
+				break
+			if not data:
+				break
+			if self.protocol == "udp":
+				self.frame(decodeBinary(data) if self.format == BINARY else json.loads(data.decode("utf-8")))
+				continue
+			buffer += data
+			if self.format == BINARY:
+				size = FRAME.size
+				end = len(buffer) - len(buffer) % size
+				for i in range(0, end, size):
+					self.frame(decodeBinary(buffer[i:i + size]))
+				buffer = buffer[end:]
+			else:
+				lines = buffer.split(b"\n")
+				buffer = lines.pop()
+				for line in lines:
+					self.frame(json.loads(line.decode("utf-8")))
+
+
+# python -m camberlib.stream
+# publish() cost, and throughput and latency to loopback clients over
+# both protocols, frames at 333 Hz for a few seconds
+def benchmark(seconds=3.0, rate=333, clients=3):
+	colors = [(0.1, 0.9, 0.2, 0.5)] * 4
+	idle = TelemetryStream(0)
+	t = time.perf_counter()
+	for _ in range(100000):
+		idle.publish((-0.054, -0.052, -0.037, -0.035), (3000.0, 3100.0, 2900.0, 2800.0), (-3.2, -2.4), colors)
+	publish = (time.perf_counter() - t) / 100000
+	print("publish() {0:.2f} us".format(publish * 1e6))
+
+	for protocol, format in (("udp", BINARY), ("tcp", BINARY), ("tcp", JSON)):
+		stream = TelemetryStream(0, protocol, format)
+		stream.start()
+		readers = [StreamClient("127.0.0.1", stream.port, protocol, format) for _ in range(clients)]
+		for reader in readers:
+			reader.start()
+		deadline = time.perf_counter() + 2
+		while stream.clientCount() < clients and time.perf_counter() < deadline:
+			time.sleep(0.01)
+
+		total = int(seconds * rate)
+		start = time.perf_counter()
+		for i in range(total):
+			stream.publish((-0.054, -0.052, -0.037, -0.035), (3000.0, 3100.0, 2900.0, 2800.0), (-3.2, -2.4), colors)
+			delay = start + (i + 1) / rate - time.perf_counter()
+			if delay > 0:
+				time.sleep(delay)
+		time.sleep(0.2)
+		stream.stop()
+		for reader in readers:
+			reader.stop()
+
+		received = [len(reader.latencies) for reader in readers]
+		missed = sum(reader.missed for reader in readers)
+		latencies = sorted(l for reader in readers for l in reader.latencies)
+		if latencies:
+			p50 = latencies[len(latencies) // 2] * 1e3
+			p99 = latencies[len(latencies) * 99 // 100] * 1e3
+		else:
+			p50 = p99 = float("nan")
+		print("{0} {1:6s} {2} clients: {3} frames, received {4}, missed {5}, latency p50 {6:.2f} ms p99 {7:.2f} ms".format(
+			protocol, format, clients, total, received, missed, p50, p99))
+
+
+if __name__ == '__main__':
+	benchmark()
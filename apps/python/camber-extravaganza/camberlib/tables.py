@@ -0,0 +1,274 @@
+##############################################################
+# Precomputed optimal camber tables
+#
+# The optimum only depends on weightXfer and camberSplit once a
+# car's DCAMBER_0/DCAMBER_1 are known, so it is tabulated over a
+# grid of both and looked up bilinearly instead of solved every
+# frame.  That only pays for the full grip curve; the closed form
+# is itself bilinear in both, so its table would be all but exact
+# and slower than just evaluating it.
+#
+# Near an even split of the load the optimum moves like the square
+# root of weightXfer - W_MIN, far too steep for evenly spaced rows.
+# Row i is at W_MIN + (W_MAX - W_MIN) * (i / (W_STEPS - 1)) ** 2,
+# and lookups interpolate in the square root, where it is smooth.
+#
+# File layout, little endian:
+#   header   HEADER below
+#   tables   tableCount * W_STEPS * S_STEPS float32, degrees
+#   sources  JSON tyre data signature the tables were built from
+#   cars     JSON {car: {"FRONT/compound": table number}}
+# Tables are shared between every car/axle/compound with the same
+# DCAMBER pair.  The file is mmapped and a car's tables are only
+# read, into arrays, when that car is asked for.
+#############################################################
+
+import json
+import math
+import mmap
+import os
+import struct
+from array import array
+
+from camberlib import grip
+
+MAGIC = b"CXOT"
+VERSION = 2
+HEADER = struct.Struct("<4sIIIffffIIIII")
+W_MIN = 0.5           # outer wheel always carries at least half the weighted load
+W_MAX = 1.0
+W_STEPS = 81
+S_MIN = 0.0
+S_MAX = math.radians(10.0)
+S_STEPS = 61
+W_SCALE = 1.0 / (W_MAX - W_MIN)
+S_SCALE = (S_STEPS - 1) / (S_MAX - S_MIN)
+
+
+def noLog(message):
+	pass
+
+
+def fullCurveDegrees(weightXfer, dcamber0, dcamber1, camberSplit):
+	return math.degrees(grip.optimalCamberRad(weightXfer, dcamber0, dcamber1, camberSplit))
+
+
+def gridTable(dcamber0, dcamber1, solve):
+	values = []
+	for i in range(W_STEPS):
+		u = i / (W_STEPS - 1)
+		w = W_MIN + (W_MAX - W_MIN) * u * u
+		for j in range(S_STEPS):
+			s = S_MIN + (S_MAX - S_MIN) * j / (S_STEPS - 1)
+			values.append(solve(w, dcamber0, dcamber1, s))
+	return values
+
+
+# index is camberlib.tyredata's {(car, axle, compound): (DCAMBER_0, DCAMBER_1, LS_EXPY)}
+def buildTables(path, index, signature, solve=fullCurveDegrees):
+	tableNumbers = {}
+	tables = []
+	cars = {}
+	for (carName, axle, tyreCompound), (d0, d1, ls) in sorted(index.items()):
+		pair = (d0, d1)
+		if pair not in tableNumbers:
+			tableNumbers[pair] = len(tables)
+			tables.append(struct.pack("<%df" % (W_STEPS * S_STEPS), *gridTable(d0, d1, solve)))
+		cars.setdefault(carName, {})[axle + "/" + tyreCompound] = tableNumbers[pair]
+
+	tableBytes = b"".join(tables)
+	sources = json.dumps(signature, separators=(',', ':')).encode("utf-8")
+	directory = json.dumps(cars, separators=(',', ':')).encode("utf-8")
+	tableOffset = HEADER.size
+	sourcesOffset = tableOffset + len(tableBytes)
+	directoryOffset = sourcesOffset + len(sources)
+	header = HEADER.pack(MAGIC, VERSION, W_STEPS, S_STEPS, W_MIN, W_MAX, S_MIN, S_MAX,
+		len(tables), sourcesOffset, len(sources), directoryOffset, len(directory))
+
+	tmpPath = path + ".tmp"
+	with open(tmpPath, "wb") as f:
+		f.write(header)
+		f.write(tableBytes)
+		f.write(sources)
+		f.write(directory)
+	os.replace(tmpPath, path)
+
+
+class OptimalTable:
+	__slots__ = ("data",)
+
+	def __init__(self, data):
+		self.data = data
+
+	def lookup(self, weightXfer, camberSplit):
+		u = (weightXfer - W_MIN) * W_SCALE
+		y = (camberSplit - S_MIN) * S_SCALE
+		if u <= 0:
+			i = 0
+			fx = 0
+		elif u >= 1:
+			i = W_STEPS - 2
+			fx = 1
+		else:
+			x = math.sqrt(u) * (W_STEPS - 1)
+			i = int(x)
+			fx = x - i
+		if y <= 0:
+			j = 0
+			fy = 0
+		elif y >= S_STEPS - 1:
+			j = S_STEPS - 2
+			fy = 1
+		else:
+			j = int(y)
+			fy = y - j
+		t = self.data
+		k = i * S_STEPS + j
+		near = t[k] + (t[k + S_STEPS] - t[k]) * fx
+		far = t[k + 1] + (t[k + S_STEPS + 1] - t[k + 1]) * fx
+		return near + (far - near) * fy
+
+
+class OptimalTables:
+	def __init__(self, path):
+		self.file = open(path, "rb")
+		self.map = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+		(magic, version, wSteps, sSteps, wMin, wMax, sMin, sMax, self.tableCount,
+			sourcesOffset, sourcesLength, directoryOffset, directoryLength) = HEADER.unpack_from(self.map, 0)
+		if magic != MAGIC or version != VERSION or wSteps != W_STEPS or sSteps != S_STEPS:
+			self.close()
+			raise ValueError("Optimal camber tables are from another version")
+		self.sources = json.loads(self.map[sourcesOffset:sourcesOffset + sourcesLength].decode("utf-8"))
+		self.directoryOffset = directoryOffset
+		self.directoryLength = directoryLength
+		self.directory = None
+		self.cars = {}
+
+	def close(self):
+		self.cars = {}
+		self.map.close()
+		self.file.close()
+
+	# {"FRONT/compound": OptimalTable} for one car, empty if there is none
+	def forCar(self, carName):
+		tables = self.cars.get(carName)
+		if tables is not None:
+			return tables
+
+		if self.directory is None:
+			self.directory = json.loads(self.map[self.directoryOffset:self.directoryOffset + self.directoryLength].decode("utf-8"))
+		size = W_STEPS * S_STEPS * 4
+		view = memoryview(self.map)
+		tables = {}
+		for key, number in self.directory.get(carName, {}).items():
+			offset = HEADER.size + number * size
+			tables[key] = OptimalTable(array('f', view[offset:offset + size].cast('f')))
+		view.release()
+		self.cars[carName] = tables
+		return tables
+
+	# Returns (front, rear) OptimalTable or None
+	def lookup(self, carName, tyreCompound):
+		tables = self.forCar(carName)
+		front = tables.get("FRONT/" + tyreCompound)
+		rear = tables.get("REAR/" + tyreCompound)
+		if front is None or rear is None:
+			return None
+		return front, rear
+
+
+# Opens the tables, rebuilding them first if the tyre data changed
+def loadTables(path, index, signature, log=noLog):
+	try:
+		tables = OptimalTables(path)
+		if tables.sources == signature:
+			return tables
+		tables.close()
+	except (IOError, OSError, ValueError, struct.error):
+		pass
+
+	try:
+		buildTables(path, index, signature)
+		return OptimalTables(path)
+	except (IOError, OSError, ValueError):
+		log("CamberExtravaganza ERROR: Could not build optimal camber tables " + path)
+		return None
+
+
+# python -m camberlib.tables
+# Table error against the closed form and the full curve, lookup cost
+# against solving, and build/open/first car load times.  Returns
+# False, and the module exits 1, if either error is over its limit.
+def benchmark(samples=20000):
+	import random
+	import tempfile
+	import time
+
+	CLOSED_LIMIT = 1e-3  # degrees, the closed form is bilinear, only the square root rows bow it
+	FULL_LIMIT = 0.05    # degrees, half a digit of the target label
+	from camberlib import tyredata
+	from camberlib.solver import optimalCamber
+
+	appDir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+	tyreDataPath = os.path.join(appDir, "tyres_data")
+	signature = tyredata.sourceSignature(tyreDataPath)
+	index = tyredata.flattenTyreData(tyredata.readTyreFiles(tyreDataPath, signature))
+	tmpDir = tempfile.mkdtemp()
+	closedPath = os.path.join(tmpDir, "closed.bin")
+	fullPath = os.path.join(tmpDir, "full.bin")
+
+	buildTables(closedPath, index, signature, solve=optimalCamber)
+	t = time.perf_counter()
+	buildTables(fullPath, index, signature)
+	build = time.perf_counter() - t
+
+	t = time.perf_counter()
+	tables = OptimalTables(fullPath)
+	opened = time.perf_counter() - t
+	t = time.perf_counter()
+	tables.lookup("ferrari_458_gt2", "M")
+	firstCar = time.perf_counter() - t
+
+	closedTables = OptimalTables(closedPath)
+	rng = random.Random(7)
+	cases = [(rng.uniform(W_MIN, W_MAX), rng.uniform(S_MIN, S_MAX)) for _ in range(samples)]
+	# and the steep corner by an even split of the load
+	checks = cases[:200] + [(W_MIN + rng.uniform(0, 0.02), rng.uniform(S_MIN, S_MAX)) for _ in range(100)]
+	closedWorst = 0
+	fullWorst = 0
+	for (carName, axle, tyreCompound), (d0, d1, ls) in index.items():
+		closedTable = closedTables.forCar(carName)[axle + "/" + tyreCompound]
+		fullTable = tables.forCar(carName)[axle + "/" + tyreCompound]
+		for w, s in checks:
+			closedWorst = max(closedWorst, abs(closedTable.lookup(w, s) - optimalCamber(w, d0, d1, s)))
+			fullWorst = max(fullWorst, abs(fullTable.lookup(w, s) - fullCurveDegrees(w, d0, d1, s)))
+
+	table = tables.lookup("ferrari_458_gt2", "M")[0]
+	t = time.perf_counter()
+	for w, s in cases:
+		table.lookup(w, s)
+	lookup = (time.perf_counter() - t) / samples
+	t = time.perf_counter()
+	for w, s in cases:
+		fullCurveDegrees(w, 1.2, -13.0, s)
+	solve = (time.perf_counter() - t) / samples
+
+	ok = closedWorst <= CLOSED_LIMIT and fullWorst <= FULL_LIMIT
+	print("closed form table max error {0:.2e} deg (limit {1:.0e}) {2}".format(
+		closedWorst, CLOSED_LIMIT, "OK" if closedWorst <= CLOSED_LIMIT else "FAIL"))
+	print("full curve table max error  {0:.2e} deg (limit {1:.2f}) {2}".format(
+		fullWorst, FULL_LIMIT, "OK" if fullWorst <= FULL_LIMIT else "FAIL"))
+	print("bilinear lookup {0:.3f} us, full curve solve {1:.3f} us".format(lookup * 1e6, solve * 1e6))
+	print("build {0:.1f} ms, open {1:.3f} ms, first car {2:.3f} ms, {3} tables, {4} bytes".format(
+		build * 1e3, opened * 1e3, firstCar * 1e3, tables.tableCount, os.path.getsize(fullPath)))
+
+	tables = table = None
+	closedTables = closedTable = fullTable = None
+	import gc
+	gc.collect()
+	return ok
+
+
+if __name__ == '__main__':
+	import sys
+	sys.exit(0 if benchmark() else 1)
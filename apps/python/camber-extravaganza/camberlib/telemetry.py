@@ -0,0 +1,61 @@
+##############################################################
+# Shared memory telemetry reader
+#
+# Reads camber, load and suspension travel for all four wheels
+# straight out of the acpmf_physics page with struct.unpack_from,
+# instead of three ac.getCarState calls per frame.  packetId is
+# checked first so nothing is decoded until physics has stepped.
+#
+# Takes any buffer laid out like sim_info.SPageFilePhysics, so
+# tools can back it with a regular file.
+#############################################################
+
+import struct
+
+PACKET = struct.Struct("<i")
+FOUR = struct.Struct("<4f")
+EIGHT = struct.Struct("<8f")
+
+
+class PhysicsReader:
+	def __init__(self, buffer, physicsStruct):
+		self.buffer = buffer
+		self.packetOffset = physicsStruct.packetId.offset
+		self.loadOffset = physicsStruct.wheelLoad.offset
+		self.camberOffset = physicsStruct.camberRAD.offset
+		self.travelOffset = physicsStruct.suspensionTravel.offset
+		# camberRAD and suspensionTravel sit next to each other, read both at once
+		self.camberAndTravel = self.travelOffset == self.camberOffset + FOUR.size
+		self.packetId = None
+		self.camber = (0.0, 0.0, 0.0, 0.0)
+		self.load = (0.0, 0.0, 0.0, 0.0)
+		self.travel = (0.0, 0.0, 0.0, 0.0)
+
+	# Returns True if physics stepped since the last call and the
+	# snapshot was refreshed, False if the last one still stands
+	def read(self):
+		buffer = self.buffer
+		packetId = PACKET.unpack_from(buffer, self.packetOffset)[0]
+		if packetId == self.packetId:
+			return False
+
+		# AC may write while we read, retry once if packetId moved under us
+		for _ in range(2):
+			if self.camberAndTravel:
+				v = EIGHT.unpack_from(buffer, self.camberOffset)
+				camber = v[:4]
+				travel = v[4:]
+			else:
+				camber = FOUR.unpack_from(buffer, self.camberOffset)
+				travel = FOUR.unpack_from(buffer, self.travelOffset)
+			load = FOUR.unpack_from(buffer, self.loadOffset)
+			after = PACKET.unpack_from(buffer, self.packetOffset)[0]
+			if after == packetId:
+				break
+			packetId = after
+
+		self.packetId = packetId
+		self.camber = camber
+		self.load = load
+		self.travel = travel
+		return True
@@ -0,0 +1,268 @@
+##############################################################
+# Tyre data index
+#
+# Flattens every tyres_data/*.json into one dict keyed by
+# (carName, axle, tyreCompound) -> (DCAMBER_0, DCAMBER_1, LS_EXPY)
+# and keeps a compact copy on disk.  The cache is thrown away
+# as soon as any JSON file is added, removed, or changes mtime
+# or size.
+#
+# TyreSources keeps what each file contributed, so a running app
+# can re-read just the files that changed and rebuild only the
+# cars they touch.  A car defined in more than one file is a
+# conflict, the last file by name wins it whole, as always.
+#############################################################
+
+import json
+import os
+
+CACHE_VERSION = 1
+AXLES = ("FRONT", "REAR")
+
+
+def noLog(message):
+	pass
+
+
+# [name, mtime, size] for every .json file, sorted by name
+def sourceSignature(tyreDataPath):
+	signature = []
+	for td in sorted(os.listdir(tyreDataPath)):
+		if td.endswith('.json'):
+			st = os.stat(os.path.join(tyreDataPath, td))
+			signature.append([td, st.st_mtime, st.st_size])
+	return signature
+
+
+# Same merge rules as the old loader: files are read in name order
+# and a later file replaces a whole car entry from an earlier one
+def readTyreFiles(tyreDataPath, signature, log=noLog):
+	tyreData = {}
+	for td, mtime, size in signature:
+		newData = readTyreFile(tyreDataPath, td, log)
+		if newData is not None:
+			tyreData.update(newData)
+	return tyreData
+
+
+# One file's {carName: axles}, None if it isn't valid JSON
+def readTyreFile(tyreDataPath, td, log=noLog):
+	with open(os.path.join(tyreDataPath, td), 'r') as f:
+		try:
+			return json.load(f)
+		except ValueError:
+			log("CamberExtravaganza ERROR: Invalid JSON: " + td)
+			return None
+
+
+def flattenTyreData(tyreData, log=noLog):
+	index = {}
+	for carName, axles in tyreData.items():
+		for axle in AXLES:
+			for tyreCompound, d in axles.get(axle, {}).items():
+				try:
+					index[(carName, axle, tyreCompound)] = (
+						float(d["DCAMBER_0"]),
+						float(d["DCAMBER_1"]),
+						float(d["LS_EXPY"])
+					)
+				except (KeyError, TypeError, ValueError):
+					log("CamberExtravaganza ERROR: Bad tyre data for %s %s %s" % (carName, axle, tyreCompound))
+	return index
+
+
+def readCache(cachePath, signature):
+	try:
+		with open(cachePath, 'r') as f:
+			cache = json.load(f)
+		if cache["version"] != CACHE_VERSION or cache["sources"] != signature:
+			return None
+		return dict(((r[0], r[1], r[2]), (r[3], r[4], r[5])) for r in cache["rows"])
+	except (IOError, OSError, ValueError, KeyError, TypeError, IndexError):
+		return None
+
+
+def writeCache(cachePath, index, signature):
+	rows = [list(key) + list(value) for key, value in sorted(index.items())]
+	tmpPath = cachePath + ".tmp"
+	with open(tmpPath, 'w') as f:
+		json.dump({"version": CACHE_VERSION, "sources": signature, "rows": rows}, f, separators=(',', ':'))
+	os.replace(tmpPath, cachePath)
+
+
+# Returns the index, from the cache if it is still valid
+def loadIndex(tyreDataPath, cachePath, log=noLog):
+	signature = sourceSignature(tyreDataPath)
+	index = readCache(cachePath, signature)
+	if index is not None:
+		return index
+
+	index = flattenTyreData(readTyreFiles(tyreDataPath, signature, log), log)
+	try:
+		writeCache(cachePath, index, signature)
+	except (IOError, OSError):
+		log("CamberExtravaganza ERROR: Could not write tyre data cache " + cachePath)
+	return index
+
+
+class TyreSources:
+	def __init__(self, tyreDataPath, log=noLog):
+		self.path = tyreDataPath
+		self.log = log
+		self.files = {}      # name: (mtime, size, {carName: axles})
+		self.index = {}      # replaced on every change, never modified
+		self.conflicts = {}  # carName: file names defining it, in load order
+
+	# Same form as sourceSignature
+	def signature(self):
+		return [[name, mtime, size] for name, (mtime, size, cars) in sorted(self.files.items())]
+
+	# Re-reads added and changed files, drops removed ones, and returns
+	# the names of the cars they touched.  The first call reads them all.
+	def refresh(self):
+		current = sourceSignature(self.path)
+		files = dict(self.files)
+		touched = set()
+		names = set()
+		for name, mtime, size in current:
+			names.add(name)
+			old = files.get(name)
+			if old is not None and old[0] == mtime and old[1] == size:
+				continue
+			cars = readTyreFile(self.path, name, self.log)
+			if cars is None:
+				# Half saved, most likely, keep what it had until it's valid again
+				cars = old[2] if old is not None else {}
+			if old is not None:
+				touched.update(old[2])
+			touched.update(cars)
+			files[name] = (mtime, size, cars)
+		for name in list(files):
+			if name not in names:
+				touched.update(files.pop(name)[2])
+		self.files = files
+		if not touched:
+			return touched
+
+		index = dict((key, value) for key, value in self.index.items() if key[0] not in touched)
+		order = sorted(files)
+		for carName in touched:
+			defined = [name for name in order if carName in files[name][2]]
+			if not defined:
+				self.conflicts.pop(carName, None)
+				continue
+			if len(defined) > 1:
+				if self.conflicts.get(carName) != defined:
+					self.reportConflict(carName, defined)
+				self.conflicts[carName] = defined
+			else:
+				self.conflicts.pop(carName, None)
+			index.update(flattenTyreData({carName: files[defined[-1]][2][carName]}, self.log))
+		self.index = index
+		return touched
+
+	# Logs the entries the winning file drops or changes from each earlier one
+	def reportConflict(self, carName, defined):
+		winner = flattenTyreData({carName: self.files[defined[-1]][2][carName]})
+		for name in defined[:-1]:
+			lost = sorted(axle + "/" + tyreCompound
+				for (car, axle, tyreCompound), value in flattenTyreData({carName: self.files[name][2][carName]}).items()
+				if winner.get((car, axle, tyreCompound)) != value)
+			self.log("CamberExtravaganza: %s is in %s and %s, using %s%s" % (
+				carName, name, defined[-1], defined[-1], ", overrides " + " ".join(lost) if lost else ""))
+
+
+# Names of the cars whose entries differ between two indexes, out of cars
+def changedCars(old, new, cars):
+	def byCar(index):
+		grouped = {}
+		for key, value in index.items():
+			if key[0] in cars:
+				grouped.setdefault(key[0], {})[key] = value
+		return grouped
+
+	a = byCar(old)
+	b = byCar(new)
+	return set(carName for carName in cars if a.get(carName) != b.get(carName))
+
+
+# Returns (DCAMBER_0, DCAMBER_1, LS_EXPY) for the front and rear axle, or None
+def lookup(index, carName, tyreCompound):
+	front = index.get((carName, "FRONT", tyreCompound))
+	rear = index.get((carName, "REAR", tyreCompound))
+	if front is None or rear is None:
+		return None
+	return front, rear
+
+
+# python -m camberlib.tyredata
+# Compares the old read-everything loader with cold and warm index loads,
+# and a TyreSources reload of one edited file with reading them all
+def benchmark(repeat=20):
+	import tempfile
+	import time
+
+	appDir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+	tyreDataPath = os.path.join(appDir, "tyres_data")
+	cachePath = os.path.join(tempfile.mkdtemp(), "tyres_data.cache")
+
+	def legacy():
+		tyreData = {}
+		for td in os.listdir(tyreDataPath):
+			if td.endswith('.json'):
+				with open(os.path.join(tyreDataPath, td), 'r') as f:
+					tyreData.update(json.load(f))
+		return tyreData
+
+	def cold():
+		if os.path.exists(cachePath):
+			os.remove(cachePath)
+		return loadIndex(tyreDataPath, cachePath)
+
+	def warm():
+		return loadIndex(tyreDataPath, cachePath)
+
+	index = cold()
+	keys = list(index.keys())
+
+	def query():
+		for key in keys:
+			lookup(index, key[0], key[2])
+
+	for name, fn in (("legacy loader", legacy), ("cold index", cold), ("warm index", warm), ("lookup all keys", query)):
+		t = time.perf_counter()
+		for _ in range(repeat):
+			fn()
+		print("{0:16s} {1:8.3f} ms".format(name, (time.perf_counter() - t) * 1000 / repeat))
+	print("{0} entries, cache {1} bytes".format(len(index), os.path.getsize(cachePath)))
+
+	# Reloading after one file is saved, against reading everything again
+	import shutil
+	copyPath = os.path.join(os.path.dirname(cachePath), "tyres_data")
+	shutil.copytree(tyreDataPath, copyPath)
+	sources = TyreSources(copyPath)
+	sources.refresh()
+	edited = os.path.join(copyPath, "japanese.json")
+	timings = {"unchanged": 0.0, "one file": 0.0}
+	for i in range(repeat):
+		t = time.perf_counter()
+		sources.refresh()
+		timings["unchanged"] += time.perf_counter() - t
+		os.utime(edited, (i, i))
+		t = time.perf_counter()
+		cars = sources.refresh()
+		timings["one file"] += time.perf_counter() - t
+	t = time.perf_counter()
+	for _ in range(repeat):
+		flattenTyreData(readTyreFiles(copyPath, sourceSignature(copyPath)))
+	timings["every file"] = time.perf_counter() - t
+	for name in ("unchanged", "one file", "every file"):
+		print("reload {0:10s} {1:8.3f} ms".format(name, timings[name] * 1000 / repeat))
+	print("one file touches {0} cars, same index as a full read: {1}".format(
+		len(cars), sources.index == flattenTyreData(readTyreFiles(copyPath, sourceSignature(copyPath)))))
+
+	shutil.rmtree(os.path.dirname(cachePath))
+
+
+if __name__ == '__main__':
+	benchmark()
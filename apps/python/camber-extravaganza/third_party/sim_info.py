@@ -202,19 +202,29 @@ class SPageFileStatic(ctypes.Structure):
 
 	]
 
+# page: (map attribute, struct, shared memory name)
+PAGES = {
+	"physics": ("_acpmf_physics", SPageFilePhysics, "acpmf_physics"),
+	"graphics": ("_acpmf_graphics", SPageFileGraphic, "acpmf_graphics"),
+	"static": ("_acpmf_static", SPageFileStatic, "acpmf_static"),
+}
+
 class SimInfo:
-	def __init__(self):
-		self._acpmf_physics = mmap.mmap(0, ctypes.sizeof(SPageFilePhysics), "acpmf_physics")
-		self._acpmf_graphics = mmap.mmap(0, ctypes.sizeof(SPageFileGraphic), "acpmf_graphics")
-		self._acpmf_static = mmap.mmap(0, ctypes.sizeof(SPageFileStatic), "acpmf_static")
-		self.physics = SPageFilePhysics.from_buffer(self._acpmf_physics)
-		self.graphics = SPageFileGraphic.from_buffer(self._acpmf_graphics)
-		self.static = SPageFileStatic.from_buffer(self._acpmf_static)
+	# Pages are mapped the first time they're used, after that they are
+	# plain attributes and __getattr__ isn't called for them again
+	def __getattr__(self, name):
+		for page, (mapName, struct, tagName) in PAGES.items():
+			if name == page or name == mapName:
+				pageMap = mmap.mmap(0, ctypes.sizeof(struct), tagName)
+				self.__dict__[mapName] = pageMap
+				self.__dict__[page] = struct.from_buffer(pageMap)
+				return self.__dict__[name]
+		raise AttributeError(name)
 
 	def close(self):
-		self._acpmf_physics.close()
-		self._acpmf_graphics.close()
-		self._acpmf_static.close()
+		for page, (mapName, struct, tagName) in PAGES.items():
+			if mapName in self.__dict__:
+				self.__dict__[mapName].close()
 
 	def __del__(self):
 		self.close()
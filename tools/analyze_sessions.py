@@ -0,0 +1,204 @@
+##############################################################
+# Offline session analyzer
+#
+# python tools/analyze_sessions.py [-j JOBS] [--json OUT] PATH...
+#
+# Reads session logs written by the in-game recorder (files or
+# folders of *.cxlog), one per worker process.  Each log is
+# streamed out of its mmap a record at a time, never loaded
+# whole.  For every lap and wheel it adds up the time spent
+# blue, green and red against the optimal camber the app showed,
+# the same band as the stepped palette, and per axle how far
+# the loaded outer wheel sat from optimal while cornering.  That
+# average offset is the suggested static camber change.
+#############################################################
+
+import argparse
+import json
+import math
+import multiprocessing
+import os
+import sys
+
+APP_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "apps", "python", "camber-extravaganza")
+sys.path.insert(0, APP_DIR)
+from camberlib.colors import camberWindow
+from camberlib.recorder import SessionLog
+from camberlib.solver import SETTLED
+
+WHEELS = ("FL", "FR", "RL", "RR")
+WINDOWS = ("blue", "green", "red")
+CORNER_TRANSFER = 0.1 # |loadL - loadR| / (loadL + loadR) above this counts as cornering
+
+
+def emptyWindows():
+	return [[0.0, 0.0, 0.0] for wheel in WHEELS]
+
+
+def addWindows(into, other):
+	for a, b in zip(into, other):
+		for i in range(3):
+			a[i] += b[i]
+
+
+# Returns a JSON-able summary of one log
+def analyzeSession(path):
+	try:
+		log = SessionLog(path)
+	except (IOError, OSError, ValueError) as e:
+		return {"path": path, "error": str(e)}
+
+	laps = {}
+	compounds = set()
+	cornering = [0.0, 0.0]  # seconds, front and rear
+	offset = [0.0, 0.0]     # dt weighted optimal - outer camber, degrees
+	seconds = 0.0
+	skipped = 0
+	degrees = math.degrees
+	with log:
+		records = len(log)
+		lastLap = None
+		for (t, dt, cFL, cFR, cRL, cRR, lFL, lFR, lRL, lRR,
+				sFL, sFR, sRL, sRR, optimalF, optimalR, compound, lap) in log:
+			seconds += dt
+			# No tyre data, or the filter still settling from its start value
+			if abs(optimalF) >= SETTLED or abs(optimalR) >= SETTLED:
+				skipped += 1
+				continue
+			if lap != lastLap:
+				windows = laps.get(lap)
+				if windows is None:
+					windows = laps[lap] = emptyWindows()
+				lastLap = lap
+			compounds.add(compound)
+
+			camber = (degrees(cFL), degrees(cFR), degrees(cRL), degrees(cRR))
+			windows[0][camberWindow(camber[0], optimalF)] += dt
+			windows[1][camberWindow(camber[1], optimalF)] += dt
+			windows[2][camberWindow(camber[2], optimalR)] += dt
+			windows[3][camberWindow(camber[3], optimalR)] += dt
+
+			total = lFL + lFR
+			if total > 0 and abs(lFL - lFR) > CORNER_TRANSFER * total:
+				cornering[0] += dt
+				offset[0] += dt * (optimalF - (camber[0] if lFL > lFR else camber[1]))
+			total = lRL + lRR
+			if total > 0 and abs(lRL - lRR) > CORNER_TRANSFER * total:
+				cornering[1] += dt
+				offset[1] += dt * (optimalR - (camber[2] if lRL > lRR else camber[3]))
+
+	totals = emptyWindows()
+	for windows in laps.values():
+		addWindows(totals, windows)
+	return {
+		"path": path,
+		"car": log.carName,
+		"records": records,
+		"skipped": skipped,
+		"seconds": seconds,
+		"compounds": sorted(c.rstrip(b"\0").decode("ascii", "replace") for c in compounds),
+		"laps": dict((str(lap), windows) for lap, windows in sorted(laps.items())),
+		"total": totals,
+		"cornering": cornering,
+		"offset": offset
+	}
+
+
+# Static camber change per axle, None without enough cornering
+def recommendation(cornering, offset, minimum=1.0):
+	return [offset[i] / cornering[i] if cornering[i] >= minimum else None for i in range(2)]
+
+
+# Per car totals over every session
+def combine(results):
+	cars = {}
+	for result in results:
+		if "error" in result:
+			continue
+		car = cars.get(result["car"])
+		if car is None:
+			car = cars[result["car"]] = {"sessions": 0, "seconds": 0.0, "total": emptyWindows(), "cornering": [0.0, 0.0], "offset": [0.0, 0.0]}
+		car["sessions"] += 1
+		car["seconds"] += result["seconds"]
+		addWindows(car["total"], result["total"])
+		for i in range(2):
+			car["cornering"][i] += result["cornering"][i]
+			car["offset"][i] += result["offset"][i]
+	for car in cars.values():
+		car["recommendation"] = recommendation(car["cornering"], car["offset"])
+	return cars
+
+
+def formatWindows(windows):
+	cells = []
+	for wheel, times in zip(WHEELS, windows):
+		total = sum(times) or 1
+		cells.append("{0} {1:3.0f}/{2:3.0f}/{3:3.0f}".format(wheel, *[100 * x / total for x in times]))
+	return "  ".join(cells)
+
+
+def formatRecommendation(values):
+	cells = []
+	for axle, value in zip(("front", "rear"), values):
+		cells.append("{0} {1}".format(axle, "n/a" if value is None else "{0:+.1f}°".format(value)))
+	return ", ".join(cells)
+
+
+def printReport(results, cars):
+	for result in sorted(results, key=lambda r: r["path"]):
+		print(result["path"])
+		if "error" in result:
+			print("  ERROR: " + result["error"])
+			continue
+		print("  {0}, {1:.0f} s, {2} records, compounds {3}".format(
+			result["car"], result["seconds"], result["records"], ", ".join(result["compounds"]) or "-"))
+		print("  lap  % time blue/green/red")
+		for lap, windows in result["laps"].items():
+			print("  {0:>3}  {1}".format(lap, formatWindows(windows)))
+		print("  all  {0}".format(formatWindows(result["total"])))
+		print("  static camber change: " + formatRecommendation(recommendation(result["cornering"], result["offset"])))
+	print()
+	for name, car in sorted(cars.items()):
+		print("{0}: {1} sessions, {2:.0f} s".format(name, car["sessions"], car["seconds"]))
+		print("  all  {0}".format(formatWindows(car["total"])))
+		print("  static camber change: " + formatRecommendation(car["recommendation"]))
+
+
+def findLogs(paths):
+	logs = []
+	for path in paths:
+		if os.path.isdir(path):
+			for root, dirs, files in os.walk(path):
+				logs.extend(os.path.join(root, f) for f in sorted(files) if f.endswith(".cxlog"))
+		else:
+			logs.append(path)
+	return logs
+
+
+def main(argv=None):
+	parser = argparse.ArgumentParser(description="Camber window histograms and static camber recommendations from recorded sessions")
+	parser.add_argument("paths", nargs="+", help="session logs or folders of them")
+	parser.add_argument("-j", "--jobs", type=int, default=os.cpu_count(), help="worker processes")
+	parser.add_argument("--json", help="also write the full results here")
+	args = parser.parse_args(argv)
+
+	logs = findLogs(args.paths)
+	if not logs:
+		print("No session logs found")
+		return 1
+	if args.jobs > 1 and len(logs) > 1:
+		with multiprocessing.Pool(min(args.jobs, len(logs))) as pool:
+			results = list(pool.imap_unordered(analyzeSession, logs))
+	else:
+		results = [analyzeSession(path) for path in logs]
+
+	cars = combine(results)
+	printReport(results, cars)
+	if args.json:
+		with open(args.json, "w") as f:
+			json.dump({"sessions": results, "cars": cars}, f, indent=1)
+	return 0
+
+
+if __name__ == '__main__':
+	sys.exit(main())
@@ -0,0 +1,73 @@
+##############################################################
+# History graph call counts
+#
+# python tools/bench_graph.py
+#
+# Counts ac.gl* calls for one frame of all four history graphs,
+# the old one glBegin/glEnd per bar path against drawGraph().
+#############################################################
+
+import math
+import time
+
+import mock_ac
+
+
+# drawGraph() bar loop as it was before batching, frame omitted
+def legacyBars(ac, acsys, indicator, flip):
+	x = indicator.xPosition
+	y = indicator.yPosition - 10
+	dx2 = 55 + 150
+	f = 1
+	if flip:
+		dx2 = -5 - 150
+		f = -1
+	middleHeight = 85 / 4
+	for i, (value, r, g, b, a) in enumerate(indicator.serie):
+		h = max(min(indicator.maxVal, value), indicator.minVal)
+		if value > 0:
+			ac.glColor4f(1, 0, 0, 1)
+		else:
+			ac.glColor4f(1, 1, 1, 1)
+		ac.glBegin(acsys.GL.Lines)
+		ac.glVertex2f(x + dx2 - i * f, y + middleHeight - 1)
+		ac.glColor4f(r, g, b, a)
+		ac.glVertex2f(x + dx2 - i * f, y + middleHeight - 1 + h)
+		ac.glEnd()
+
+
+def main(frames=500):
+	ac, app = mock_ac.loadApp()
+	app.acMain("1.0")
+	indicators = app.CamberIndicators
+	for i in range(app.Options["graphWidth"]):
+		for key, indicator in indicators.items():
+			indicator.setValue(math.sin(i * 0.05) * 0.05 - 0.02, 0.016, -2)
+
+	def batched():
+		ac.glBegin(mock_ac.MockACSys.GL.Lines)
+		indicators["FL"].drawGraph(flip=True)
+		indicators["FR"].drawGraph()
+		indicators["RL"].drawGraph(flip=True)
+		indicators["RR"].drawGraph()
+		ac.glEnd()
+
+	def legacy():
+		for key, flip in (("FL", True), ("FR", False), ("RL", True), ("RR", False)):
+			legacyBars(ac, mock_ac.MockACSys, indicators[key], flip)
+
+	for name, fn in (("per-bar glBegin", legacy), ("batched", batched)):
+		ac.resetCalls()
+		fn()
+		calls = dict(ac.calls)
+		t = time.perf_counter()
+		for _ in range(frames):
+			fn()
+		elapsed = (time.perf_counter() - t) / frames
+		print("{0:16s} {1:5d} calls/frame ({2} glBegin, {3} glColor4f, {4} glVertex2f) {5:8.1f} us/frame".format(
+			name, sum(calls.values()), calls.get("glBegin", 0), calls.get("glColor4f", 0),
+			calls.get("glVertex2f", 0), elapsed * 1e6))
+
+
+if __name__ == '__main__':
+	main()
@@ -0,0 +1,191 @@
+##############################################################
+# Render loop benchmark
+#
+# python tools/bench_render.py [--frames N] [--physics] [--replay LOG]
+#                              [--profile] [--paced] [--set OPTION=VALUE ...]
+#                              [--clients N]
+#                              [--json OUT] [--baseline IN]
+#
+# Loads the app against mock_ac, runs acMain and then drives
+# onFormRender frame by frame for every combination of
+# drawGraphs, normalize, useSpectrum and showDelta.  Telemetry is
+# scripted, or replayed from a recorded session log.  It goes
+# through ac.getCarState by default, or --physics steps the
+# shared memory page as if the game were live.  --profile runs
+# with the in-app stage profiler on, to see what it costs.
+# --set changes any other Options entry before acMain, e.g.
+# --set textRate=10.  --clients connects that many loopback
+# readers when the telemetry stream is on, --set streamPort=47800.
+# --paced waits out each frame at 60 fps like the game does, so
+# background threads run between frames instead of inside them.
+#
+# Reports per-frame latency p50/p99/max and ac.* calls per frame.
+# With --baseline, a p50 more than --tolerance slower than the
+# baseline's, or any more calls per frame, fails the run.
+#############################################################
+
+import argparse
+import itertools
+import json
+import math
+import sys
+import time
+
+import mock_ac
+
+COMBINATIONS = ("drawGraphs", "normalize", "useSpectrum", "showDelta")
+GL_CALLS = ("glBegin", "glEnd", "glColor4f", "glVertex2f", "glQuad")
+LABEL_CALLS = ("setText", "setFontColor")
+FPS = 60
+LAP = 90              # seconds, how fast the track position goes round
+
+
+# Two laps of a figure of eight, repeating
+def scriptedSource():
+	frame = 0
+	while True:
+		t = frame / FPS
+		lateral = math.sin(t * 0.7) * math.sin(t * 0.13)
+		roll = 0.012 * lateral
+		camber = (-0.045 + roll, -0.045 - roll, -0.03 + 0.7 * roll, -0.03 - 0.7 * roll)
+		load = (3200 + 1800 * lateral, 3200 - 1800 * lateral, 2900 + 1500 * lateral, 2900 - 1500 * lateral)
+		travel = (0.05 + 0.01 * lateral, 0.05 - 0.01 * lateral, 0.06 + 0.01 * lateral, 0.06 - 0.01 * lateral)
+		yield camber, load, travel
+		frame += 1
+
+
+# One recorded sample per frame, looping
+def replaySource(path):
+	from camberlib.recorder import SessionLog
+	log = SessionLog(path)
+	if not len(log):
+		raise ValueError("Empty session log " + path)
+	while True:
+		for record in log:
+			yield record[2:6], record[6:10], record[10:14]
+
+
+def runCombination(options, frames, source, physics, profile=False, settings={}, clients=0, paced=False):
+	ac, app = mock_ac.loadApp()
+	simInfo = sys.modules["third_party.sim_info"]
+	simInfo.info.graphics.status = simInfo.AC_LIVE if physics else simInfo.AC_OFF
+	app.Options.update(settings)
+	app.acMain("1.0")
+	app.Options.update(options)
+	app.updateButtons()
+	if profile:
+		app.startProfiler()
+	readers = []
+	if app.Stream is not None:
+		from camberlib.stream import StreamClient
+		readers = [StreamClient("127.0.0.1", app.Stream.port, app.Options["streamProtocol"], app.Options["streamFormat"])
+			for _ in range(clients)]
+		for reader in readers:
+			reader.start()
+	render = ac.renderCallbacks[0]
+	lap = [0]
+
+	def feed():
+		camber, load, travel = next(source)
+		laps, position = divmod(lap[0] / (LAP * FPS), 1.0)
+		simInfo.info.graphics.normalizedCarPosition = position
+		simInfo.info.graphics.completedLaps = int(laps)
+		lap[0] += 1
+		if physics:
+			mock_ac.stepPhysics(simInfo, camber, load, travel)
+		else:
+			ac.setTelemetry(camber, load, travel)
+
+	# Fill the history graphs before timing
+	for _ in range(app.Options["graphWidth"]):
+		feed()
+		render(1.0 / FPS)
+
+	ac.resetCalls()
+	times = []
+	clock = time.perf_counter
+	start = clock()
+	for frame in range(frames):
+		feed()
+		t = clock()
+		render(1.0 / FPS)
+		times.append(clock() - t)
+		if paced:
+			delay = start + (frame + 1) / FPS - clock()
+			if delay > 0:
+				time.sleep(delay)
+	times.sort()
+	app.acShutdown()
+	for reader in readers:
+		reader.stop()
+
+	calls = ac.calls
+	return {
+		"p50": times[len(times) // 2] * 1e6,
+		"p99": times[len(times) * 99 // 100] * 1e6,
+		"max": times[-1] * 1e6,
+		"gl": sum(calls[name] for name in GL_CALLS) / frames,
+		"labels": sum(calls[name] for name in LABEL_CALLS) / frames,
+		"calls": ac.totalCalls() / frames,
+		"errors": ac.errors()
+	}
+
+
+def combinationName(options):
+	return " ".join(name if options[name] else "-" * len(name) for name in COMBINATIONS)
+
+
+def main(argv=None):
+	parser = argparse.ArgumentParser(description="Time onFormRender for every option combination")
+	parser.add_argument("--frames", type=int, default=2000)
+	parser.add_argument("--physics", action="store_true", help="feed the shared memory page instead of ac.getCarState")
+	parser.add_argument("--replay", help="session log to replay instead of scripted telemetry")
+	parser.add_argument("--profile", action="store_true", help="turn the in-app stage profiler on")
+	parser.add_argument("--set", action="append", default=[], metavar="OPTION=VALUE", help="set an Options entry, value as JSON")
+	parser.add_argument("--paced", action="store_true", help="run at 60 fps instead of back to back")
+	parser.add_argument("--clients", type=int, default=0, help="loopback readers on the telemetry stream")
+	parser.add_argument("--json", help="write results here")
+	parser.add_argument("--baseline", help="results from an earlier --json run to compare against")
+	parser.add_argument("--tolerance", type=float, default=0.25, help="allowed p50 slowdown against the baseline")
+	args = parser.parse_args(argv)
+	settings = {}
+	for setting in args.set:
+		name, value = setting.split("=", 1)
+		settings[name] = json.loads(value)
+
+	results = {}
+	print("{0:44s} {1:>8s} {2:>8s} {3:>8s} {4:>7s} {5:>7s} {6:>7s}".format(
+		"options", "p50 us", "p99 us", "max us", "gl", "labels", "calls"))
+	for values in itertools.product((False, True), repeat=len(COMBINATIONS)):
+		options = dict(zip(COMBINATIONS, values))
+		source = replaySource(args.replay) if args.replay else scriptedSource()
+		name = combinationName(options)
+		result = results[name] = runCombination(options, args.frames, source, args.physics, args.profile, settings, args.clients, args.paced)
+		print("{0:44s} {p50:8.1f} {p99:8.1f} {max:8.1f} {gl:7.1f} {labels:7.1f} {calls:7.1f}".format(name, **result))
+		for line in result["errors"]:
+			print("  " + line.splitlines()[-1])
+
+	failed = any(result["errors"] for result in results.values())
+	if args.baseline:
+		with open(args.baseline) as f:
+			baseline = json.load(f)
+		for name, result in sorted(results.items()):
+			old = baseline.get(name)
+			if old is None:
+				continue
+			if result["p50"] > old["p50"] * (1 + args.tolerance):
+				print("SLOWER   {0}  p50 {1:.1f} -> {2:.1f} us".format(name, old["p50"], result["p50"]))
+				failed = True
+			if result["calls"] > old["calls"] + 1e-9:
+				print("CALLS    {0}  {1:.1f} -> {2:.1f} per frame".format(name, old["calls"], result["calls"]))
+				failed = True
+
+	if args.json:
+		with open(args.json, "w") as f:
+			json.dump(results, f, indent=1, sort_keys=True)
+	print("FAIL" if failed else "OK")
+	return 1 if failed else 0
+
+
+if __name__ == '__main__':
+	sys.exit(main())
@@ -0,0 +1,146 @@
+##############################################################
+# Startup benchmark
+#
+# python tools/bench_startup.py [--runs N] [--json OUT]
+#
+# Times loading the app and acMain against mock_ac, each run in a
+# fresh interpreter so imports count too, and splits acMain into
+# its loading steps.  "ui" is whatever acMain spends outside them,
+# mostly creating labels and buttons.  Tyre data loads on the
+# lookup thread, "first data" is from acMain returning to the
+# frame that applies it, rendering at 60 fps.  Scenarios:
+#
+#   cold         no options file, tyre data cache or tables
+#   warm         everything left behind by a previous start
+#   full curve   warm, with Full Grip Curve saved as on
+#
+# The app's own options.json, tyres_data.cache and
+# optimal_tables.bin are put back afterwards.
+#############################################################
+
+import argparse
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+import mock_ac
+
+PHASES = ("loadOptions", "loadTyreIndex", "loadOptimalTables", "loadTireData", "startSampler", "startStream", "startField")
+GENERATED = ("options.json", "tyres_data.cache", "optimal_tables.bin")
+
+
+# One start in this interpreter, prints {phase: seconds} as JSON
+def child():
+	t = time.perf_counter()
+	ac, app = mock_ac.loadApp()
+	timings = {"import": time.perf_counter() - t}
+
+	inline = set()  # phases that ran inside acMain, not on the lookup thread
+
+	def timed(name, fn):
+		def wrapper(*args, **kwargs):
+			t = time.perf_counter()
+			try:
+				return fn(*args, **kwargs)
+			finally:
+				timings[name] = timings.get(name, 0.0) + time.perf_counter() - t
+				if threading.current_thread() is threading.main_thread():
+					inline.add(name)
+		return wrapper
+
+	for name in PHASES:
+		setattr(app, name, timed(name, getattr(app, name)))
+	t = time.perf_counter()
+	app.acMain("1.0")
+	timings["acMain"] = time.perf_counter() - t
+	timings["ui"] = timings["acMain"] - sum(timings[name] for name in inline)
+	t = time.perf_counter()
+	render = ac.renderCallbacks[0]
+	while app.Startup is not None and time.perf_counter() - t < 5:
+		render(1.0 / 60)
+		time.sleep(1.0 / 60)
+	timings["first data"] = time.perf_counter() - t
+	app.acShutdown()
+	timings["errors"] = ac.errors()
+	print(json.dumps(timings))
+
+
+def start():
+	output = subprocess.check_output([sys.executable, os.path.abspath(__file__), "--child"], cwd=os.path.dirname(os.path.abspath(__file__)))
+	return json.loads(output.decode("utf-8").splitlines()[-1])
+
+
+def clean():
+	for name in GENERATED:
+		path = os.path.join(mock_ac.APP_DIR, name)
+		if os.path.exists(path):
+			os.remove(path)
+
+
+def writeOptions(options):
+	sys.path.insert(0, mock_ac.APP_DIR)
+	from camberlib.settings import writeOptions
+	writeOptions(os.path.join(mock_ac.APP_DIR, "options.json"), options)
+
+
+def main(argv=None):
+	parser = argparse.ArgumentParser(description="Time app load and acMain")
+	parser.add_argument("--runs", type=int, default=7)
+	parser.add_argument("--json", help="write results here")
+	parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+	args = parser.parse_args(argv)
+	if args.child:
+		child()
+		return 0
+
+	saved = tempfile.mkdtemp()
+	for name in GENERATED:
+		path = os.path.join(mock_ac.APP_DIR, name)
+		if os.path.exists(path):
+			shutil.move(path, os.path.join(saved, name))
+
+	results = {}
+	try:
+		for scenario in ("cold", "warm", "full curve"):
+			runs = []
+			for _ in range(args.runs):
+				if scenario == "cold":
+					clean()
+				elif scenario == "full curve":
+					writeOptions({"fullGripCurve": True})
+				runs.append(start())
+			results[scenario] = runs
+	finally:
+		clean()
+		for name in GENERATED:
+			path = os.path.join(saved, name)
+			if os.path.exists(path):
+				shutil.move(path, os.path.join(mock_ac.APP_DIR, name))
+		os.rmdir(saved)
+
+	rows = ("import", "acMain") + PHASES + ("ui", "first data")
+	summary = {}
+	for scenario, runs in results.items():
+		column = summary[scenario] = {}
+		for name in rows:
+			values = sorted(run.get(name, 0.0) for run in runs)
+			column[name] = values[len(values) // 2] * 1000
+	print("{0:18s}".format("ms, p50") + "".join("{0:>12s}".format(scenario) for scenario in results))
+	for name in rows:
+		print("{0:18s}".format(name) + "".join("{0:12.2f}".format(summary[scenario][name]) for scenario in results))
+	for line in sorted(set(line for runs in results.values() for run in runs for line in run["errors"])):
+		print("  " + line.splitlines()[-1])
+
+	if args.json:
+		with open(args.json, 'w') as f:
+			json.dump(summary, f, indent=1)
+	return 0
+
+
+if __name__ == '__main__':
+	sys.exit(main())
@@ -0,0 +1,78 @@
+##############################################################
+# Frame rate independence harness
+#
+# python tools/framerate_harness.py
+#
+# Drives the app against mock_ac with the physics page stepping
+# at 333 Hz through the same drive, rendering at 30, 60, 144 and
+# 500 fps.  At 500 fps most frames see no new physics step and
+# are skipped.  Every half second the optimal camber and each
+# wheel's average are compared against 60 fps; they should match
+# to well under what the labels show.
+#############################################################
+
+import math
+import sys
+
+import mock_ac
+
+PHYSICS_RATE = 333
+RATES = (30, 144, 500)
+SECONDS = 20
+TOLERANCE = 0.05      # degrees
+
+
+def telemetryAt(t):
+	lateral = math.sin(t * 1.3) * math.sin(t * 0.23)
+	roll = 0.012 * lateral
+	camber = (-0.045 + roll, -0.045 - roll, -0.03 + 0.7 * roll, -0.03 - 0.7 * roll)
+	load = (3200 + 1800 * lateral, 3200 - 1800 * lateral, 2900 + 1500 * lateral, 2900 - 1500 * lateral)
+	travel = (0.05 + 0.01 * lateral, 0.05 - 0.01 * lateral, 0.06 + 0.01 * lateral, 0.06 - 0.01 * lateral)
+	return camber, load, travel
+
+
+# Returns [(optimalF, optimalR, FL, FR, RL, RR average)] every half second
+def drive(fps):
+	ac, app = mock_ac.loadApp()
+	simInfo = sys.modules["third_party.sim_info"]
+	simInfo.info.graphics.status = simInfo.AC_LIVE
+	app.acMain("1.0")
+	# Tyre data now rather than whenever the lookup thread gets to it
+	app.applyTyreData(app.resolveTyreData(ac.carName, ac.tyreCompound))
+	render = ac.renderCallbacks[0]
+
+	out = []
+	step = 0
+	for frame in range(SECONDS * fps + 1):
+		t = frame / float(fps)
+		latest = int(t * PHYSICS_RATE)
+		if latest >= step:
+			mock_ac.stepPhysics(simInfo, *telemetryAt(latest / float(PHYSICS_RATE)))
+			step = latest + 1
+		render(1.0 / fps if frame else 0.0)
+		if frame % (fps // 2) == 0 and t >= 3:
+			out.append((app.Options["optimalCamberF"], app.Options["optimalCamberR"]) +
+				tuple(app.CamberIndicators[key].avgValue for key in ("FL", "FR", "RL", "RR")))
+	app.acShutdown()
+	errors = ac.errors()
+	if errors:
+		print("\n".join(errors))
+	return out
+
+
+def main():
+	reference = drive(60)
+	ok = True
+	for fps in RATES:
+		rows = list(zip(reference, drive(fps)))
+		optimal = max(max(abs(a[0] - b[0]), abs(a[1] - b[1])) for a, b in rows)
+		average = max(abs(x - y) for a, b in rows for x, y in zip(a[2:], b[2:]))
+		good = optimal < TOLERANCE and average < TOLERANCE
+		ok = ok and good
+		print("{0:3d} fps against 60, max difference optimal {1:.4f} deg, average {2:.4f} deg  {3}".format(
+			fps, optimal, average, "OK" if good else "FAIL"))
+	return 0 if ok else 1
+
+
+if __name__ == '__main__':
+	sys.exit(main())
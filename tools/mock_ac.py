@@ -0,0 +1,193 @@
+##############################################################
+# Mock ac/acsys runtime
+#
+# Stands in for the modules AC injects into its embedded Python
+# so camber-extravaganza.py can be loaded, driven and timed
+# outside of the game.  Every ac.* call is counted.
+#
+# The shared memory pages in third_party/sim_info.py are backed
+# by anonymous memory, so tests can write into them directly.
+#############################################################
+
+import collections
+import importlib.util
+import mmap
+import os
+import sys
+import types
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+APP_DIR = os.path.join(ROOT, "apps", "python", "camber-extravaganza")
+APP_FILE = os.path.join(APP_DIR, "camber-extravaganza.py")
+
+# Every ac.* function the app may call that needs no special return value
+AC_FUNCTIONS = [
+	"addOnAppActivatedListener", "addOnAppDismissedListener", "addOnCheckBoxChanged",
+	"addOnClickedListener", "addOnValidateListener", "drawBorder", "glBegin", "glColor4f",
+	"glEnd", "glVertex2f", "glQuad", "initFont", "setBackgroundColor", "setBackgroundOpacity",
+	"setCustomFont", "setFontAlignment", "setFontColor", "setFontSize", "setIconPosition",
+	"setPosition", "setSize", "setText", "setTitle", "setVisible", "console"
+]
+
+
+def countingCall(name):
+	def call(self, *args):
+		self.calls[name] += 1
+	call.__name__ = name
+	return call
+
+
+class MockAC:
+	def __init__(self):
+		self.calls = collections.Counter()
+		self.nextControl = 1
+		self.renderCallbacks = []
+		self.logLines = []
+		self.carName = "ferrari_458_gt2"
+		self.tyreCompound = "M"
+		self.carsCount = 1
+		self.focusedCar = 0
+		self.carState = {
+			MockACSys.CS.SuspensionTravel: (0.05, 0.05, 0.05, 0.05),
+			MockACSys.CS.CamberRad: (-0.03, -0.03, -0.02, -0.02),
+			MockACSys.CS.Load: (3000.0, 3000.0, 3000.0, 3000.0),
+			MockACSys.CS.NormalizedSplinePosition: 0.0,
+			MockACSys.CS.LapCount: 0
+		}
+
+	def resetCalls(self):
+		self.calls.clear()
+
+	def totalCalls(self):
+		return sum(self.calls.values())
+
+	def control(self, name):
+		self.calls[name] += 1
+		self.nextControl += 1
+		return self.nextControl
+
+	def newApp(self, *args):
+		return self.control("newApp")
+
+	def addLabel(self, *args):
+		return self.control("addLabel")
+
+	def addButton(self, *args):
+		return self.control("addButton")
+
+	def addCheckBox(self, *args):
+		return self.control("addCheckBox")
+
+	def addTextInput(self, *args):
+		return self.control("addTextInput")
+
+	def addRenderCallback(self, app, callback):
+		self.calls["addRenderCallback"] += 1
+		self.renderCallbacks.append(callback)
+
+	def getCarState(self, car, state, *args):
+		self.calls["getCarState"] += 1
+		return self.carState[state]
+
+	def getCarName(self, car):
+		self.calls["getCarName"] += 1
+		return self.carName
+
+	def getCarTyreCompound(self, car):
+		self.calls["getCarTyreCompound"] += 1
+		return self.tyreCompound
+
+	def getCarsCount(self):
+		self.calls["getCarsCount"] += 1
+		return self.carsCount
+
+	def getFocusedCar(self):
+		self.calls["getFocusedCar"] += 1
+		return self.focusedCar
+
+	def getDriverName(self, car):
+		self.calls["getDriverName"] += 1
+		return "Driver %d" % car
+
+	def log(self, message):
+		self.calls["log"] += 1
+		self.logLines.append(message)
+
+	# What ac.getCarState returns from now on, FL, FR, RL, RR
+	def setTelemetry(self, camber, load, travel):
+		self.carState[MockACSys.CS.CamberRad] = camber
+		self.carState[MockACSys.CS.Load] = load
+		self.carState[MockACSys.CS.SuspensionTravel] = travel
+
+	# Every ERROR line logged so far
+	def errors(self):
+		return [line for line in self.logLines if "ERROR" in line]
+
+for _name in AC_FUNCTIONS:
+	setattr(MockAC, _name, countingCall(_name))
+
+
+class MockACSys:
+	class GL:
+		Lines = 0
+		LineStrip = 1
+		Triangles = 2
+		Quads = 3
+
+	class CS:
+		SuspensionTravel = "SuspensionTravel"
+		CamberRad = "CamberRad"
+		Load = "Load"
+		NormalizedSplinePosition = "NormalizedSplinePosition"
+		LapCount = "LapCount"
+
+
+# third_party/sim_info.py maps named Windows pages on import, point it
+# at anonymous memory instead
+def loadSimInfo():
+	realMmap = mmap.mmap
+
+	def anonymousMmap(fileno, length, *args, **kwargs):
+		return realMmap(-1, length)
+
+	path = os.path.join(APP_DIR, "third_party", "sim_info.py")
+	spec = importlib.util.spec_from_file_location("third_party.sim_info", path)
+	module = importlib.util.module_from_spec(spec)
+	sys.modules["third_party.sim_info"] = module
+	spec.loader.exec_module(module)
+	# Pages are mapped on first use, so the module keeps the stand-in
+	module.mmap = types.SimpleNamespace(mmap=anonymousMmap)
+
+	# The structs keep the anonymous maps exported, closing them at
+	# interpreter exit only prints a BufferError
+	module.SimInfo.__del__ = lambda self: None
+	for i in range(4):
+		module.info.static.tyreRadius[i] = 0.3
+	return module
+
+
+# One physics step on the (anonymous) shared memory page, the way AC
+# writes it.  Set info.graphics.status to AC_LIVE for the app to read it.
+def stepPhysics(simInfo, camber, load, travel):
+	physics = simInfo.info.physics
+	physics.camberRAD[:] = camber
+	physics.wheelLoad[:] = load
+	physics.suspensionTravel[:] = travel
+	physics.packetId += 1
+
+
+# Returns (mock ac, app module), acMain has not been called yet
+def loadApp(mockAC=None):
+	if mockAC is None:
+		mockAC = MockAC()
+	sys.modules["ac"] = mockAC
+	sys.modules["acsys"] = MockACSys
+	if APP_DIR not in sys.path:
+		sys.path.insert(0, APP_DIR)
+	if "third_party.sim_info" not in sys.modules:
+		loadSimInfo()
+
+	spec = importlib.util.spec_from_file_location("camber_extravaganza", APP_FILE)
+	app = importlib.util.module_from_spec(spec)
+	spec.loader.exec_module(app)
+	return mockAC, app
@@ -0,0 +1,98 @@
+##############################################################
+# Sampler frame-rate independence harness
+#
+# python tools/sampler_harness.py
+#
+# A writer thread steps a file-backed physics page at 333 Hz
+# with a known camber signal while TelemetrySampler polls it.
+# A fake render loop drains the sampler at 30, 60 and 144 fps;
+# the history it collects should be the same at every rate.
+#############################################################
+
+import math
+import sys
+import threading
+import time
+
+import mock_ac
+from telemetry_harness import PhysicsFile
+
+sys.path.insert(0, mock_ac.APP_DIR)
+from camberlib.rolling import RollingStats
+from camberlib.sampler import TelemetrySampler
+from camberlib.telemetry import PhysicsReader
+
+PHYSICS_RATE = 333
+
+
+def camberAt(t):
+	return -0.04 + 0.02 * math.sin(2 * math.pi * t)
+
+
+class PhysicsWriter:
+	def __init__(self, physicsFile):
+		self.physicsFile = physicsFile
+		self.running = False
+
+	def run(self):
+		period = 1.0 / PHYSICS_RATE
+		start = time.perf_counter()
+		step = 0
+		while self.running:
+			c = camberAt(step * period)
+			self.physicsFile.step((c, c, c, c), (3000, 3000, 3000, 3000), (0, 0, 0, 0))
+			step += 1
+			delay = start + step * period - time.perf_counter()
+			if delay > 0:
+				time.sleep(delay)
+
+	def start(self):
+		self.running = True
+		self.thread = threading.Thread(target=self.run)
+		self.thread.daemon = True
+		self.thread.start()
+
+	def stop(self):
+		self.running = False
+		self.thread.join()
+
+
+def render(sampler, fps, seconds):
+	stats = RollingStats(PHYSICS_RATE * seconds * 2)
+	frames = 0
+	sampler.drain()
+	start = time.perf_counter()
+	while time.perf_counter() - start < seconds:
+		for t, dt, camber, load, travel in sampler.drain():
+			stats.push(camber[0])
+		frames += 1
+		time.sleep(max(0, start + frames / fps - time.perf_counter()))
+	return len(stats) / seconds, stats.mean(), stats.min(), stats.max()
+
+
+def main(seconds=2):
+	simInfo = mock_ac.loadSimInfo()
+	physicsFile = PhysicsFile(simInfo.SPageFilePhysics)
+	writer = PhysicsWriter(physicsFile)
+	sampler = TelemetrySampler(PhysicsReader(physicsFile.readerMap, simInfo.SPageFilePhysics), 1000)
+	writer.start()
+	sampler.start()
+
+	results = {}
+	for fps in (30, 60, 144):
+		results[fps] = render(sampler, fps, seconds)
+		print("{0:4d} fps {1:7.1f} samples/s  mean {2:+.4f}  min {3:+.4f}  max {4:+.4f}".format(fps, *results[fps]))
+
+	sampler.stop()
+	writer.stop()
+	physicsFile.close()
+
+	rates = [r[0] for r in results.values()]
+	means = [r[1] for r in results.values()]
+	ok = (max(rates) - min(rates)) / max(rates) < 0.1 and max(means) - min(means) < 0.002
+	print("dropped {0}, frame-rate independent: {1}".format(sampler.ring.dropped, "OK" if ok else "FAIL"))
+	return 0 if ok else 1
+
+
+if __name__ == '__main__':
+	sys.exit(main())
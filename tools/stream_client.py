@@ -0,0 +1,61 @@
+##############################################################
+# Telemetry stream client
+#
+# python tools/stream_client.py [--port N] [--tcp] [--json] [--count N]
+#
+# Connects to the app's telemetry stream (Options "streamPort",
+# "streamProtocol" and "streamFormat") and prints every frame, or
+# with --stats just a line a second of frame rate, missed frames
+# and latency.  Latency is against the sender's clock, so only
+# means something on the same machine.
+#############################################################
+
+import argparse
+import os
+import sys
+import time
+
+APP_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "apps", "python", "camber-extravaganza")
+sys.path.insert(0, APP_DIR)
+from camberlib.stream import BINARY, JSON, StreamClient
+
+WHEELS = ("FL", "FR", "RL", "RR")
+
+
+def printFrame(frame):
+	wheels = " ".join("{0} {1:+6.2f}° {2:5.0f}N".format(name, c, l)
+		for name, c, l in zip(WHEELS, frame["camber"], frame["load"]))
+	print("{0:8d} {1}  optimal {2:+5.1f}° {3:+5.1f}°".format(frame["seq"], wheels, frame["optimal"][0], frame["optimal"][1]))
+
+
+def main():
+	parser = argparse.ArgumentParser(description="Read the CamberExtravaganza telemetry stream")
+	parser.add_argument("--host", default="127.0.0.1")
+	parser.add_argument("--port", type=int, default=47800)
+	parser.add_argument("--tcp", action="store_true", help="connect over TCP instead of subscribing over UDP")
+	parser.add_argument("--json", action="store_true", help="the app streams JSON lines")
+	parser.add_argument("--stats", action="store_true", help="print rates and latency instead of frames")
+	parser.add_argument("--count", type=int, default=0, help="stop after this many frames")
+	args = parser.parse_args()
+
+	client = StreamClient(args.host, args.port, "tcp" if args.tcp else "udp",
+		JSON if args.json else BINARY, None if args.stats else printFrame)
+	client.start()
+	seen = 0
+	try:
+		while client.thread.is_alive():
+			time.sleep(1.0)
+			latencies = sorted(client.latencies[seen:])
+			if args.stats and latencies:
+				print("{0:5d} frames/s, missed {1}, latency p50 {2:.2f} ms max {3:.2f} ms".format(
+					len(latencies), client.missed, latencies[len(latencies) // 2] * 1e3, latencies[-1] * 1e3))
+			seen += len(latencies)
+			if args.count and seen >= args.count:
+				break
+	except KeyboardInterrupt:
+		pass
+	client.stop()
+
+
+if __name__ == '__main__':
+	main()
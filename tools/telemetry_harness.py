@@ -0,0 +1,109 @@
+##############################################################
+# Shared memory telemetry harness
+#
+# python tools/telemetry_harness.py
+#
+# Backs the acpmf_physics layout with a regular file, writes to
+# it through one mapping the way AC would and reads it back
+# through another with camberlib.telemetry.PhysicsReader.
+# Checks the values and packetId skipping, then times a frame's
+# read against going through the ctypes struct fields.
+#############################################################
+
+import ctypes
+import mmap
+import os
+import sys
+import tempfile
+import time
+
+import mock_ac
+
+sys.path.insert(0, mock_ac.APP_DIR)
+from camberlib.telemetry import PhysicsReader
+
+
+class PhysicsFile:
+	def __init__(self, physicsStruct):
+		self.size = ctypes.sizeof(physicsStruct)
+		fd, self.path = tempfile.mkstemp(prefix="acpmf_physics")
+		os.write(fd, bytes(self.size))
+		os.close(fd)
+		self.file = open(self.path, "r+b")
+		self.writerMap = mmap.mmap(self.file.fileno(), self.size)
+		self.readerMap = mmap.mmap(self.file.fileno(), self.size)
+		self.physics = physicsStruct.from_buffer(self.writerMap)
+
+	def step(self, camber, load, travel):
+		for i in range(4):
+			self.physics.camberRAD[i] = camber[i]
+			self.physics.wheelLoad[i] = load[i]
+			self.physics.suspensionTravel[i] = travel[i]
+		self.physics.packetId += 1
+
+	def close(self):
+		del self.physics
+		self.writerMap.close()
+		self.readerMap.close()
+		self.file.close()
+		os.remove(self.path)
+
+
+def check(name, ok):
+	print("{0:40s} {1}".format(name, "OK" if ok else "FAIL"))
+	return ok
+
+
+def approx(a, b):
+	return all(abs(x - y) < 1e-6 for x, y in zip(a, b))
+
+
+def main(frames=100000):
+	simInfo = mock_ac.loadSimInfo()
+	physicsFile = PhysicsFile(simInfo.SPageFilePhysics)
+	reader = PhysicsReader(physicsFile.readerMap, simInfo.SPageFilePhysics)
+	ok = True
+
+	camber = (-0.05, -0.04, -0.03, -0.02)
+	load = (3100.0, 2900.0, 3300.0, 2700.0)
+	travel = (0.01, 0.02, 0.03, 0.04)
+	physicsFile.step(camber, load, travel)
+	ok &= check("fresh packet is read", reader.read())
+	ok &= check("camber matches", approx(reader.camber, camber))
+	ok &= check("load matches", approx(reader.load, load))
+	ok &= check("suspension travel matches", approx(reader.travel, travel))
+	ok &= check("same packetId is skipped", not reader.read())
+	physicsFile.step(travel, load, camber)
+	ok &= check("next packet is read", reader.read() and approx(reader.camber, travel))
+
+	t = time.perf_counter()
+	for i in range(frames):
+		physicsFile.physics.packetId = i
+		reader.read()
+	fresh = (time.perf_counter() - t) / frames
+
+	t = time.perf_counter()
+	for i in range(frames):
+		reader.read()
+	skipped = (time.perf_counter() - t) / frames
+
+	physics = simInfo.SPageFilePhysics.from_buffer(physicsFile.readerMap)
+	t = time.perf_counter()
+	for i in range(frames):
+		physicsFile.physics.packetId = i
+		tuple(physics.camberRAD)
+		tuple(physics.wheelLoad)
+		tuple(physics.suspensionTravel)
+	fields = (time.perf_counter() - t) / frames
+	del physics
+
+	print("PhysicsReader.read() new packet  {0:6.3f} us".format(fresh * 1e6))
+	print("PhysicsReader.read() same packet {0:6.3f} us".format(skipped * 1e6))
+	print("ctypes struct fields             {0:6.3f} us".format(fields * 1e6))
+
+	physicsFile.close()
+	return 0 if ok else 1
+
+
+if __name__ == '__main__':
+	sys.exit(main())